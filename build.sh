@@ -10,5 +10,11 @@ pip install -r requirements.txt
 # Run migrations
 python manage.py migrate
 
+# Create the cache table (no-op when it exists)
+python manage.py createcachetable
+
+# The chat assistant's text index lives on the media disk, which is not mounted during the build;
+# the import worker started by start.sh builds it when it is missing
+
 # Collect static files
 python manage.py collectstatic --noinput
\ No newline at end of file
@@ -178,13 +178,32 @@ if DEBUG:
 # Authentication settings
 # Anthropic API
 ANTHROPIC_API_KEY = env('ANTHROPIC_API_KEY', default=None)
+# Point the chat at another Messages API server, e.g. "python manage.py mock_anthropic_server" for load tests
+ANTHROPIC_BASE_URL = env('ANTHROPIC_BASE_URL', default=None)
 
 LOGIN_REDIRECT_URL = '/'  # Default redirect if no 'next' parameter
 LOGOUT_REDIRECT_URL = '/'  # Redirect to home page after logout
 
+# Legacy imports: uploaded databases and finished import jobs (with their reports) expire after these periods
+IMPORT_UPLOAD_RETENTION_HOURS = env.int('IMPORT_UPLOAD_RETENTION_HOURS', default=24)
+IMPORT_JOB_RETENTION_DAYS = env.int('IMPORT_JOB_RETENTION_DAYS', default=30)
+
+# Shared by all web and worker processes, so an invalidation in one reaches the others
+# (create the table with "python manage.py createcachetable")
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
 # Chat log directory — on Render use the persistent media disk, locally use logs/
 CHAT_LOG_DIR = os.path.join(MEDIA_ROOT, 'chat_logs') if not DEBUG else os.path.join(BASE_DIR, 'logs')
 
+# BM25 index of the chat assistant's search_text tool (rebuilt by "python manage.py build_text_index"
+# and by the import worker); on Render it lives on the persistent media disk, as the chat logs do
+TEXT_INDEX_DIR = os.path.join(MEDIA_ROOT, 'text_index') if not DEBUG else os.path.join(BASE_DIR, 'text_index')
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
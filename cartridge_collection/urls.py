@@ -19,7 +19,7 @@ from django.urls import path, include
 from django.views.generic import RedirectView
 from django.conf import settings
 from django.conf.urls.static import static
-from collection.views import serve_media_file, chat_message, chat_clear, chat_history
+from collection.views import serve_media_file, chat_message, chat_stream, chat_clear, chat_history
 
 
 
@@ -33,6 +33,7 @@ from collection.views import serve_media_file, chat_message, chat_clear, chat_hi
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('chat/', chat_message, name='chat_message'),
+    path('chat/stream/', chat_stream, name='chat_stream'),
     path('chat/clear/', chat_clear, name='chat_clear'),
     path('chat/history/', chat_history, name='chat_history'),
     path('', include('collection.urls')),
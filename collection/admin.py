@@ -1,4 +1,10 @@
+import os
+import shutil
+from django.conf import settings
 from django.contrib import admin
+from django.db.models import Count, Sum
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import format_html
 from .models import (
     # Collection Info
@@ -10,8 +16,14 @@ from .models import (
     # Collection items
     Load, Date, Variation, Box,
     # Source relationships
-    HeadstampSource, LoadSource, DateSource, VariationSource, BoxSource
+    HeadstampSource, LoadSource, DateSource, VariationSource, BoxSource,
+    # Media index
+    ImageFileIndex,
+    # Background jobs
+    ImportJob,
+    ImportUpload,
 )
+from .utils.image_hash import ADMIN_MAX_DISTANCE, DEFAULT_MAX_DISTANCE, near_duplicate_report
 
 # Register lookup tables with basic admin interfaces
 class LookupAdmin(admin.ModelAdmin):
@@ -229,4 +241,122 @@ HeadstampAdmin.inlines = [HeadstampSourceInline]
 LoadAdmin.inlines = [LoadSourceInline]
 DateAdmin.inlines = [DateSourceInline]
 VariationAdmin.inlines = [VariationSourceInline]
-BoxAdmin.inlines = [BoxSourceInline]
\ No newline at end of file
+BoxAdmin.inlines = [BoxSourceInline]
+
+# Image file index admin with a storage usage dashboard
+@admin.register(ImageFileIndex)
+class ImageFileIndexAdmin(admin.ModelAdmin):
+    list_display = ('path', 'caliber_code', 'record_type', 'size', 'width', 'height', 'mtime', 'content_type', 'object_id')
+    list_filter = ('caliber_code', 'record_type', 'year', 'content_type')
+    search_fields = ('path',)
+    ordering = ('path',)
+    readonly_fields = ('path', 'caliber_code', 'record_type', 'size', 'width', 'height',
+                       'mtime', 'year', 'content_type', 'object_id', 'indexed_at')
+
+    def has_add_permission(self, request):
+        # Entries are maintained by signals and the reconcile_image_index command
+        return False
+
+    def get_urls(self):
+        custom_urls = [
+            path('storage/', self.admin_site.admin_view(self.storage_usage_view),
+                 name='collection_imagefileindex_storage'),
+            path('duplicates/', self.admin_site.admin_view(self.duplicates_view),
+                 name='collection_imagefileindex_duplicates'),
+        ]
+        return custom_urls + super().get_urls()
+
+    def storage_usage_view(self, request):
+        """Media storage usage summarized from the index, plus disk headroom"""
+        totals = ImageFileIndex.objects.aggregate(files=Count('id'), bytes=Sum('size'))
+        orphans = ImageFileIndex.objects.filter(object_id__isnull=True).aggregate(
+            files=Count('id'), bytes=Sum('size')
+        )
+
+        def usage_by(field):
+            return ImageFileIndex.objects.values(field).annotate(
+                files=Count('id'), bytes=Sum('size')
+            ).order_by(field)
+
+        disk = None
+        if os.path.isdir(settings.MEDIA_ROOT):
+            usage = shutil.disk_usage(settings.MEDIA_ROOT)
+            disk = {
+                'total': usage.total,
+                'used': usage.used,
+                'free': usage.free,
+                'percent_used': round(usage.used * 100 / usage.total, 1) if usage.total else 0,
+            }
+
+        context = dict(
+            self.admin_site.each_context(request),
+            title='Media Storage Usage',
+            opts=self.model._meta,
+            totals=totals,
+            orphans=orphans,
+            by_caliber=usage_by('caliber_code'),
+            by_record_type=usage_by('record_type'),
+            by_year=usage_by('year'),
+            disk=disk,
+            media_root=settings.MEDIA_ROOT,
+        )
+        return TemplateResponse(request, 'admin/collection/imagefileindex/storage_usage.html', context)
+
+    def duplicates_view(self, request):
+        """Near-duplicate image groups computed from the stored perceptual hashes"""
+        try:
+            max_distance = max(0, min(int(request.GET.get('distance', DEFAULT_MAX_DISTANCE)), ADMIN_MAX_DISTANCE))
+        except ValueError:
+            max_distance = DEFAULT_MAX_DISTANCE
+        caliber_code = request.GET.get('caliber') or None
+        record_type = request.GET.get('type') or None
+
+        groups = near_duplicate_report(
+            max_distance, caliber_code, [record_type] if record_type else None
+        )
+
+        context = dict(
+            self.admin_site.each_context(request),
+            title='Near-Duplicate Images',
+            opts=self.model._meta,
+            groups=groups,
+            redundant=sum(len(group['images']) - 1 for group in groups),
+            max_distance=max_distance,
+            distance_limit=ADMIN_MAX_DISTANCE,
+            caliber_code=caliber_code or '',
+            record_type=record_type or '',
+            caliber_codes=ImageFileIndex.objects.exclude(caliber_code='').values_list(
+                'caliber_code', flat=True
+            ).distinct().order_by('caliber_code'),
+            record_types=['headstamp', 'load', 'date', 'variation', 'box'],
+            media_url=settings.MEDIA_URL,
+        )
+        return TemplateResponse(request, 'admin/collection/imagefileindex/duplicates.html', context)
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'table_name', 'file_name', 'caliber', 'status', 'processed', 'total',
+                    'success', 'failed', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'table_name', 'caliber')
+    search_fields = ('file_name', 'table_name')
+    readonly_fields = ('caliber', 'created_by', 'upload', 'table_name', 'file_name', 'file_path', 'options',
+                       'total', 'processed', 'success', 'failed', 'created_at', 'started_at',
+                       'finished_at', 'heartbeat_at', 'error', 'result', 'report_file')
+    fields = ('status',) + readonly_fields
+
+    def has_add_permission(self, request):
+        # Jobs are created from the import page
+        return False
+
+
+@admin.register(ImportUpload)
+class ImportUploadAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'caliber', 'uploaded_by', 'created_at')
+    list_filter = ('caliber',)
+    search_fields = ('file_name',)
+    readonly_fields = ('id', 'caliber', 'uploaded_by', 'file_name', 'file_path', 'tables', 'created_at')
+
+    def has_add_permission(self, request):
+        # Uploads are created from the import page
+        return False
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class CollectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'collection'
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
+
+        # Map the chat assistant's text index; a missing one is built by the import worker
+        from .utils.text_index import get_text_index
+        try:
+            get_text_index().open()
+        except (OSError, ValueError):
+            pass
@@ -4,10 +4,18 @@ These functions query the Django database and return results that include
 URLs for linking directly to detail pages.
 """
 
+import hashlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.cache import cache
+from django.db import close_old_connections
 from django.urls import reverse
 from collection.models import (
     Caliber, Country, Manufacturer, Headstamp, Load, Date, Variation, Box,
 )
+from collection.utils.data_version import data_version
 
 
 # --- Tool definitions for the Claude API ---
@@ -182,6 +190,121 @@ TOOL_DEFINITIONS = [
             "required": ["caliber_code", "child_type"],
         },
     },
+    {
+        "name": "search_text",
+        "description": (
+            "Full-text search over record descriptions, public notes and headstamp names, "
+            "ranked by relevance (BM25). Use this when the user describes what they are "
+            "looking for in words — e.g. 'loads with a notched bullet', 'anything about "
+            "police contracts', 'boxes mentioning Portugal' — rather than by exact field "
+            "values. Words are matched regardless of case, accents and plural endings; "
+            "try synonyms in one query when a term may be worded differently. Returns for "
+            "each match: type, id (Cart ID, box ID or headstamp code), score, description, "
+            "context (headstamp or parent) and url."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "caliber_code": {
+                    "type": "string",
+                    "description": "The caliber code. Infer from the current page URL path. Valid codes: '9mmP' (9mm Parabellum), '765mmP' (7.65mm), '9mmM' (9mm Mauser). Do NOT guess — use the URL.",
+                },
+                "query": {
+                    "type": "string",
+                    "description": "Words to search for.",
+                },
+                "record_type": {
+                    "type": "string",
+                    "enum": ["headstamp", "load", "date", "variation", "box"],
+                    "description": "Optional: only return records of this type.",
+                },
+            },
+            "required": ["caliber_code", "query"],
+        },
+    },
+    {
+        "name": "aggregate_collection",
+        "description": (
+            "Count loads or dates grouped by one or more dimensions, with optional filters. "
+            "Use this for questions about how many, totals, breakdowns or value, such as "
+            "'how many Belgian loads with brass cases do we have by decade' or 'which "
+            "manufacturers have the most tracer loads'. Counts are exact over the whole "
+            "collection. Grouping by year or decade counts dates (years are recorded on "
+            "dates). Returns a table: columns, rows (one per group, largest first) and "
+            "totals. Each row ends with count, priced (records with a price) and "
+            "price_total."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "caliber_code": {
+                    "type": "string",
+                    "description": "The caliber code. Infer from the current page URL path. Valid codes: '9mmP' (9mm Parabellum), '765mmP' (7.65mm), '9mmM' (9mm Mauser). Do NOT guess — use the URL.",
+                },
+                "group_by": {
+                    "type": "array",
+                    "items": {
+                        "type": "string",
+                        "enum": [
+                            "country", "manufacturer", "headstamp", "load_type", "bullet",
+                            "case_type", "primer", "pa_color", "year", "decade",
+                        ],
+                    },
+                    "description": "Dimensions to group by, at most three. Leave empty for totals only.",
+                },
+                "record_type": {
+                    "type": "string",
+                    "enum": ["load", "date"],
+                    "description": "Optional: what to count (default 'load'; 'date' when grouping or filtering by year).",
+                },
+                "country": {
+                    "type": "string",
+                    "description": "Optional: filter by country name (partial match).",
+                },
+                "manufacturer": {
+                    "type": "string",
+                    "description": "Optional: filter by manufacturer code or name (partial match).",
+                },
+                "headstamp": {
+                    "type": "string",
+                    "description": "Optional: filter by headstamp code (partial match).",
+                },
+                "load_type": {
+                    "type": "string",
+                    "description": "Optional: filter by load type (e.g., 'Ball', 'Tracer', 'Blank').",
+                },
+                "bullet_type": {
+                    "type": "string",
+                    "description": "Optional: filter by bullet type (e.g., 'FMJ', 'JHP').",
+                },
+                "case_type": {
+                    "type": "string",
+                    "description": "Optional: filter by case type (e.g., 'Brass', 'Steel', 'Aluminum').",
+                },
+                "primer": {
+                    "type": "string",
+                    "description": "Optional: filter by primer type (partial match).",
+                },
+                "pa_color": {
+                    "type": "string",
+                    "description": "Optional: filter by primer annulus color (partial match).",
+                },
+                "is_magnetic": {
+                    "type": "boolean",
+                    "description": "Optional: filter by magnetic property (true/false).",
+                },
+                "year_from": {
+                    "type": "integer",
+                    "description": "Optional: only dates from this year on (counts dates).",
+                },
+                "year_to": {
+                    "type": "integer",
+                    "description": "Optional: only dates up to and including this year (counts dates).",
+                },
+            },
+            "required": ["caliber_code"],
+        },
+    },
 ]
 
 
@@ -189,6 +312,125 @@ TOOL_DEFINITIONS = [
 
 MAX_RESULTS = 15  # Max individual results to return before suggesting search page
 
+# Tool calls of one round run concurrently on at most this many threads of their own
+TOOL_WORKERS = 4
+
+# Seconds a tool call may run, counted from when it starts, before its result is replaced by an error
+TOOL_TIMEOUT = 20
+
+# Read-only tools whose results are cached, keyed by their input and the collection data version
+CACHED_TOOLS = {
+    "search_headstamps", "search_loads", "get_record_details", "browse_children", "aggregate_collection",
+    "search_text",
+}
+
+# Seconds a cached tool result is kept; writes retire it sooner via the data version
+TOOL_CACHE_TTL = 600
+
+def _tool_cache_key(tool_name, tool_input):
+    """
+    Cache key of a tool call. Arguments left empty are dropped and the rest
+    sorted, so calls that differ only in how Claude spelled them out share a key.
+    """
+    arguments = {
+        name: value.strip() if isinstance(value, str) else value
+        for name, value in tool_input.items()
+        if value not in (None, "")
+    }
+    canonical = json.dumps([tool_name, arguments], sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(canonical.encode()).hexdigest()
+    return f"chat_tool:{data_version()}:{digest}"
+
+
+def _run_tool(tool_name, tool_input):
+    """
+    execute_tool() on a pool thread, which has its own database connection.
+    Returns (result, cached, seconds) where cached tells whether the result came from the cache.
+    """
+    started = time.monotonic()
+    close_old_connections()
+    try:
+        if tool_name not in CACHED_TOOLS:
+            return execute_tool(tool_name, tool_input), False, time.monotonic() - started
+        key = _tool_cache_key(tool_name, tool_input)
+        result = cache.get(key)
+        if result is not None:
+            return result, True, time.monotonic() - started
+        result = execute_tool(tool_name, tool_input)
+        cache.set(key, result, TOOL_CACHE_TTL)
+        return result, False, time.monotonic() - started
+    finally:
+        # Pool threads never see request_finished, so release the connection here
+        close_old_connections()
+
+
+def execute_tools(calls):
+    """
+    Run the tool calls Claude made in one turn concurrently.
+
+    Each round gets its own pool of at most TOOL_WORKERS threads, so one slow
+    conversation cannot queue the tool calls of another.
+
+    Args:
+        calls (list): (tool_name, tool_input) pairs in the order Claude made them
+
+    Returns:
+        list: (result, cached, seconds) in the same order, cached telling whether the
+              result was served from the tool cache. A call still running TOOL_TIMEOUT
+              seconds after it started gets an error result (its thread is left to
+              finish); calls still queued once every thread is held by such a call
+              are cancelled.
+    """
+    if not calls:
+        return []
+    workers = min(TOOL_WORKERS, len(calls))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chat-tool')
+    started = {}
+
+    def run(index, name, tool_input):
+        started[index] = time.monotonic()
+        return _run_tool(name, tool_input)
+
+    futures = [pool.submit(run, index, name, tool_input) for index, (name, tool_input) in enumerate(calls)]
+    results = [None] * len(calls)
+    pending = set(range(len(calls)))
+    timed_out = set()
+    try:
+        while pending:
+            now = time.monotonic()
+            for index in sorted(pending):
+                future = futures[index]
+                if future.done():
+                    results[index] = future.result()
+                    pending.discard(index)
+                elif index in started and now - started[index] >= TOOL_TIMEOUT:
+                    name = calls[index][0]
+                    results[index] = (
+                        {"error": f"The {name} tool timed out after {TOOL_TIMEOUT} seconds."}, False, TOOL_TIMEOUT
+                    )
+                    pending.discard(index)
+                    timed_out.add(index)
+
+            # Threads still held by timed-out calls cannot pick up the queued ones
+            stuck = [index for index in timed_out if not futures[index].done()]
+            if len(stuck) >= workers:
+                for index in sorted(pending):
+                    if futures[index].cancel():
+                        name = calls[index][0]
+                        results[index] = (
+                            {"error": f"The {name} tool was not run because earlier tool calls timed out."}, False, 0
+                        )
+                        pending.discard(index)
+            if not pending:
+                break
+
+            deadlines = [started[index] + TOOL_TIMEOUT for index in pending if index in started]
+            timeout = max(0, min(deadlines) - now) if deadlines else 0.05
+            wait([futures[index] for index in pending | set(stuck)], timeout=timeout, return_when=FIRST_COMPLETED)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
 
 def execute_tool(tool_name, tool_input):
     """Dispatch a tool call to the appropriate function."""
@@ -200,10 +442,26 @@ def execute_tool(tool_name, tool_input):
         return search_loads(**tool_input)
     elif tool_name == "browse_children":
         return browse_children(**tool_input)
+    elif tool_name == "aggregate_collection":
+        return aggregate_collection(**tool_input)
+    elif tool_name == "search_text":
+        return search_text(**tool_input)
     else:
         return {"error": f"Unknown tool: {tool_name}"}
 
 
+def _first_page(qs, *fields):
+    """
+    The first MAX_RESULTS rows of qs as dicts of fields, and how many rows
+    match in all, from a single query: the total rides along on every row as
+    COUNT(*) OVER () instead of a separate count().
+    """
+    from django.db.models import Count, Window
+
+    rows = list(qs.values(*fields).annotate(total_matches=Window(Count('*')))[:MAX_RESULTS])
+    return rows, rows[0]['total_matches'] if rows else 0
+
+
 def search_headstamps(caliber_code, search_text, country=None, manufacturer=None):
     """Search headstamps by text, optionally filtered by country or manufacturer."""
     try:
@@ -215,8 +473,6 @@ def search_headstamps(caliber_code, search_text, country=None, manufacturer=None
 
     qs = Headstamp.objects.filter(
         manufacturer__country__caliber=caliber,
-    ).select_related(
-        'manufacturer', 'manufacturer__country'
     ).annotate(
         load_count=Count('loads', distinct=True)
     )
@@ -238,19 +494,22 @@ def search_headstamps(caliber_code, search_text, country=None, manufacturer=None
             Q(manufacturer__name__icontains=manufacturer)
         )
 
-    total_count = qs.count()
+    rows, total_count = _first_page(
+        qs, 'id', 'code', 'name', 'image', 'load_count',
+        'manufacturer__code', 'manufacturer__name', 'manufacturer__country__name',
+    )
     results = []
 
-    for hs in qs[:MAX_RESULTS]:
-        url = reverse('headstamp_detail', args=[caliber_code, hs.id])
+    for hs in rows:
+        url = reverse('headstamp_detail', args=[caliber_code, hs['id']])
         results.append({
-            "code": hs.code,
-            "name": hs.name or "",
-            "manufacturer": hs.manufacturer.code,
-            "manufacturer_name": hs.manufacturer.name or "",
-            "country": hs.manufacturer.country.name,
-            "load_count": hs.load_count,
-            "has_image": bool(hs.image),
+            "code": hs['code'],
+            "name": hs['name'] or "",
+            "manufacturer": hs['manufacturer__code'],
+            "manufacturer_name": hs['manufacturer__name'] or "",
+            "country": hs['manufacturer__country__name'],
+            "load_count": hs['load_count'],
+            "has_image": bool(hs['image']),
             "url": url,
         })
 
@@ -482,9 +741,6 @@ def search_loads(caliber_code, country=None, manufacturer=None, headstamp=None,
 
     qs = Load.objects.filter(
         headstamp__manufacturer__country__caliber=caliber,
-    ).select_related(
-        'headstamp', 'headstamp__manufacturer', 'headstamp__manufacturer__country',
-        'load_type', 'bullet', 'case_type', 'primer', 'pa_color',
     )
 
     if country:
@@ -522,25 +778,30 @@ def search_loads(caliber_code, country=None, manufacturer=None, headstamp=None,
             Q(note__icontains=description)
         )
 
-    total_count = qs.count()
+    rows, total_count = _first_page(
+        qs, 'id', 'cart_id', 'is_magnetic', 'description', 'image',
+        'headstamp__code', 'headstamp__manufacturer__code', 'headstamp__manufacturer__country__name',
+        'load_type__display_name', 'bullet__display_name', 'case_type__display_name',
+        'primer__display_name', 'pa_color__display_name',
+    )
     results = []
 
-    for load in qs[:MAX_RESULTS]:
-        url = reverse('load_detail', args=[caliber_code, load.id])
+    for load in rows:
+        url = reverse('load_detail', args=[caliber_code, load['id']])
         results.append({
-            "cart_id": load.cart_id,
+            "cart_id": load['cart_id'],
             "url": url,
-            "headstamp": load.headstamp.code,
-            "manufacturer": load.headstamp.manufacturer.code,
-            "country": load.headstamp.manufacturer.country.name,
-            "load_type": str(load.load_type) if load.load_type else "",
-            "bullet_type": str(load.bullet) if load.bullet else "",
-            "case_type": str(load.case_type) if load.case_type else "",
-            "primer": str(load.primer) if load.primer else "",
-            "pa_color": str(load.pa_color) if load.pa_color else "",
-            "is_magnetic": load.is_magnetic,
-            "description": load.description or "",
-            "has_image": bool(load.image),
+            "headstamp": load['headstamp__code'],
+            "manufacturer": load['headstamp__manufacturer__code'],
+            "country": load['headstamp__manufacturer__country__name'],
+            "load_type": load['load_type__display_name'] or "",
+            "bullet_type": load['bullet__display_name'] or "",
+            "case_type": load['case_type__display_name'] or "",
+            "primer": load['primer__display_name'] or "",
+            "pa_color": load['pa_color__display_name'] or "",
+            "is_magnetic": load['is_magnetic'],
+            "description": load['description'] or "",
+            "has_image": bool(load['image']),
         })
 
     response = {
@@ -590,18 +851,19 @@ def browse_children(caliber_code, child_type, parent_name=None):
             manufacturer_count=Count('manufacturer', distinct=True),
         ).order_by('name')
 
+        rows, total_count = _first_page(qs, 'id', 'name', 'full_name', 'manufacturer_count')
         results = []
-        for c in qs[:MAX_RESULTS]:
-            url = reverse('country_detail', args=[caliber_code, c.id])
+        for c in rows:
+            url = reverse('country_detail', args=[caliber_code, c['id']])
             results.append({
-                "name": c.name,
-                "full_name": c.full_name or "",
-                "manufacturer_count": c.manufacturer_count,
+                "name": c['name'],
+                "full_name": c['full_name'] or "",
+                "manufacturer_count": c['manufacturer_count'],
                 "url": url,
             })
 
         return {
-            "total_matches": qs.count(),
+            "total_matches": total_count,
             "child_type": "country",
             "results": results,
         }
@@ -609,7 +871,7 @@ def browse_children(caliber_code, child_type, parent_name=None):
     elif child_type == "manufacturer":
         qs = Manufacturer.objects.filter(
             country__caliber=caliber,
-        ).select_related('country').annotate(
+        ).annotate(
             headstamp_count=Count('headstamps', distinct=True),
         ).order_by('code')
 
@@ -619,15 +881,15 @@ def browse_children(caliber_code, child_type, parent_name=None):
                 Q(country__full_name__icontains=parent_name)
             )
 
-        total_count = qs.count()
+        rows, total_count = _first_page(qs, 'id', 'code', 'name', 'country__name', 'headstamp_count')
         results = []
-        for m in qs[:MAX_RESULTS]:
-            url = reverse('manufacturer_detail', args=[caliber_code, m.id])
+        for m in rows:
+            url = reverse('manufacturer_detail', args=[caliber_code, m['id']])
             results.append({
-                "code": m.code,
-                "name": m.name or "",
-                "country": m.country.name,
-                "headstamp_count": m.headstamp_count,
+                "code": m['code'],
+                "name": m['name'] or "",
+                "country": m['country__name'],
+                "headstamp_count": m['headstamp_count'],
                 "url": url,
             })
 
@@ -645,8 +907,6 @@ def browse_children(caliber_code, child_type, parent_name=None):
     elif child_type == "headstamp":
         qs = Headstamp.objects.filter(
             manufacturer__country__caliber=caliber,
-        ).select_related(
-            'manufacturer', 'manufacturer__country'
         ).annotate(
             load_count=Count('loads', distinct=True),
         ).order_by('code')
@@ -657,16 +917,18 @@ def browse_children(caliber_code, child_type, parent_name=None):
                 Q(manufacturer__name__icontains=parent_name)
             )
 
-        total_count = qs.count()
+        rows, total_count = _first_page(
+            qs, 'id', 'code', 'name', 'load_count', 'manufacturer__code', 'manufacturer__country__name',
+        )
         results = []
-        for hs in qs[:MAX_RESULTS]:
-            url = reverse('headstamp_detail', args=[caliber_code, hs.id])
+        for hs in rows:
+            url = reverse('headstamp_detail', args=[caliber_code, hs['id']])
             results.append({
-                "code": hs.code,
-                "name": hs.name or "",
-                "manufacturer": hs.manufacturer.code,
-                "country": hs.manufacturer.country.name,
-                "load_count": hs.load_count,
+                "code": hs['code'],
+                "name": hs['name'] or "",
+                "manufacturer": hs['manufacturer__code'],
+                "country": hs['manufacturer__country__name'],
+                "load_count": hs['load_count'],
                 "url": url,
             })
 
@@ -684,27 +946,28 @@ def browse_children(caliber_code, child_type, parent_name=None):
     elif child_type == "load":
         qs = Load.objects.filter(
             headstamp__manufacturer__country__caliber=caliber,
-        ).select_related(
-            'headstamp', 'headstamp__manufacturer',
-            'load_type', 'bullet', 'case_type', 'primer', 'pa_color',
         ).order_by('cart_id')
 
         if parent_name:
             qs = qs.filter(headstamp__code__icontains=parent_name)
 
-        total_count = qs.count()
+        rows, total_count = _first_page(
+            qs, 'id', 'cart_id', 'description', 'headstamp__code',
+            'load_type__display_name', 'bullet__display_name', 'case_type__display_name',
+            'primer__display_name', 'pa_color__display_name',
+        )
         results = []
-        for load in qs[:MAX_RESULTS]:
-            url = reverse('load_detail', args=[caliber_code, load.id])
+        for load in rows:
+            url = reverse('load_detail', args=[caliber_code, load['id']])
             results.append({
-                "cart_id": load.cart_id,
-                "headstamp": load.headstamp.code,
-                "load_type": str(load.load_type) if load.load_type else "",
-                "bullet_type": str(load.bullet) if load.bullet else "",
-                "case_type": str(load.case_type) if load.case_type else "",
-                "primer": str(load.primer) if load.primer else "",
-                "pa_color": str(load.pa_color) if load.pa_color else "",
-                "description": load.description or "",
+                "cart_id": load['cart_id'],
+                "headstamp": load['headstamp__code'],
+                "load_type": load['load_type__display_name'] or "",
+                "bullet_type": load['bullet__display_name'] or "",
+                "case_type": load['case_type__display_name'] or "",
+                "primer": load['primer__display_name'] or "",
+                "pa_color": load['pa_color__display_name'] or "",
+                "description": load['description'] or "",
                 "url": url,
             })
 
@@ -722,3 +985,205 @@ def browse_children(caliber_code, child_type, parent_name=None):
     else:
         return {"error": f"Unknown child type: {child_type}"}
 
+
+# Load fields behind each aggregate_collection dimension (dates reach them through load__)
+AGGREGATE_DIMENSIONS = {
+    "country": "headstamp__manufacturer__country__name",
+    "manufacturer": "headstamp__manufacturer__code",
+    "headstamp": "headstamp__code",
+    "load_type": "load_type__display_name",
+    "bullet": "bullet__display_name",
+    "case_type": "case_type__display_name",
+    "primer": "primer__display_name",
+    "pa_color": "pa_color__display_name",
+}
+
+# Dimensions held by dates rather than loads
+DATE_DIMENSIONS = ("year", "decade")
+
+MAX_GROUP_BY = 3
+MAX_GROUPS = 50  # Max table rows to return; totals always cover every group
+
+# Years are free text on dates; only those starting with four digits have a known decade
+FOUR_DIGIT_YEAR = r'^[0-9]{4}'
+
+
+def _lookup_filter(path, text):
+    """Match a lookup table value by display name or code (partial match)."""
+    from django.db.models import Q
+    return Q(**{f"{path}__display_name__icontains": text}) | Q(**{f"{path}__value__icontains": text})
+
+
+def aggregate_collection(caliber_code, group_by=None, record_type="load", country=None,
+                         manufacturer=None, headstamp=None, load_type=None, bullet_type=None,
+                         case_type=None, primer=None, pa_color=None, is_magnetic=None,
+                         year_from=None, year_to=None):
+    """Count and total loads or dates per group, in one grouped query."""
+    try:
+        caliber = Caliber.objects.get(code__iexact=caliber_code)
+    except Caliber.DoesNotExist:
+        return {"error": f"Caliber '{caliber_code}' not found."}
+
+    from django.db.models import Case, CharField, Count, IntegerField, Q, Sum, Value, When
+    from django.db.models.functions import Cast, Concat, Substr
+
+    group_by = list(dict.fromkeys(group_by or []))
+    unknown = [d for d in group_by if d not in AGGREGATE_DIMENSIONS and d not in DATE_DIMENSIONS]
+    if unknown:
+        return {"error": f"Unknown group_by dimension(s): {', '.join(unknown)}."}
+    if len(group_by) > MAX_GROUP_BY:
+        return {"error": f"Group by at most {MAX_GROUP_BY} dimensions at a time."}
+
+    by_date = (
+        record_type == "date" or year_from is not None or year_to is not None
+        or any(d in DATE_DIMENSIONS for d in group_by)
+    )
+    if by_date:
+        qs = Date.objects.filter(load__headstamp__manufacturer__country__caliber=caliber)
+        prefix = "load__"
+    else:
+        qs = Load.objects.filter(headstamp__manufacturer__country__caliber=caliber)
+        prefix = ""
+
+    if country:
+        qs = qs.filter(
+            Q(**{f"{prefix}headstamp__manufacturer__country__name__icontains": country}) |
+            Q(**{f"{prefix}headstamp__manufacturer__country__full_name__icontains": country})
+        )
+    if manufacturer:
+        qs = qs.filter(
+            Q(**{f"{prefix}headstamp__manufacturer__code__icontains": manufacturer}) |
+            Q(**{f"{prefix}headstamp__manufacturer__name__icontains": manufacturer})
+        )
+    if headstamp:
+        qs = qs.filter(**{f"{prefix}headstamp__code__icontains": headstamp})
+    for field, text in (("load_type", load_type), ("bullet", bullet_type), ("case_type", case_type),
+                        ("primer", primer), ("pa_color", pa_color)):
+        if text:
+            qs = qs.filter(_lookup_filter(f"{prefix}{field}", text))
+    if is_magnetic is not None:
+        qs = qs.filter(**{f"{prefix}is_magnetic": is_magnetic})
+
+    if by_date:
+        four_digits = Q(year__regex=FOUR_DIGIT_YEAR)
+        qs = qs.annotate(
+            year_number=Case(
+                When(four_digits, then=Cast(Substr('year', 1, 4), IntegerField())),
+                default=None, output_field=IntegerField(),
+            ),
+            decade=Case(
+                When(four_digits, then=Concat(Substr('year', 1, 3), Value('0s'))),
+                default=None, output_field=CharField(),
+            ),
+        )
+        if year_from is not None:
+            qs = qs.filter(year_number__gte=year_from)
+        if year_to is not None:
+            qs = qs.filter(year_number__lte=year_to)
+
+    columns = [d if d in DATE_DIMENSIONS else f"{prefix}{AGGREGATE_DIMENSIONS[d]}" for d in group_by]
+    measures = {'count': Count('id'), 'priced': Count('price'), 'price_total': Sum('price')}
+    if columns:
+        groups = qs.values(*columns).annotate(**measures).order_by('-count', *columns)
+    else:
+        groups = [qs.aggregate(**measures)]
+
+    rows = []
+    total_count = total_priced = 0
+    total_price = 0
+    for group in groups:
+        total_count += group['count']
+        total_priced += group['priced']
+        total_price += group['price_total'] or 0
+        if len(rows) < MAX_GROUPS:
+            rows.append(
+                [group[c] if group[c] not in (None, "") else "(none)" for c in columns]
+                + [group['count'], group['priced'], float(group['price_total'] or 0)]
+            )
+
+    response = {
+        "record_type": "date" if by_date else "load",
+        "columns": group_by + ["count", "priced", "price_total"],
+        "rows": rows,
+        "group_count": len(groups),
+        "totals": {"count": total_count, "priced": total_priced, "price_total": float(total_price)},
+    }
+    if len(groups) > MAX_GROUPS:
+        response["note"] = (
+            f"Showing the {MAX_GROUPS} largest of {len(groups)} groups; totals cover all of them. "
+            f"Add filters or fewer dimensions to see the rest."
+        )
+    if "decade" in group_by:
+        response["note_decades"] = "Dates whose year does not start with four digits have no decade, shown as (none)."
+    return response
+
+
+def _text_hit_details(kind, pks):
+    """{pk: (id, description, context)} of the records of one type found by search_text."""
+    if kind == "headstamp":
+        return {
+            hs.pk: (hs.code, hs.name or "", f"{hs.manufacturer.code}, {hs.manufacturer.country.name}")
+            for hs in Headstamp.objects.filter(pk__in=pks).select_related('manufacturer__country')
+        }
+    if kind == "load":
+        return {
+            load.pk: (load.cart_id, load.description or "", f"headstamp {load.headstamp.code}")
+            for load in Load.objects.filter(pk__in=pks).select_related('headstamp')
+        }
+    if kind == "date":
+        return {
+            date.pk: (date.cart_id, date.description or "", f"{date.year or 'no year'}, load {date.load.cart_id}")
+            for date in Date.objects.filter(pk__in=pks).select_related('load')
+        }
+    if kind == "variation":
+        return {
+            variation.pk: (
+                variation.cart_id, variation.description or "",
+                f"load {variation.load.cart_id}" if variation.load else
+                f"date {variation.date.cart_id}" if variation.date else "",
+            )
+            for variation in Variation.objects.filter(pk__in=pks).select_related('load', 'date')
+        }
+    return {
+        box.pk: (box.bid, box.description or "", box.get_art_type_display())
+        for box in Box.objects.filter(pk__in=pks)
+    }
+
+
+def search_text(caliber_code, query, record_type=None):
+    """Rank records of a caliber by how well their text matches a query."""
+    try:
+        caliber = Caliber.objects.get(code__iexact=caliber_code)
+    except Caliber.DoesNotExist:
+        return {"error": f"Caliber '{caliber_code}' not found."}
+
+    from collection.utils.text_index import search_text_index
+
+    hits = search_text_index(
+        query, caliber_id=caliber.pk, kinds=[record_type] if record_type else None, limit=MAX_RESULTS,
+    )
+
+    pks_by_kind = {}
+    for kind, pk, _ in hits:
+        pks_by_kind.setdefault(kind, []).append(pk)
+    details = {kind: _text_hit_details(kind, pks) for kind, pks in pks_by_kind.items()}
+
+    results = []
+    for kind, pk, score in hits:
+        # Records deleted since the index last heard of them are skipped
+        if pk not in details[kind]:
+            continue
+        record_id, description, context = details[kind][pk]
+        results.append({
+            "type": kind,
+            "id": record_id,
+            "score": round(score, 2),
+            "description": description,
+            "context": context,
+            "url": reverse(f"{kind}_detail", args=[caliber_code, pk]),
+        })
+
+    response = {"query": query, "results": results}
+    if not results:
+        response["note"] = "No records match these words. Try other wording or search_loads filters."
+    return response
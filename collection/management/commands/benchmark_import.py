@@ -0,0 +1,276 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from collection.utils.import_engine import reset_sequences
+from collection.utils.legacy_generator import generate_legacy_database
+from collection.views.import_views import IMPORTERS, TABLE_DEPENDENCIES, run_import_pipeline
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, or None where it cannot be read"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Rows the importers resolve against, copied from the configured database into the scratch one
+REFERENCE_MODELS = ('caliber', 'loadtype', 'bullettype', 'casetype', 'primertype', 'pacolor')
+
+
+def tables_to_prime(tables, mode):
+    """
+    Tables imported untimed before a measured run: those the measured tables
+    depend on, and in merge mode the measured tables too, so the merge finds
+    its records already there.
+    """
+    needed = set()
+    pending = list(tables)
+    while pending:
+        for dependency in TABLE_DEPENDENCIES[pending.pop()]:
+            if dependency not in needed:
+                needed.add(dependency)
+                pending.append(dependency)
+    if mode == 'merge':
+        return needed | set(tables)
+    return needed - set(tables)
+
+
+def consume_details(stages):
+    """Read the spooled record results of a pipeline run so their temp files are removed"""
+    for stage in stages:
+        if stage['results'] is not None:
+            for _ in stage['results']['details']:
+                pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the legacy importers on synthetic databases and record rows/s, peak memory and '
+        'query counts. The imports write to a scratch test database that is migrated for the benchmark '
+        'and dropped afterwards; only calibers and lookup tables are copied into it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Sizes of the synthetic databases, in rows over all tables (default: 1000 10000)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed of the synthetic databases (default: 0)',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['replace', 'merge'],
+            default='replace',
+            help='Import mode to measure (default: replace)',
+        )
+        parser.add_argument(
+            '--tables',
+            nargs='+',
+            choices=list(IMPORTERS),
+            help='Only import these tables (default: all)',
+        )
+        parser.add_argument(
+            '--data-dir',
+            default=os.path.join(tempfile.gettempdir(), 'legacy_benchmark'),
+            help='Where generated databases are kept and reused',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results to this JSON file, to compare later commits against',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON results of an earlier run to compare with',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=10.0,
+            help='Percent drop in rows/s (or rise in queries) reported as a regression (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {e}")
+            # Runs of another mode or on other synthetic data are not comparable
+            for setting in ('mode', 'seed'):
+                if setting in baseline and baseline[setting] != options[setting]:
+                    raise CommandError(
+                        f"Baseline {options['compare']} was run with --{setting} {baseline[setting]}, "
+                        f"not {options[setting]}"
+                    )
+
+        os.makedirs(options['data_dir'], exist_ok=True)
+        reference = {
+            model: list(model.objects.all())
+            for model in (apps.get_model('collection', name) for name in REFERENCE_MODELS)
+        }
+        if not reference[apps.get_model('collection', 'caliber')]:
+            raise CommandError("No caliber to import into; create one first")
+
+        with self.scratch_database(options['data_dir']):
+            results = self.run_benchmarks(options, reference)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline:
+            regressions = self.compare(baseline, results, options['tolerance'])
+            if regressions:
+                raise CommandError(f"{regressions} regression(s) against {options['compare']}")
+
+    @contextmanager
+    def scratch_database(self, data_dir):
+        """Point the default connection at a freshly migrated test database, dropped on exit"""
+        if connection.vendor == 'sqlite':
+            # On disk rather than in memory, to measure what a real import does
+            connection.settings_dict['TEST']['NAME'] = os.path.join(data_dir, 'benchmark.sqlite3')
+        self.stdout.write("Creating the scratch database")
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def reset_database(self, reference):
+        """Empty the scratch database, then restore the reference rows"""
+        call_command('flush', interactive=False, verbosity=0)
+        for model, rows in reference.items():
+            model.objects.bulk_create(rows)
+        reset_sequences(*reference)
+
+    def run_benchmarks(self, options, reference):
+        tables = options['tables'] or list(IMPORTERS)
+        prime = tables_to_prime(tables, options['mode'])
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'commit': current_commit(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'mode': options['mode'],
+            'seed': options['seed'],
+            'runs': [],
+        }
+
+        # Smallest first, so the peak memory of each run includes the runs before it in the same way every time
+        for rows in sorted(set(options['rows'])):
+            path = os.path.join(options['data_dir'], f"legacy_{rows}_{options['seed']}.sqlite")
+            if not os.path.isfile(path):
+                self.stdout.write(f"Generating {path}")
+                generate_legacy_database(path, rows=rows, seed=options['seed'])
+
+            self.reset_database(reference)
+            if prime:
+                consume_details(run_import_pipeline(path, False, import_mode='replace', tables=prime))
+
+            started = time.monotonic()
+            stages = run_import_pipeline(path, False, import_mode=options['mode'], tables=tables)
+            run = {
+                'rows': rows,
+                'seconds': round(time.monotonic() - started, 2),
+                'peak_rss_mb': peak_rss_mb(),
+                'tables': {},
+            }
+            for stage in stages:
+                if stage['results'] is None:
+                    self.stdout.write(self.style.WARNING(f"{rows} rows, {stage['table']}: {stage['error']}"))
+                    continue
+                stats = stage['results']['stats']
+                seconds = stage['seconds']
+                run['tables'][stage['table']] = {
+                    'rows': stats['processed'],
+                    'failed': stats['failed'],
+                    'seconds': seconds,
+                    'rows_per_second': round(stats['processed'] / seconds) if seconds else None,
+                    'queries': stage['queries'],
+                }
+            consume_details(stages)
+            results['runs'].append(run)
+            self.report_run(run)
+        return results
+
+    def report_run(self, run):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{run['rows']} rows: {run['seconds']:.1f}s, peak memory {run['peak_rss_mb']} MB"
+        ))
+        for table, measured in run['tables'].items():
+            self.stdout.write(
+                f"  {table}: {measured['rows']} rows in {measured['seconds']:.2f}s "
+                f"({measured['rows_per_second'] or '-'} rows/s), {measured['queries']} queries"
+            )
+
+    def compare(self, baseline, results, tolerance):
+        """Print the change of every table against a baseline. Returns the number of regressions."""
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Compared with {baseline.get('commit') or 'baseline'} ({baseline.get('created_at', '?')})"
+        ))
+        earlier_runs = {run['rows']: run for run in baseline.get('runs', [])}
+        regressions = 0
+        for run in results['runs']:
+            earlier = earlier_runs.get(run['rows'])
+            if not earlier:
+                self.stdout.write(f"  {run['rows']} rows: not in the baseline")
+                continue
+            for table, measured in run['tables'].items():
+                before = earlier['tables'].get(table)
+                if not before or not before['rows_per_second'] or not measured['rows_per_second']:
+                    continue
+                speed = (measured['rows_per_second'] / before['rows_per_second'] - 1) * 100
+                queries = (measured['queries'] / before['queries'] - 1) * 100 if before['queries'] else 0
+                regressed = speed < -tolerance or queries > tolerance
+                regressions += regressed
+                style = self.style.ERROR if regressed else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"  {run['rows']} rows, {table}: {before['rows_per_second']} -> "
+                    f"{measured['rows_per_second']} rows/s ({speed:+.1f}%), "
+                    f"{before['queries']} -> {measured['queries']} queries"
+                ))
+            if run['peak_rss_mb'] and earlier.get('peak_rss_mb'):
+                self.stdout.write(
+                    f"  {run['rows']} rows, peak memory: {earlier['peak_rss_mb']} -> {run['peak_rss_mb']} MB"
+                )
+        return regressions
@@ -0,0 +1,18 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from collection.utils.text_index import rebuild_text_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the chat assistant's BM25 text index from the database"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Building the text index in {settings.TEXT_INDEX_DIR}")
+        started = time.monotonic()
+        documents, terms = rebuild_text_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {documents} record(s) and {terms} term(s) in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,350 @@
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from collection.models import (
+    Caliber, Country, Manufacturer, Headstamp, Load, Date, Variation, Box, ImageFileIndex,
+)
+from collection.utils.image_index import is_image_path, read_image_stats, build_index_entry, release_image
+
+# Record types that can receive images, with their upload sub-directory
+IMAGE_TYPES = {
+    'headstamp': {'model': Headstamp, 'subdir': 'headstamps'},
+    'load': {'model': Load, 'subdir': 'loads'},
+    'date': {'model': Date, 'subdir': 'dates'},
+    'variation': {'model': Variation, 'subdir': 'variations'},
+    'box': {'model': Box, 'subdir': 'boxes'},
+}
+
+MANIFEST_NAME = 'image_import_manifest.jsonl'
+
+
+class Command(BaseCommand):
+    help = 'Import a directory of image files into collection records, in parallel and resumably'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            required=True,
+            help='Directory containing the image files to import',
+        )
+        parser.add_argument(
+            '--caliber',
+            default='9mmP',
+            help='Caliber code whose records receive the images (default: 9mmP)',
+        )
+        parser.add_argument(
+            '--type',
+            choices=list(IMAGE_TYPES) + ['all'],
+            default='all',
+            help='Record type to match file names against (default: all)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Number of threads used to copy files (default: 8)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of files copied and saved per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--manifest',
+            help=f'Manifest of completed files used to resume (default: <source>/{MANIFEST_NAME})',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the manifest and import every file again',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the matches without copying files or updating records',
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Show every matched and unmatched file',
+        )
+
+    def handle(self, *args, **options):
+        source_dir = os.path.abspath(os.path.expanduser(options['source']))
+        dry_run = options['dry_run']
+        verbose = options['verbose']
+        batch_size = max(1, options['batch_size'])
+        types = list(IMAGE_TYPES) if options['type'] == 'all' else [options['type']]
+        manifest_path = options['manifest'] or os.path.join(source_dir, MANIFEST_NAME)
+
+        if not os.path.isdir(source_dir):
+            raise CommandError(f"Source directory doesn't exist: {source_dir}")
+
+        try:
+            caliber = Caliber.objects.get(code=options['caliber'])
+        except Caliber.DoesNotExist:
+            raise CommandError(f"Caliber '{options['caliber']}' not found")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        # Files completed by an earlier run, keyed by name with their size/mtime
+        completed = {} if options['restart'] else self.load_manifest(manifest_path)
+
+        source_files = []
+        resumed = 0
+        with os.scandir(source_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not is_image_path(entry.name):
+                    continue
+                stat = entry.stat()
+                signature = (stat.st_size, int(stat.st_mtime))
+                if completed.get(entry.name) == signature:
+                    resumed += 1
+                    continue
+                source_files.append((entry.name, signature))
+
+        self.stdout.write(
+            f"Found {len(source_files) + resumed} image files in {source_dir} "
+            f"({resumed} already imported)"
+        )
+
+        lookups = {record_type: self.build_lookup(record_type, caliber) for record_type in types}
+
+        # Match every file name against the lookups without touching the database again
+        jobs = []
+        unmatched = []
+        # Target path -> the file copied there. Extensions are lowercased, so X.JPG and X.jpg
+        # would land on the same target; the first in name order wins
+        claimed = {}
+        conflicts = 0
+        for filename, signature in sorted(source_files):
+            stem, ext = os.path.splitext(filename)
+            ext = ext.lower()
+            targets = []
+            for record_type in types:
+                for record_id, target_name in lookups[record_type].get(stem, []):
+                    target = f"{caliber.code}/{IMAGE_TYPES[record_type]['subdir']}/{target_name}{ext}"
+                    if claimed.setdefault(target, filename) != filename:
+                        conflicts += 1
+                        self.stdout.write(self.style.WARNING(
+                            f"  Skipping {filename} for {target}: {claimed[target]} is copied there"
+                        ))
+                        continue
+                    targets.append((record_type, record_id, target))
+            if targets:
+                jobs.append((filename, signature, targets))
+                if verbose:
+                    for record_type, record_id, target in targets:
+                        self.stdout.write(f"  {filename} -> {record_type} {record_id} ({target})")
+            elif not any(lookups[record_type].get(stem) for record_type in types):
+                unmatched.append(filename)
+                if verbose:
+                    self.stdout.write(self.style.WARNING(f"  No matching record for {filename}"))
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f"DRY RUN COMPLETE: {len(jobs)} files would be imported, {len(unmatched)} unmatched"
+            ))
+            return
+
+        copied = skipped = failed = 0
+        records_updated = 0
+
+        with open(manifest_path, 'a', encoding='utf-8') as manifest, \
+                ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            for start in range(0, len(jobs), batch_size):
+                batch = jobs[start:start + batch_size]
+                copy_tasks = [
+                    (os.path.join(source_dir, filename), target)
+                    for filename, signature, targets in batch
+                    for record_type, record_id, target in targets
+                ]
+                outcomes = dict(zip(
+                    [target for _, target in copy_tasks],
+                    executor.map(lambda task: self.copy_file(*task), copy_tasks),
+                ))
+
+                done_files = []
+                updates = {record_type: [] for record_type in types}
+                index_paths = set()
+                for filename, signature, targets in batch:
+                    ok = True
+                    for record_type, record_id, target in targets:
+                        outcome = outcomes[target]
+                        if outcome == 'copied':
+                            copied += 1
+                        elif outcome == 'skipped':
+                            skipped += 1
+                        else:
+                            ok = False
+                            failed += 1
+                            self.stdout.write(self.style.ERROR(f"  Error copying {filename}: {outcome}"))
+                            continue
+                        updates[record_type].append((record_id, target))
+                        index_paths.add(target)
+                    if ok:
+                        done_files.append((filename, signature))
+
+                records_updated += self.save_batch(updates, index_paths)
+
+                # Only record files once their records are committed
+                for filename, (size, mtime) in done_files:
+                    manifest.write(json.dumps({'file': filename, 'size': size, 'mtime': mtime}) + '\n')
+                manifest.flush()
+
+                self.stdout.write(f"Processed {min(start + batch_size, len(jobs))}/{len(jobs)} files")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Import complete: {records_updated} records updated, {copied} files copied, "
+            f"{skipped} already in place, {failed} failed, {len(unmatched)} unmatched, "
+            f"{conflicts} skipped as duplicate targets"
+        ))
+
+    def load_manifest(self, manifest_path):
+        """Read the manifest of completed files into {name: (size, mtime)}"""
+        completed = {}
+        if not os.path.exists(manifest_path):
+            return completed
+        with open(manifest_path, encoding='utf-8') as manifest:
+            for line in manifest:
+                try:
+                    entry = json.loads(line)
+                    completed[entry['file']] = (entry['size'], entry['mtime'])
+                except (ValueError, KeyError):
+                    # A partially written last line from an interrupted run
+                    continue
+        return completed
+
+    def build_lookup(self, record_type, caliber):
+        """
+        Build {file stem: [(record_id, target file name)]} for one record type
+        with a single query. Target names follow the upload_to functions in models.py.
+        """
+        lookup = {}
+
+        if record_type == 'headstamp':
+            rows = Headstamp.objects.filter(
+                manufacturer__country__caliber=caliber
+            ).values_list('id', 'code', 'manufacturer__code', 'manufacturer__country_id')
+            for record_id, code, manufacturer_code, country_id in rows:
+                lookup.setdefault(code, []).append((record_id, f"{country_id}_{manufacturer_code}_{code}"))
+            return lookup
+
+        if record_type == 'box':
+            qs = Box.objects.filter(self.box_scope(caliber))
+            key_field = 'bid'
+        elif record_type == 'load':
+            qs = Load.objects.filter(headstamp__manufacturer__country__caliber=caliber)
+            key_field = 'cart_id'
+        elif record_type == 'date':
+            qs = Date.objects.filter(load__headstamp__manufacturer__country__caliber=caliber)
+            key_field = 'cart_id'
+        else:
+            qs = Variation.objects.filter(
+                Q(load__headstamp__manufacturer__country__caliber=caliber) |
+                Q(date__load__headstamp__manufacturer__country__caliber=caliber)
+            )
+            key_field = 'cart_id'
+
+        for record_id, key in qs.values_list('id', key_field):
+            lookup.setdefault(key, []).append((record_id, key))
+        return lookup
+
+    def box_scope(self, caliber):
+        """Filter for boxes attached anywhere within a caliber"""
+        countries = Country.objects.filter(caliber=caliber).values('id')
+        manufacturers = Manufacturer.objects.filter(country__caliber=caliber).values('id')
+        headstamps = Headstamp.objects.filter(manufacturer__country__caliber=caliber).values('id')
+        loads = Load.objects.filter(headstamp__manufacturer__country__caliber=caliber).values('id')
+        dates = Date.objects.filter(load__headstamp__manufacturer__country__caliber=caliber).values('id')
+        variations = Variation.objects.filter(
+            Q(load__in=loads) | Q(date__in=dates)
+        ).values('id')
+
+        scope = Q()
+        for model, ids in ((Country, countries), (Manufacturer, manufacturers), (Headstamp, headstamps),
+                           (Load, loads), (Date, dates), (Variation, variations)):
+            scope |= Q(content_type=ContentType.objects.get_for_model(model), object_id__in=ids)
+        return scope
+
+    def copy_file(self, source_path, target):
+        """
+        Copy one file into MEDIA_ROOT. Runs in a worker thread.
+
+        Returns:
+            str: 'copied', 'skipped' (same size already in place) or an error message
+        """
+        target_path = os.path.join(settings.MEDIA_ROOT, target)
+        try:
+            if os.path.exists(target_path) and os.path.getsize(target_path) == os.path.getsize(source_path):
+                return 'skipped'
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            # Copy to a temporary name first so an interrupted copy never looks complete
+            temp_path = f"{target_path}.part"
+            shutil.copy2(source_path, temp_path)
+            os.replace(temp_path, target_path)
+            return 'copied'
+        except OSError as e:
+            return str(e)
+
+    def save_batch(self, updates, index_paths):
+        """
+        Point the records at their new images and refresh the image index.
+        bulk_update bypasses the signals that normally do this, so the images
+        the records held before are released here as well.
+        """
+        now = timezone.now()
+        records_updated = 0
+        replaced = set()
+
+        with transaction.atomic():
+            for record_type, rows in updates.items():
+                if not rows:
+                    continue
+                model = IMAGE_TYPES[record_type]['model']
+                new_images = dict(rows)
+                for record_id, old_image in model.objects.filter(id__in=new_images).values_list('id', 'image'):
+                    if old_image and old_image != new_images[record_id]:
+                        replaced.add(old_image)
+                objs = [model(id=record_id, image=target, updated_at=now) for record_id, target in rows]
+                model.objects.bulk_update(objs, ['image', 'updated_at'])
+                records_updated += len(objs)
+
+            entries = []
+            for record_type, rows in updates.items():
+                if not rows:
+                    continue
+                ct_id = ContentType.objects.get_for_model(IMAGE_TYPES[record_type]['model']).id
+                for record_id, target in rows:
+                    if target not in index_paths:
+                        continue
+                    index_paths.discard(target)
+                    stats = read_image_stats(target)
+                    if stats:
+                        entries.append(build_index_entry(target, stats, ct_id, record_id))
+
+            ImageFileIndex.objects.bulk_create(
+                entries,
+                update_conflicts=True,
+                unique_fields=['path'],
+                update_fields=['caliber_code', 'record_type', 'size', 'width', 'height',
+                               'mtime', 'year', 'content_type', 'object_id'],
+            )
+
+            # Another record of this batch may have taken the old file over; it was indexed above
+            new_paths = {target for rows in updates.values() for _, target in rows}
+            for old_image in replaced - new_paths:
+                release_image(old_image)
+
+        return records_updated
@@ -0,0 +1,218 @@
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from collection.utils.chat_log import chat_log_paths, percentile
+from collection.utils.mock_anthropic import load_scripts
+
+
+def mean(values):
+    return sum(values) / len(values)
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive concurrent simulated users through the chat of a running site and report throughput, '
+        'latency, worker saturation and where the server spent its time. Run the site against '
+        'mock_anthropic_server to avoid real API calls.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Site to test (default: http://127.0.0.1:8000)')
+        parser.add_argument('--username', required=True, help='Account the simulated users log in with')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--users', type=int, default=10, help='Concurrent simulated users (default: 10)')
+        parser.add_argument('--messages', type=int, default=5, help='Messages each user sends (default: 5)')
+        parser.add_argument(
+            '--think-time',
+            type=float,
+            default=0.0,
+            help='Seconds a user waits between messages (default: 0)',
+        )
+        parser.add_argument('--stream', action='store_true', help='Use the streaming endpoint (chat/stream/)')
+        parser.add_argument('--caliber', default='9mmP', help='Caliber of the page messages are sent from (default: 9mmP)')
+        parser.add_argument(
+            '--transcripts',
+            help='JSON file of scripts whose messages are sent (default: the chat logs, else built-in examples)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Requests the site can serve at once (workers x threads), to report utilisation',
+        )
+        parser.add_argument('--timeout', type=float, default=120.0, help='Seconds before a request fails (default: 120)')
+        parser.add_argument(
+            '--log-dir',
+            help="Site's chat log directory, for the server-side breakdown (default: CHAT_LOG_DIR)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            scripts = load_scripts(options['transcripts'], options['log_dir'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read transcripts: {e}")
+        messages = [script['message'] for script in scripts if script.get('message')]
+        if not messages:
+            raise CommandError('No messages to send')
+
+        # Marks this run's exchanges in the chat log
+        run_id = uuid.uuid4().hex[:8]
+        page = f"/{options['caliber']}/#load-test-{run_id}"
+        started_at = timezone.now()
+
+        self.stdout.write(
+            f"{options['users']} user(s) x {options['messages']} message(s) against {options['url']} "
+            f"({'streaming' if options['stream'] else 'chat/'}, run {run_id})"
+        )
+        ready = threading.Barrier(options['users'])
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['users']) as pool:
+            futures = [
+                pool.submit(self.simulate_user, n, options, messages, page, ready)
+                for n in range(options['users'])
+            ]
+            samples = [sample for future in futures for sample in future.result()]
+        elapsed = time.monotonic() - started
+
+        self.report_client(samples, elapsed, options)
+        # The site writes its log from a background thread
+        time.sleep(2)
+        self.report_server(samples, elapsed, started_at, page, options)
+
+    def simulate_user(self, number, options, messages, page, ready):
+        """Log in, then send messages one after another. Returns one sample per message."""
+        samples = []
+        with httpx.Client(base_url=options['url'], timeout=options['timeout']) as client:
+            try:
+                self.log_in(client, options['username'], options['password'])
+                client.post('/chat/clear/', headers=self.csrf_headers(client))
+            except httpx.HTTPError as e:
+                ready.abort()
+                raise CommandError(f"User {number} could not log in: {e}")
+            try:
+                ready.wait()
+            except threading.BrokenBarrierError:
+                return samples
+
+            for i in range(options['messages']):
+                message = messages[(number + i) % len(messages)]
+                samples.append(self.send(client, message, page, options['stream']))
+                if options['think_time']:
+                    time.sleep(options['think_time'])
+        return samples
+
+    def log_in(self, client, username, password):
+        client.get('/login/')
+        response = client.post('/login/', data={
+            'username': username, 'password': password,
+            'csrfmiddlewaretoken': client.cookies.get('csrftoken', ''),
+        }, headers=self.csrf_headers(client))
+        if response.status_code != 302:
+            raise httpx.HTTPError(f"login answered {response.status_code}")
+
+    def csrf_headers(self, client):
+        return {'X-CSRFToken': client.cookies.get('csrftoken', ''), 'Referer': str(client.base_url)}
+
+    def send(self, client, message, page, stream):
+        """Send one message; returns (status, seconds, seconds to first text or None)"""
+        body = json.dumps({'message': message, 'current_page': page})
+        headers = dict(self.csrf_headers(client), **{'Content-Type': 'application/json'})
+        started = time.monotonic()
+        first_text = None
+        try:
+            if not stream:
+                response = client.post('/chat/', content=body, headers=headers)
+                return response.status_code, time.monotonic() - started, None
+            with client.stream('POST', '/chat/stream/', content=body, headers=headers) as response:
+                status = response.status_code
+                for line in response.iter_lines():
+                    if first_text is None and line == 'event: text':
+                        first_text = time.monotonic() - started
+                    if line == 'event: error':
+                        status = 'stream error'
+            return status, time.monotonic() - started, first_text
+        except httpx.HTTPError as e:
+            return type(e).__name__, time.monotonic() - started, None
+
+    def report_client(self, samples, elapsed, options):
+        ok = [seconds for status, seconds, _ in samples if status == 200]
+        failures = Counter(status for status, _, _ in samples if status != 200)
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Client side'))
+        self.stdout.write(f"  Requests: {len(samples)} in {elapsed:.1f}s, {len(ok)} succeeded")
+        for status, count in failures.most_common():
+            self.stdout.write(self.style.ERROR(f"  Failed with {status}: {count}"))
+        self.stdout.write(f"  Throughput: {len(ok) / elapsed:.2f} replies/s")
+        if ok:
+            self.stdout.write(
+                f"  Latency: p50 {percentile(ok, 50):.2f}s, p95 {percentile(ok, 95):.2f}s, max {max(ok):.2f}s"
+            )
+        first_text = [first for status, _, first in samples if status == 200 and first is not None]
+        if first_text:
+            self.stdout.write(
+                f"  First text: p50 {percentile(first_text, 50):.2f}s, p95 {percentile(first_text, 95):.2f}s"
+            )
+
+    def report_server(self, samples, elapsed, started_at, page, options):
+        """Break the site's time down from the chat log records of this run"""
+        records = []
+        for path in chat_log_paths(options['log_dir']):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        if record.get('page') == page and datetime.fromisoformat(record['ts']) >= started_at:
+                            records.append(record)
+                    except (ValueError, KeyError):
+                        continue
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Server side (from the chat log)'))
+        if not records:
+            self.stdout.write(self.style.WARNING(
+                "  No records of this run found; pass --log-dir with the site's CHAT_LOG_DIR"
+            ))
+            return
+
+        server, api, tools, tool_calls = [], [], [], []
+        for record in records:
+            server.append(record['seconds'])
+            api.append(sum(r['seconds'] for r in record.get('rounds', [])))
+            # Tools of one round run concurrently, so a round takes as long as its slowest tool
+            slowest = {}
+            for tool in record.get('tools', []):
+                seconds = tool.get('seconds') or 0
+                tool_calls.append(seconds)
+                slowest[tool.get('round')] = max(slowest.get(tool.get('round'), 0), seconds)
+            tools.append(sum(slowest.values()))
+
+        other = [s - a - t for s, a, t in zip(server, api, tools)]
+        self.stdout.write(
+            f"  Exchanges: {len(records)}, p50 {percentile(server, 50):.2f}s, p95 {percentile(server, 95):.2f}s"
+        )
+        total = mean(server) or 1
+        for label, values in (('Model API', api), ('Tools (database)', tools), ('Other (session, history, prompt)', other)):
+            self.stdout.write(f"  {label}: {mean(values):.3f}s per exchange ({mean(values) * 100 / total:.0f}%)")
+        if tool_calls:
+            self.stdout.write(
+                f"  Tool calls: {len(tool_calls)}, p50 {percentile(tool_calls, 50):.3f}s, "
+                f"p95 {percentile(tool_calls, 95):.3f}s"
+            )
+
+        ok = [seconds for status, seconds, _ in samples if status == 200]
+        if ok:
+            # Time between the client sending and the view starting: waiting for a free worker
+            self.stdout.write(f"  Queueing before a worker picked a request up: {max(0.0, mean(ok) - mean(server)):.2f}s on average")
+        # Little's law: requests being worked on at once
+        busy = len(records) / elapsed * mean(server)
+        line = f"  Requests in progress on the site: {busy:.1f} on average, {options['users']} offered"
+        if options['workers']:
+            line += f"; {busy * 100 / options['workers']:.0f}% of {options['workers']} worker slot(s)"
+        self.stdout.write(line)
@@ -0,0 +1,145 @@
+import json
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from collection.utils.chat_log import chat_log_paths, percentile
+
+# US dollars per million tokens: input, output, cache write, cache read
+MODEL_PRICES = {
+    'claude-sonnet-4': (3.00, 15.00, 3.75, 0.30),
+    'claude-3-5-haiku': (0.80, 4.00, 1.00, 0.08),
+    'claude-3-7-sonnet': (3.00, 15.00, 3.75, 0.30),
+    'claude-opus-4': (15.00, 75.00, 18.75, 1.50),
+}
+
+
+def exchange_cost(record):
+    """Estimated cost of an exchange in US dollars, or None for a model without a known price"""
+    model = record.get('model') or ''
+    prices = next((p for prefix, p in MODEL_PRICES.items() if model.startswith(prefix)), None)
+    if prices is None:
+        return None
+    tokens = (
+        record.get('input_tokens', 0), record.get('output_tokens', 0),
+        record.get('cache_creation_input_tokens', 0), record.get('cache_read_input_tokens', 0),
+    )
+    return sum(count * price for count, price in zip(tokens, prices)) / 1_000_000
+
+
+class Command(BaseCommand):
+    help = 'Report latency percentiles, token usage and cost of the chat assistant from its JSONL logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only exchanges of the last N days (default: everything logged)',
+        )
+        parser.add_argument(
+            '--since',
+            help='Only exchanges from this date on (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--log-dir',
+            help='Directory of the logs (default: CHAT_LOG_DIR)',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = timezone.make_aware(datetime.combine(datetime.strptime(options['since'], '%Y-%m-%d'), time()))
+            except ValueError:
+                raise CommandError(f"Invalid --since date: {options['since']}")
+        elif options['days']:
+            since = timezone.now() - timedelta(days=options['days'])
+
+        paths = chat_log_paths(options['log_dir'])
+        if not paths:
+            raise CommandError('No chat logs found')
+
+        records = []
+        skipped = 0
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        logged_at = datetime.fromisoformat(record['ts'])
+                    except (ValueError, KeyError):
+                        skipped += 1
+                        continue
+                    if since is None or logged_at >= since:
+                        records.append(record)
+
+        if not records:
+            self.stdout.write('No exchanges in this period')
+            return
+
+        self.report(records, skipped)
+
+    def report(self, records, skipped):
+        errors = [r for r in records if r.get('error')]
+        rounds = [rnd for r in records for rnd in r.get('rounds', [])]
+        tools = [tool for r in records for tool in r.get('tools', [])]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{len(records)} exchange(s) from {records[0]['ts'][:16]} to {records[-1]['ts'][:16]}"
+        ))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"Skipped {skipped} unreadable line(s)"))
+        self.stdout.write(f"  Errors: {len(errors)}")
+        self.stdout.write(f"  Streamed: {sum(1 for r in records if r.get('streamed'))}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Latency (seconds)'))
+        self.write_percentiles('Exchange', [r['seconds'] for r in records if not r.get('error')])
+        self.write_percentiles('API round', [rnd['seconds'] for rnd in rounds])
+        self.write_percentiles('Tool call', [tool['seconds'] for tool in tools if tool.get('seconds') is not None])
+        by_tool = defaultdict(list)
+        for tool in tools:
+            if tool.get('seconds') is not None:
+                by_tool[tool['name']].append(tool['seconds'])
+        for name, seconds in sorted(by_tool.items()):
+            self.write_percentiles(f"  {name}", seconds)
+
+        if tools:
+            hits = sum(1 for tool in tools if tool.get('cached'))
+            self.stdout.write(
+                f"  Tool cache: {hits} hit(s) of {len(tools)} call(s) ({hits * 100 / len(tools):.0f}%)"
+            )
+        self.stdout.write(f"  API rounds per exchange: {len(rounds) / len(records):.2f}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Tokens'))
+        totals = {
+            field: sum(r.get(field, 0) for r in records)
+            for field in ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
+        }
+        for field, total in totals.items():
+            self.stdout.write(f"  {field}: {total} ({total / len(records):.0f} per exchange)")
+        prompt_tokens = totals['input_tokens'] + totals['cache_creation_input_tokens'] + totals['cache_read_input_tokens']
+        if prompt_tokens:
+            self.stdout.write(
+                f"  Prompt cache reads: {totals['cache_read_input_tokens'] * 100 / prompt_tokens:.0f}% of prompt tokens"
+            )
+
+        costs = [exchange_cost(r) for r in records]
+        priced = [c for c in costs if c is not None]
+        self.stdout.write(self.style.MIGRATE_HEADING('Cost (USD, estimated)'))
+        if priced:
+            self.stdout.write(f"  Total: ${sum(priced):.4f}")
+            self.write_percentiles('Per exchange', priced, digits=4, unit='$')
+        if len(priced) < len(costs):
+            self.stdout.write(self.style.WARNING(f"  {len(costs) - len(priced)} exchange(s) with unknown model prices"))
+
+    def write_percentiles(self, label, values, digits=2, unit=''):
+        if not values:
+            self.stdout.write(f"  {label}: no data")
+            return
+        p50, p95 = percentile(values, 50), percentile(values, 95)
+        self.stdout.write(
+            f"  {label}: p50 {unit}{p50:.{digits}f}, p95 {unit}{p95:.{digits}f}, "
+            f"max {unit}{max(values):.{digits}f} (n={len(values)})"
+        )
@@ -0,0 +1,46 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from collection.views.import_views import IMPORTERS, diff_legacy_database
+
+
+class Command(BaseCommand):
+    help = 'Preview what importing a legacy SQLite database would change, as a JSONL change set'
+
+    def add_arguments(self, parser):
+        parser.add_argument('database', help='Path of the legacy SQLite file')
+        parser.add_argument(
+            '--output',
+            default='changes.jsonl',
+            help='Change-set file to write, gzipped when it ends in .gz (default: changes.jsonl)',
+        )
+        parser.add_argument(
+            '--tables',
+            nargs='+',
+            choices=list(IMPORTERS),
+            help='Only compare these tables (default: all)',
+        )
+
+    def handle(self, *args, **options):
+        database = options['database']
+        if not os.path.isfile(database):
+            raise CommandError(f"Legacy database not found: {database}")
+
+        started = time.monotonic()
+        summary = diff_legacy_database(database, options['output'], tables=options['tables'])
+        elapsed = time.monotonic() - started
+
+        for table, counts in summary.items():
+            if counts is None:
+                self.stdout.write(self.style.WARNING(f"{table}: table not found in the legacy database"))
+                continue
+            style = self.style.WARNING if counts['conflict'] else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{table}: {counts['new']} new, {counts['changed']} changed, {counts['missing']} missing, "
+                f"{counts['conflict']} conflicts, {counts['unchanged']} unchanged"
+                + (f", {counts['local']} created in the app" if counts['local'] else "")
+            ))
+
+        self.stdout.write(f"Change set written to {options['output']} in {elapsed:.1f}s")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from collection.utils.import_store import JOB_RETENTION, UPLOAD_RETENTION, expire_imports
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired legacy-import uploads, finished import jobs with their reports, expired sessions '
+        'and their chat conversations'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Removing uploads older than {UPLOAD_RETENTION} and finished jobs older than {JOB_RETENTION}"
+        )
+        removed = expire_imports()
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {removed['uploads']} upload(s), {removed['jobs']} job(s), "
+            f"{removed['files']} stray file(s) and {removed['conversations']} chat conversation(s)"
+        ))
@@ -0,0 +1,152 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from collection.models import ImageFileIndex, ImageHash
+from collection.utils.image_hash import (
+    DEFAULT_MAX_DISTANCE, HASH_BANDS, compute_image_hashes, hash_bands, to_signed, to_unsigned,
+    near_duplicate_report, similar_images,
+)
+from collection.utils.image_index import normalize_path
+
+
+class Command(BaseCommand):
+    help = 'Hash indexed images and report near-duplicates by perceptual hash distance'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--distance',
+            type=int,
+            default=DEFAULT_MAX_DISTANCE,
+            help=f'Largest Hamming distance counted as a duplicate (default: {DEFAULT_MAX_DISTANCE})',
+        )
+        parser.add_argument(
+            '--caliber',
+            help='Only consider images of this caliber code',
+        )
+        parser.add_argument(
+            '--type',
+            action='append',
+            choices=['headstamp', 'load', 'date', 'variation', 'box', 'caliber', 'other'],
+            help='Only consider these record types (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 2,
+            help='Number of processes used for hashing (default: CPU count)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of hashes saved per bulk write (default: 500)',
+        )
+        parser.add_argument(
+            '--rehash',
+            action='store_true',
+            help='Recompute hashes even for unchanged files',
+        )
+        parser.add_argument(
+            '--skip-hashing',
+            action='store_true',
+            help='Report from the stored hashes without hashing new files',
+        )
+        parser.add_argument(
+            '--similar-to',
+            help='Only list images similar to this media path (uses the indexed hash bands)',
+        )
+
+    def handle(self, *args, **options):
+        max_distance = options['distance']
+
+        if not options['skip_hashing']:
+            self.update_hashes(options)
+
+        if options['similar_to']:
+            self.report_similar(normalize_path(options['similar_to']), max_distance)
+            return
+
+        groups = near_duplicate_report(max_distance, options['caliber'], options['type'])
+
+        for number, group in enumerate(groups, start=1):
+            self.stdout.write(
+                f"Group {number}: {len(group['images'])} images, max distance {group['max_distance']}"
+            )
+            for image in group['images']:
+                owner = f"{image.content_type.model} {image.object_id}" if image.content_type_id else 'orphan'
+                self.stdout.write(f"  {image.path} ({owner}, {image.size} bytes)")
+
+        duplicates = sum(len(group['images']) - 1 for group in groups)
+        self.stdout.write(self.style.SUCCESS(
+            f"Found {len(groups)} near-duplicate groups ({duplicates} redundant images) "
+            f"within distance {max_distance}"
+        ))
+
+    def update_hashes(self, options):
+        """Hash new or modified images in a process pool and store the results"""
+        entries = ImageFileIndex.objects.select_related('hash')
+        if options['caliber']:
+            entries = entries.filter(caliber_code=options['caliber'])
+        if options['type']:
+            entries = entries.filter(record_type__in=options['type'])
+
+        pending = {}
+        for entry in entries.iterator(chunk_size=2000):
+            existing = getattr(entry, 'hash', None)
+            if options['rehash'] or existing is None or existing.source_mtime != entry.mtime:
+                pending[os.path.join(settings.MEDIA_ROOT, entry.path)] = entry
+
+        if not pending:
+            self.stdout.write("All image hashes are up to date")
+            return
+
+        self.stdout.write(f"Hashing {len(pending)} images with {options['workers']} workers")
+
+        to_save = []
+        failed = 0
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            results = executor.map(compute_image_hashes, list(pending), chunksize=32)
+            for full_path, dhash_value, phash_value, error in results:
+                entry = pending[full_path]
+                if error:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"  Could not hash {entry.path}: {error}"))
+                    continue
+                bands = hash_bands(phash_value)
+                to_save.append(ImageHash(
+                    image=entry,
+                    dhash=to_signed(dhash_value),
+                    phash=to_signed(phash_value),
+                    band0=bands[0], band1=bands[1], band2=bands[2], band3=bands[3],
+                    source_mtime=entry.mtime,
+                ))
+
+        ImageHash.objects.bulk_create(
+            to_save,
+            batch_size=options['batch_size'],
+            update_conflicts=True,
+            unique_fields=['image'],
+            update_fields=['dhash', 'phash', 'band0', 'band1', 'band2', 'band3', 'source_mtime', 'hashed_at'],
+        )
+        self.stdout.write(f"Stored {len(to_save)} hashes ({failed} failed)")
+
+    def report_similar(self, path, max_distance):
+        """List images close to one indexed image"""
+        try:
+            target = ImageHash.objects.select_related('image').get(image__path=path)
+        except ImageHash.DoesNotExist:
+            raise CommandError(f"No hash stored for {path}; run without --skip-hashing first")
+
+        if max_distance >= HASH_BANDS:
+            self.stdout.write(self.style.WARNING(
+                f"Band lookups are exact only up to distance {HASH_BANDS - 1}; "
+                f"matches beyond that may be missed"
+            ))
+
+        matches = similar_images(to_unsigned(target.phash), max_distance, exclude_id=target.id)
+        for distance, match in matches:
+            self.stdout.write(f"  {distance:2d}  {match.image.path}")
+        self.stdout.write(self.style.SUCCESS(f"Found {len(matches)} images similar to {path}"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from collection.utils.legacy_generator import generate_legacy_database
+
+
+class Command(BaseCommand):
+    help = 'Write a synthetic legacy SQLite database for import testing and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='SQLite file to create (replaced if it exists)')
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Approximate number of rows over all tables (default: 10000)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed; the same rows and seed give the same file (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        if options['rows'] < 100:
+            raise CommandError("--rows must be at least 100")
+
+        sizes = generate_legacy_database(options['output'], rows=options['rows'], seed=options['seed'])
+        for table, count in sizes.items():
+            self.stdout.write(f"{table}: {count} rows")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {sum(sizes.values())} rows to {options['output']}"))
@@ -0,0 +1,109 @@
+import itertools
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from collection.utils.import_diff import read_change_set
+from collection.utils.legacy_resolver import LegacyResolver
+from collection.utils.text_index import rebuild_stale_text_index
+from collection.views.import_views import (
+    IMPORTERS, combine_pipeline_results, pipeline_order, run_import_pipeline,
+)
+
+
+class Command(BaseCommand):
+    help = 'Import a legacy SQLite database end to end, every table in dependency order'
+
+    def add_arguments(self, parser):
+        parser.add_argument('database', help='Path of the legacy SQLite file')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate every stage without writing anything',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['replace', 'merge'],
+            default='replace',
+            help='Replace clears each table first; merge updates changed records only (default: replace)',
+        )
+        parser.add_argument(
+            '--tables',
+            nargs='+',
+            choices=list(IMPORTERS),
+            help='Only import these tables (default: all)',
+        )
+        parser.add_argument(
+            '--changes',
+            help='Apply only the new, changed and missing records of a diff_legacy_database change set '
+                 '(implies --mode merge)',
+        )
+        parser.add_argument(
+            '--report',
+            help='Write the complete report to this file',
+        )
+
+    def handle(self, *args, **options):
+        database = options['database']
+        if not os.path.isfile(database):
+            raise CommandError(f"Legacy database not found: {database}")
+
+        tables = options['tables']
+        only_ids = None
+        if options['changes']:
+            if not os.path.isfile(options['changes']):
+                raise CommandError(f"Change set not found: {options['changes']}")
+            only_ids = read_change_set(options['changes'])
+            options['mode'] = 'merge'
+            tables = [table for table in tables or IMPORTERS if table in only_ids]
+            if not tables:
+                self.stdout.write("The change set has nothing to apply")
+                return
+
+        order = pipeline_order(tables)
+        self.stdout.write(
+            f"{'Dry run: ' if options['dry_run'] else ''}Importing {', '.join(order)} "
+            f"({options['mode']} mode)"
+        )
+
+        resolver = LegacyResolver()
+        started = time.monotonic()
+        stages = run_import_pipeline(
+            database, options['dry_run'], import_mode=options['mode'], tables=tables,
+            resolver=resolver, only_ids=only_ids,
+        )
+        elapsed = time.monotonic() - started
+
+        for stage in stages:
+            if stage['results'] is None:
+                self.stdout.write(self.style.WARNING(f"{stage['table']}: {stage['error']}"))
+                continue
+            stats = stage['results']['stats']
+            seconds = stage['seconds']
+            rate = stats['processed'] / seconds if seconds else 0
+            style = self.style.ERROR if stats['failed'] else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{stage['table']}: {stats['success']} successful, {stats['failed']} failed, "
+                f"{stats['warnings']} warnings in {seconds:.1f}s ({rate:.0f} rows/s)"
+            ))
+
+        if options['verbosity'] >= 2:
+            self.stdout.write("Legacy value lookups:")
+            for name, counts in resolver.stats().items():
+                self.stdout.write(f"  {name}: {counts['hits']} hits, {counts['misses']} misses")
+
+        results = combine_pipeline_results(stages, options['dry_run'])
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as report:
+                report.writelines(itertools.chain([results['summary']], results['details']))
+            self.stdout.write(f"Report written to {options['report']}")
+        else:
+            # Consume the spooled record results so their temp files are removed
+            for _ in results['details']:
+                pass
+
+        if not options['dry_run'] and rebuild_stale_text_index():
+            self.stdout.write("Rebuilt the chat text index")
+
+        self.stdout.write(f"Finished in {elapsed:.1f}s")
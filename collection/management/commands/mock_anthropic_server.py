@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from collection.utils.mock_anthropic import MockMessagesServer, load_scripts
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve a local stand-in for the Anthropic Messages API that replays recorded chat transcripts. '
+        'Point the chat at it with ANTHROPIC_BASE_URL=http://HOST:PORT.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+        parser.add_argument(
+            '--transcripts',
+            help='JSON file of scripts to replay (default: the exchanges in the chat logs, else built-in examples)',
+        )
+        parser.add_argument(
+            '--log-dir',
+            help='Chat log directory to read transcripts from (default: CHAT_LOG_DIR)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=1.0,
+            help='Seconds before the first token of every response (default: 1.0)',
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=0.2,
+            help='Random +/- seconds added to the latency (default: 0.2)',
+        )
+        parser.add_argument(
+            '--chunk-delay',
+            type=float,
+            default=0.02,
+            help='Seconds between streamed chunks (default: 0.02)',
+        )
+        parser.add_argument('--verbose', action='store_true', help='Log every request')
+
+    def handle(self, *args, **options):
+        try:
+            scripts = load_scripts(options['transcripts'], options['log_dir'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read transcripts: {e}")
+        if not scripts:
+            raise CommandError('No transcripts to replay')
+
+        server = MockMessagesServer(
+            (options['host'], options['port']), scripts, latency=options['latency'],
+            jitter=options['jitter'], chunk_delay=options['chunk_delay'], verbose=options['verbose'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Replaying {len(scripts)} transcript(s) on http://{options['host']}:{options['port']} "
+            f"(latency {options['latency']}s +/- {options['jitter']}s)"
+        ))
+        self.stdout.write(f"Start the site with ANTHROPIC_BASE_URL=http://{options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
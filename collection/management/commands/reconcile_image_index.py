@@ -0,0 +1,122 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from collection.models import ImageFileIndex
+from collection.utils.image_index import (
+    iter_media_images, read_image_stats, build_index_entry, image_owner_map,
+)
+
+
+class Command(BaseCommand):
+    help = 'Synchronize the ImageFileIndex table with the files under MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the differences without changing the index',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows per bulk insert/update (default: 1000)',
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='List every added, updated and removed path',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        verbose = options['verbose']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        self.stdout.write(f"Scanning {settings.MEDIA_ROOT}")
+
+        # Load the current index and the image references held by the database
+        indexed = {
+            entry.path: entry
+            # Every field bulk_update writes back, so updating an entry never loads a deferred one
+            for entry in ImageFileIndex.objects.only(
+                'id', 'path', 'size', 'mtime', 'year', 'width', 'height', 'content_type_id', 'object_id'
+            )
+        }
+        owners = image_owner_map()
+
+        to_create = []
+        to_update = []
+        seen = set()
+
+        for path in iter_media_images():
+            seen.add(path)
+            content_type_id, object_id = owners.get(path, (None, None))
+            entry = indexed.get(path)
+
+            if entry is None:
+                stats = read_image_stats(path)
+                if stats is None:
+                    continue
+                to_create.append(build_index_entry(path, stats, content_type_id, object_id))
+                if verbose:
+                    self.stdout.write(f"  + {path}")
+                continue
+
+            # Only re-read files whose size or mtime changed since they were indexed
+            stats = read_image_stats(path, with_dimensions=False)
+            if stats is None:
+                continue
+            changed_file = stats['size'] != entry.size or stats['mtime'] != entry.mtime
+            changed_owner = (entry.content_type_id, entry.object_id) != (content_type_id, object_id)
+
+            if changed_file:
+                stats = read_image_stats(path)
+                for field in ('size', 'mtime', 'year', 'width', 'height'):
+                    setattr(entry, field, stats[field])
+            if changed_owner:
+                entry.content_type_id = content_type_id
+                entry.object_id = object_id
+            if changed_file or changed_owner:
+                to_update.append(entry)
+                if verbose:
+                    self.stdout.write(f"  ~ {path}")
+
+        missing_ids = [entry.id for path, entry in indexed.items() if path not in seen]
+        if verbose:
+            for path in indexed:
+                if path not in seen:
+                    self.stdout.write(f"  - {path}")
+
+        if not dry_run:
+            ImageFileIndex.objects.bulk_create(to_create, batch_size=batch_size)
+            ImageFileIndex.objects.bulk_update(
+                to_update,
+                ['size', 'mtime', 'year', 'width', 'height', 'content_type', 'object_id'],
+                batch_size=batch_size,
+            )
+            for start in range(0, len(missing_ids), batch_size):
+                ImageFileIndex.objects.filter(id__in=missing_ids[start:start + batch_size]).delete()
+
+        referenced_missing = [path for path in owners if path not in seen]
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f"DRY RUN COMPLETE: {len(to_create)} entries would be added, {len(to_update)} updated "
+                f"and {len(missing_ids)} removed ({len(seen)} image files on disk)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Added {len(to_create)}, updated {len(to_update)} and removed {len(missing_ids)} "
+                f"index entries ({len(seen)} image files on disk)"
+            ))
+        if referenced_missing:
+            self.stdout.write(self.style.WARNING(
+                f"{len(referenced_missing)} image paths referenced by records are missing from disk"
+            ))
+            if verbose:
+                for path in referenced_missing:
+                    self.stdout.write(f"  ! {path}")
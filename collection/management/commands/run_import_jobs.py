@@ -0,0 +1,135 @@
+import time
+import traceback
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from collection.models import ImportJob
+from collection.utils.import_store import expire_imports
+from collection.utils.text_index import rebuild_stale_text_index
+from collection.views.import_views import run_import_job
+
+# Seconds between clean-ups of expired uploads, jobs and sessions
+EXPIRE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Run queued legacy-database import jobs (the background worker for the import page)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs currently queued, then exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between queue checks when idle (default: 2)',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=300,
+            help='Fail running jobs whose heartbeat is older than this many seconds (default: 300)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Import worker started")
+        last_expired = None
+
+        while True:
+            close_old_connections()
+            self.fail_stale_jobs(options['stale_after'])
+
+            if last_expired is None or time.monotonic() - last_expired >= EXPIRE_INTERVAL:
+                last_expired = time.monotonic()
+                self.expire()
+
+            job = self.claim_next_job()
+            if job is None:
+                # Imports only mark the text index stale; rebuild it here, off the search path
+                self.rebuild_text_index()
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Running job {job.id}: {job.table_name} from {job.file_name}")
+            try:
+                run_import_job(job)
+                self.stdout.write(self.style.SUCCESS(
+                    f"Job {job.id} completed: {job.success} successful, {job.failed} failed"
+                ))
+            except Exception as e:
+                ImportJob.objects.filter(pk=job.pk).update(
+                    status=ImportJob.STATUS_FAILED,
+                    error=str(e),
+                    finished_at=timezone.now(),
+                )
+                self.stdout.write(self.style.ERROR(f"Job {job.id} failed: {e}"))
+                self.stderr.write(traceback.format_exc())
+
+    def claim_next_job(self):
+        """
+        Atomically move the oldest queued job to running.
+        skip_locked lets several workers share the queue on PostgreSQL; the
+        conditional update keeps the claim safe where row locks are unavailable.
+        """
+        with transaction.atomic():
+            job = ImportJob.objects.select_for_update(skip_locked=True).filter(
+                status=ImportJob.STATUS_QUEUED
+            ).order_by('created_at').first()
+            if job is None:
+                return None
+
+            now = timezone.now()
+            claimed = ImportJob.objects.filter(pk=job.pk, status=ImportJob.STATUS_QUEUED).update(
+                status=ImportJob.STATUS_RUNNING, started_at=now, heartbeat_at=now
+            )
+            if not claimed:
+                return None
+
+        job.refresh_from_db()
+        return job
+
+    def expire(self):
+        """Remove expired uploads, finished jobs and sessions; a failure here must not stop the worker"""
+        try:
+            removed = expire_imports()
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Import clean-up failed: {e}"))
+            return
+        if any(removed.values()):
+            self.stdout.write(
+                f"Expired {removed['uploads']} upload(s), {removed['jobs']} job(s) "
+                f"and {removed['files']} stray file(s)"
+            )
+
+    def rebuild_text_index(self):
+        """Rebuild a missing or stale chat text index; a failure here must not stop the worker"""
+        started = time.monotonic()
+        try:
+            built = rebuild_stale_text_index()
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Text index rebuild failed: {e}"))
+            return
+        if built:
+            self.stdout.write(
+                f"Rebuilt the text index: {built[0]} record(s), {built[1]} term(s) "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+
+    def fail_stale_jobs(self, stale_after):
+        """Mark running jobs as failed when their worker stopped sending heartbeats"""
+        cutoff = timezone.now() - timedelta(seconds=stale_after)
+        stale = ImportJob.objects.filter(status=ImportJob.STATUS_RUNNING, heartbeat_at__lt=cutoff).update(
+            status=ImportJob.STATUS_FAILED,
+            error='The import worker stopped responding before the job finished',
+            finished_at=timezone.now(),
+        )
+        if stale:
+            self.stdout.write(self.style.WARNING(f"Marked {stale} stale job(s) as failed"))
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0009_box_collection__content_8ac318_idx_and_more'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageFileIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True, verbose_name='Relative Path')),
+                ('caliber_code', models.CharField(blank=True, default='', max_length=20, verbose_name='Caliber Code')),
+                ('record_type', models.CharField(blank=True, default='', max_length=20, verbose_name='Record Type')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Size (bytes)')),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('mtime', models.DateTimeField(verbose_name='Modified')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Year Modified')),
+                ('object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Image File',
+                'verbose_name_plural': 'Image File Index',
+                'ordering': ['path'],
+                'indexes': [models.Index(fields=['caliber_code'], name='collection__caliber_ec91b2_idx'), models.Index(fields=['record_type'], name='collection__record__71a8cf_idx'), models.Index(fields=['year'], name='collection__year_b81f47_idx'), models.Index(fields=['content_type', 'object_id'], name='collection__content_c062ca_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0010_imagefileindex'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='headstamp',
+            index=models.Index(fields=['updated_at'], name='collection__updated_db70e7_idx'),
+        ),
+    ]
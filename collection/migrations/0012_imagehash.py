@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0011_headstamp_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dhash', models.BigIntegerField(verbose_name='Difference Hash')),
+                ('phash', models.BigIntegerField(verbose_name='Perceptual Hash')),
+                ('band0', models.PositiveIntegerField()),
+                ('band1', models.PositiveIntegerField()),
+                ('band2', models.PositiveIntegerField()),
+                ('band3', models.PositiveIntegerField()),
+                ('source_mtime', models.DateTimeField(verbose_name='Source Modified')),
+                ('hashed_at', models.DateTimeField(auto_now=True)),
+                ('image', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='hash', to='collection.imagefileindex')),
+            ],
+            options={
+                'verbose_name': 'Image Hash',
+                'verbose_name_plural': 'Image Hashes',
+                'indexes': [models.Index(fields=['band0'], name='collection__band0_ac380d_idx'), models.Index(fields=['band1'], name='collection__band1_7b01e0_idx'), models.Index(fields=['band2'], name='collection__band2_ff22d7_idx'), models.Index(fields=['band3'], name='collection__band3_972fae_idx')],
+            },
+        ),
+    ]
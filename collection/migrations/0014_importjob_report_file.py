@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0013_importjob'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='importjob',
+            name='report',
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='report_file',
+            field=models.CharField(blank=True, default='', help_text='Complete report, relative to MEDIA_ROOT', max_length=500, verbose_name='Report File'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0014_importjob_report_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegacyRowHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50, verbose_name='Model')),
+                ('record_id', models.PositiveIntegerField(help_text='Preserved legacy ID of the record', verbose_name='Record ID')),
+                ('row_hash', models.CharField(max_length=40, verbose_name='Row Hash')),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('model_name', 'record_id')},
+            },
+        ),
+    ]
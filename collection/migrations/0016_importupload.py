@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-19 13:07
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0015_legacyrowhash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='report_file',
+            field=models.CharField(blank=True, default='', help_text='Gzipped complete report, relative to MEDIA_ROOT', max_length=500, verbose_name='Report File'),
+        ),
+        migrations.CreateModel(
+            name='ImportUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255, verbose_name='Uploaded File')),
+                ('file_path', models.CharField(help_text='Relative to MEDIA_ROOT', max_length=500, verbose_name='Stored File Path')),
+                ('tables', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('caliber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_uploads', to='collection.caliber')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='upload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='collection.importupload'),
+        ),
+        migrations.AddIndex(
+            model_name='importjob',
+            index=models.Index(fields=['finished_at'], name='collection__finishe_b7c213_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 import os
+import uuid
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
@@ -7,6 +8,9 @@ from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 from django.conf import settings
 
+from .utils.caliber_lookup import caliber_code_for
+from .utils.image_index import stored_image_exists
+
 # ===============================
 # Image Path Functions 
 # ===============================
@@ -17,13 +21,14 @@ def headstamp_image_path(instance, filename):
     Format: caliber/headstamps/<country_id>_<manufacturer code>_<headstamp code>.<extension>
     """
     # Get the caliber code
-    caliber_code = instance.manufacturer.country.caliber.code
+    caliber_code = (caliber_code_for('manufacturer', instance.manufacturer_id)
+                    or instance.manufacturer.country.caliber.code)
     
     # Get file extension
     ext = os.path.splitext(filename)[1].lower()
     
     # Generate filename using the instance's code, including country_id for uniqueness
-    country_id = instance.manufacturer.country.id
+    country_id = instance.manufacturer.country_id
     new_filename = f"{country_id}_{instance.manufacturer.code}_{instance.code}{ext}"
     
     # Return the full path
@@ -54,7 +59,8 @@ def load_image_path(instance, filename):
     Format: caliber/loads/<cart_id>.<extension>
     """
     # Get the caliber code
-    caliber_code = instance.headstamp.manufacturer.country.caliber.code
+    caliber_code = (caliber_code_for('headstamp', instance.headstamp_id)
+                    or instance.headstamp.manufacturer.country.caliber.code)
     
     # Get file extension
     ext = os.path.splitext(filename)[1].lower()
@@ -71,7 +77,8 @@ def date_image_path(instance, filename):
     Format: caliber/dates/<cart_id>.<extension>
     """
     # Get the caliber code
-    caliber_code = instance.load.headstamp.manufacturer.country.caliber.code
+    caliber_code = (caliber_code_for('load', instance.load_id)
+                    or instance.load.headstamp.manufacturer.country.caliber.code)
     
     # Get file extension
     ext = os.path.splitext(filename)[1].lower()
@@ -88,10 +95,12 @@ def variation_image_path(instance, filename):
     Format: caliber/variations/<cart_id>.<extension>
     """
     # Get the caliber code
-    if instance.load:
-        caliber_code = instance.load.headstamp.manufacturer.country.caliber.code
-    elif instance.date:
-        caliber_code = instance.date.load.headstamp.manufacturer.country.caliber.code
+    if instance.load_id:
+        caliber_code = (caliber_code_for('load', instance.load_id)
+                        or instance.load.headstamp.manufacturer.country.caliber.code)
+    elif instance.date_id:
+        caliber_code = (caliber_code_for('date', instance.date_id)
+                        or instance.date.load.headstamp.manufacturer.country.caliber.code)
     else:
         caliber_code = "unknown"
     
@@ -110,8 +119,13 @@ def box_image_path(instance, filename):
     Format: caliber/boxes/<bid>.<extension>
     """
     # Get the caliber
-    caliber = instance.parent_caliber()
-    caliber_code = caliber.code if caliber else "unknown"
+    caliber_code = None
+    if instance.content_type_id:
+        parent_model = ContentType.objects.get_for_id(instance.content_type_id).model
+        caliber_code = caliber_code_for(parent_model, instance.object_id)
+    if not caliber_code:
+        caliber = instance.parent_caliber()
+        caliber_code = caliber.code if caliber else "unknown"
     
     # Get file extension
     ext = os.path.splitext(filename)[1].lower()
@@ -123,6 +137,22 @@ def box_image_path(instance, filename):
     return f"{caliber_code}/boxes/{new_filename}"
 
 
+class TrackedImageMixin:
+    """Remembers the image path loaded from the database so saves can skip unchanged images"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image_name = instance.__dict__.get('image') or None
+        return instance
+
+    def image_unchanged(self):
+        """True when the image field still holds the stored file it was loaded with"""
+        current = self.image.name if self.image else None
+        loaded = getattr(self, '_loaded_image_name', None)
+        return getattr(self.image, '_committed', True) and current == loaded
+
+
 # ===============================
 # Overall Collection Table 
 # ===============================
@@ -266,7 +296,7 @@ class BaseEntity(models.Model):
     class Meta:
         abstract = True
 
-class BaseCollectionItem(models.Model):
+class BaseCollectionItem(TrackedImageMixin, models.Model):
     """Abstract base class for physical artifacts in the collection"""
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -286,6 +316,10 @@ class BaseCollectionItem(models.Model):
             
         if not hasattr(self.image, 'name') or not self.image.name:
             return
+
+        # Nothing to resolve when the stored image has not changed
+        if self.image_unchanged():
+            return
             
         # Get the model name
         model_name = self.__class__.__name__
@@ -294,9 +328,7 @@ class BaseCollectionItem(models.Model):
         desired_name = common_collection_image_path(self, self.image.name)
                 
         # Check if this file already exists in MEDIA_ROOT
-        full_path = os.path.join(settings.MEDIA_ROOT, desired_name)
-        
-        if os.path.exists(full_path):
+        if stored_image_exists(desired_name):
             
             # For uploaded files, we need a more aggressive approach
             if hasattr(self.image, 'file'):
@@ -314,6 +346,7 @@ class BaseCollectionItem(models.Model):
         self.check_duplicate_image()
         
         super().save(*args, **kwargs)
+        self._loaded_image_name = self.image.name if self.image else None
 
     def image_count(self):
         """Return 1 if this item has an image, 0 otherwise"""
@@ -426,7 +459,7 @@ class Manufacturer(BaseEntity):
         ]
 
 
-class Headstamp(models.Model):
+class Headstamp(TrackedImageMixin, models.Model):
     """Headstamp model - not a physical artifact but needs images and credibility"""
     code = models.CharField("Headstamp Code", max_length=100)
     name = models.CharField("Headstamp Name", max_length=255, blank=True, null=True)
@@ -444,14 +477,12 @@ class Headstamp(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     def save(self, *args, **kwargs):
-        if self.image and hasattr(self.image, 'name'):
+        if self.image and hasattr(self.image, 'name') and not self.image_unchanged():
             # Get the path that would be generated
             desired_name = headstamp_image_path(self, self.image.name)
             
             # Check if this file already exists in MEDIA_ROOT
-            full_path = os.path.join(settings.MEDIA_ROOT, desired_name)
-            
-            if os.path.exists(full_path):
+            if stored_image_exists(desired_name):
                 # File exists - use the more aggressive approach that worked for Load
                 if hasattr(self.image, 'file'):
                     # Close the file and replace the entire image object with the path
@@ -462,6 +493,7 @@ class Headstamp(models.Model):
                     self.image.name = desired_name
         
         super().save(*args, **kwargs)
+        self._loaded_image_name = self.image.name if self.image else None
 
     def __str__(self):
         caliber_code = self.manufacturer.country.caliber.code
@@ -518,6 +550,7 @@ class Headstamp(models.Model):
         indexes = [
             models.Index(fields=['manufacturer']),  # Critical for manufacturer-based queries
             models.Index(fields=['manufacturer', 'code']),  # Composite for lookups
+            models.Index(fields=['updated_at']),  # For recent activities and the image gallery
         ]
 
 
@@ -1157,4 +1190,250 @@ class BoxSource(models.Model):
         return f"{self.box} - {self.source}"
     
     class Meta:
-        unique_together = [['box', 'source']]
\ No newline at end of file
+        unique_together = [['box', 'source']]
+
+# ===============================
+# Media Index Models
+# ===============================
+
+class ImageFileIndex(models.Model):
+    """
+    Index of image files stored under MEDIA_ROOT.
+    Kept in sync on upload/delete and by the reconcile_image_index command so
+    storage usage can be reported from aggregates instead of walking the disk.
+    """
+    path = models.CharField("Relative Path", max_length=255, unique=True)
+    caliber_code = models.CharField("Caliber Code", max_length=20, blank=True, default='')
+    record_type = models.CharField("Record Type", max_length=20, blank=True, default='')
+    size = models.BigIntegerField("Size (bytes)", default=0)
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    mtime = models.DateTimeField("Modified")
+    year = models.PositiveSmallIntegerField("Year Modified")
+    
+    # Generic relation to the owning record (empty for orphaned files)
+    content_type = models.ForeignKey(ContentType, on_delete=models.SET_NULL, blank=True, null=True)
+    object_id = models.PositiveIntegerField(blank=True, null=True)
+    owner = GenericForeignKey('content_type', 'object_id')
+    
+    indexed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return self.path
+    
+    class Meta:
+        verbose_name = "Image File"
+        verbose_name_plural = "Image File Index"
+        ordering = ['path']
+        indexes = [
+            models.Index(fields=['caliber_code']),  # Usage per caliber
+            models.Index(fields=['record_type']),  # Usage per record type
+            models.Index(fields=['year']),  # Usage per year
+            models.Index(fields=['content_type', 'object_id']),  # Owner lookups
+        ]
+
+
+class ImageHash(models.Model):
+    """
+    Perceptual hashes of an indexed image, used to find near-duplicate photos.
+    The pHash is also stored as four 16-bit bands so candidates within a small
+    Hamming distance can be found with indexed equality lookups.
+    """
+    image = models.OneToOneField(ImageFileIndex, on_delete=models.CASCADE, related_name='hash')
+    dhash = models.BigIntegerField("Difference Hash")
+    phash = models.BigIntegerField("Perceptual Hash")
+    band0 = models.PositiveIntegerField()
+    band1 = models.PositiveIntegerField()
+    band2 = models.PositiveIntegerField()
+    band3 = models.PositiveIntegerField()
+    
+    # File modification time when hashed, to detect stale hashes
+    source_mtime = models.DateTimeField("Source Modified")
+    hashed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.image.path} ({self.phash & 0xFFFFFFFFFFFFFFFF:016x})"
+    
+    class Meta:
+        verbose_name = "Image Hash"
+        verbose_name_plural = "Image Hashes"
+        indexes = [
+            models.Index(fields=['band0']),
+            models.Index(fields=['band1']),
+            models.Index(fields=['band2']),
+            models.Index(fields=['band3']),
+        ]
+
+
+# ===============================
+# Import Job Models
+# ===============================
+
+class ImportUpload(models.Model):
+    """
+    A legacy SQLite database uploaded to the import page and the tables found
+    in it. Kept in the database rather than the session so session rows stay
+    small; expired uploads and their files are removed by expire_imports.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    caliber = models.ForeignKey(Caliber, on_delete=models.CASCADE, related_name='import_uploads')
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True)
+    file_name = models.CharField("Uploaded File", max_length=255)
+    file_path = models.CharField("Stored File Path", max_length=500, help_text="Relative to MEDIA_ROOT")
+    tables = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.created_at:%Y-%m-%d %H:%M})"
+    
+    class Meta:
+        ordering = ['-created_at']
+
+
+class ImportJob(models.Model):
+    """
+    A legacy-database import queued by the import page and run by the
+    run_import_jobs worker command, outside the web request.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    caliber = models.ForeignKey(Caliber, on_delete=models.CASCADE, related_name='import_jobs')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    
+    # What to import
+    upload = models.ForeignKey(ImportUpload, on_delete=models.SET_NULL, blank=True, null=True,
+                               related_name='jobs')
+    table_name = models.CharField("Legacy Table", max_length=50)
+    file_name = models.CharField("Uploaded File", max_length=255)
+    file_path = models.CharField("Stored File Path", max_length=500)
+    options = models.JSONField(default=dict, blank=True)
+    
+    # Progress, updated by the worker while the job runs
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    success = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    
+    # Outcome
+    error = models.TextField(blank=True, default='')
+    result = models.JSONField(default=dict, blank=True)
+    report_file = models.CharField("Report File", max_length=500, blank=True, default='',
+                                   help_text="Gzipped complete report, relative to MEDIA_ROOT")
+    
+    def __str__(self):
+        return f"Import {self.table_name} from {self.file_name} ({self.get_status_display()})"
+    
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_COMPLETED, self.STATUS_FAILED)
+    
+    def progress_data(self):
+        """Progress figures for the polling endpoint, including rate and ETA"""
+        rate = None
+        eta_seconds = None
+        if self.started_at and self.processed:
+            end = self.finished_at or timezone.now()
+            elapsed = (end - self.started_at).total_seconds()
+            if elapsed > 0:
+                rate = round(self.processed / elapsed, 1)
+                if not self.is_finished and self.total > self.processed:
+                    eta_seconds = round((self.total - self.processed) / rate)
+        
+        return {
+            'id': self.id,
+            'status': self.status,
+            'table': self.table_name,
+            'total': self.total,
+            'processed': self.processed,
+            'success': self.success,
+            'failed': self.failed,
+            'percent': round(self.processed * 100 / self.total, 1) if self.total else 0,
+            'rate': rate,
+            'eta_seconds': eta_seconds,
+            'error': self.error,
+            'finished': self.is_finished,
+        }
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),  # Worker queue polling
+            models.Index(fields=['finished_at']),  # Expiry
+        ]
+
+
+class LegacyRowHash(models.Model):
+    """
+    Content hash of the legacy row an imported record was built from.
+    Merge imports compare against it to skip rows that have not changed.
+    """
+    model_name = models.CharField("Model", max_length=50)
+    record_id = models.PositiveIntegerField("Record ID", help_text="Preserved legacy ID of the record")
+    row_hash = models.CharField("Row Hash", max_length=40)
+    imported_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.model_name} {self.record_id}"
+    
+    class Meta:
+        unique_together = [['model_name', 'record_id']]
+
+
+class ChatConversation(models.Model):
+    """
+    A conversation with the Collection Assistant. The session only holds its
+    ID. Turns that no longer fit the prompt's token budget are folded into
+    the summary, which is sent instead of them.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chat_conversations')
+    summary = models.TextField(blank=True, default='', help_text="Summary of the compacted turns")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Chat of {self.user} ({self.created_at:%Y-%m-%d %H:%M})"
+    
+    class Meta:
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['updated_at']),  # Expiry
+        ]
+
+
+class ChatMessage(models.Model):
+    """One user message or assistant reply of a ChatConversation"""
+    ROLE_CHOICES = [
+        ('user', 'User'),
+        ('assistant', 'Assistant'),
+    ]
+    
+    conversation = models.ForeignKey(ChatConversation, on_delete=models.CASCADE, related_name='messages')
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    content = models.TextField()
+    tokens = models.PositiveIntegerField("Estimated Tokens", default=0)
+    compacted = models.BooleanField(default=False, help_text="Folded into the conversation summary")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.role}: {self.content[:50]}"
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['conversation', 'compacted', 'id']),  # Prompt assembly
+        ]
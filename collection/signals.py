@@ -0,0 +1,149 @@
+"""
+Signal handlers for the collection app.
+Registered from CollectionConfig.ready().
+"""
+
+import logging
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    Caliber, Country, Manufacturer, Headstamp, Load, Date, Variation, Box, ImageFileIndex,
+    LoadType, BulletType, CaseType, PrimerType, PAColor,
+    Source, HeadstampSource, LoadSource, DateSource, VariationSource, BoxSource,
+)
+from .utils.caliber_lookup import invalidate_caliber_codes
+from .utils.chat_vocabulary import invalidate_lookup_vocabulary
+from .utils.data_version import bump_data_version_on_commit
+from .utils.image_index import index_image, release_image, normalize_path
+from .utils.text_index import index_record, remove_record
+
+logger = logging.getLogger(__name__)
+
+# Models with an ImageField whose files are tracked in ImageFileIndex
+IMAGE_MODELS = (Caliber, Headstamp, Load, Date, Variation, Box)
+
+# Models whose move or edit can change the caliber of every descendant
+HIERARCHY_MODELS = (Caliber, Country, Manufacturer, Headstamp)
+
+# Models whose cached caliber code only affects the record itself
+LEAF_PARENT_MODELS = (Load, Date, Variation)
+
+# Models listed in the chat assistant's lookup vocabulary
+VOCABULARY_MODELS = (Country, LoadType, BulletType, CaseType, PrimerType, PAColor)
+
+# Models whose text is in the chat assistant's BM25 index
+TEXT_INDEX_MODELS = (Headstamp, Load, Date, Variation, Box)
+
+# Models whose rows the chat tools read, so their writes retire cached tool results
+DATA_VERSION_MODELS = (
+    Caliber, Country, Manufacturer, Headstamp, Load, Date, Variation, Box,
+    LoadType, BulletType, CaseType, PrimerType, PAColor,
+    Source, HeadstampSource, LoadSource, DateSource, VariationSource, BoxSource,
+)
+
+
+@receiver(post_save)
+def update_image_index_on_save(sender, instance, raw=False, **kwargs):
+    """Keep ImageFileIndex in step with a record's image after it is saved"""
+    if raw or sender not in IMAGE_MODELS:
+        return
+
+    # Saves that leave the stored image untouched need no index maintenance
+    if hasattr(instance, 'image_unchanged') and instance.image_unchanged():
+        return
+
+    try:
+        content_type = ContentType.objects.get_for_model(sender)
+        current = normalize_path(instance.image.name) if instance.image else ''
+
+        # Release files this record no longer points at
+        previous = ImageFileIndex.objects.filter(
+            content_type=content_type, object_id=instance.pk
+        ).exclude(path=current).values_list('path', flat=True)
+        for path in list(previous):
+            release_image(path, released_by=instance)
+
+        if current:
+            index_image(current, owner=instance)
+    except Exception as e:
+        # Index maintenance must never block saving the record itself
+        logger.warning(f"Failed to update image index for {sender.__name__} {instance.pk}: {e}")
+
+
+@receiver(post_delete)
+def update_image_index_on_delete(sender, instance, **kwargs):
+    """Release a deleted record's image from ImageFileIndex"""
+    if sender not in IMAGE_MODELS:
+        return
+
+    try:
+        if instance.image:
+            release_image(instance.image.name, released_by=instance)
+    except Exception as e:
+        logger.warning(f"Failed to release image index for {sender.__name__} {instance.pk}: {e}")
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_caliber_cache(sender, instance, created=False, **kwargs):
+    """Forget cached caliber codes when a record may have moved between calibers"""
+    if sender in HIERARCHY_MODELS:
+        # New records cannot be cached yet; edits may move whole subtrees
+        if not created:
+            invalidate_caliber_codes()
+    elif sender in LEAF_PARENT_MODELS:
+        invalidate_caliber_codes(sender._meta.model_name, instance.pk)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_chat_vocabulary(sender, **kwargs):
+    """Rebuild the chat assistant's lookup vocabulary after a country or lookup value changes"""
+    if sender in VOCABULARY_MODELS:
+        invalidate_lookup_vocabulary()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_collection_data_version(sender, **kwargs):
+    """Retire caches derived from collection data, such as chat tool results, once a write commits"""
+    if sender in DATA_VERSION_MODELS:
+        bump_data_version_on_commit()
+
+
+@receiver(post_save)
+def update_text_index_on_save(sender, instance, raw=False, **kwargs):
+    """Journal a record's new text for the chat assistant's search index once it is committed"""
+    if raw or sender not in TEXT_INDEX_MODELS:
+        return
+
+    def journal():
+        try:
+            index_record(instance)
+        except Exception as e:
+            # Index maintenance must never block saving the record itself
+            logger.warning(f"Failed to update text index for {sender.__name__} {instance.pk}: {e}")
+
+    transaction.on_commit(journal)
+
+
+@receiver(post_delete)
+def update_text_index_on_delete(sender, instance, **kwargs):
+    """Journal a record's removal from the chat assistant's search index once it is committed"""
+    if sender not in TEXT_INDEX_MODELS:
+        return
+
+    # The instance loses its pk after the delete
+    kind, pk = sender._meta.model_name, instance.pk
+
+    def journal():
+        try:
+            remove_record(kind, pk)
+        except Exception as e:
+            logger.warning(f"Failed to remove {sender.__name__} {pk} from the text index: {e}")
+
+    transaction.on_commit(journal)
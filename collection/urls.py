@@ -91,7 +91,13 @@ urlpatterns = [
     path('<str:caliber_code>/add-artifact/', views.add_artifact, name='add_artifact'),
     path('<str:caliber_code>/import_records/', views.import_records, name='import_records'),
     path('<str:caliber_code>/download-results/', views.download_results, name='download_results'),
+    path('<str:caliber_code>/import-jobs/<int:job_id>/progress/', views.import_job_progress, name='import_job_progress'),
     path('<str:caliber_code>/import-images/', views.import_images, name='import_images'),
+
+    # Image gallery
+    path('<str:caliber_code>/gallery/', views.image_gallery, name='image_gallery'),
+    path('<str:caliber_code>/gallery/page/', views.image_gallery_page, name='image_gallery_page'),
+    path('<str:caliber_code>/gallery/thumbnail/<path:image_path>', views.gallery_thumbnail, name='gallery_thumbnail'),
     
     # Support and docs
     # Without caliber (will use first active caliber)
@@ -0,0 +1,73 @@
+import threading
+import time
+
+# How long resolved caliber codes are trusted before being looked up again.
+# Other processes do not see this process's invalidations, so keep it short.
+CALIBER_CACHE_TTL = 300
+
+# Lookup path from each record type to its caliber code
+CALIBER_CODE_PATHS = {
+    'caliber': ('code',),
+    'country': ('caliber__code',),
+    'manufacturer': ('country__caliber__code',),
+    'headstamp': ('manufacturer__country__caliber__code',),
+    'load': ('headstamp__manufacturer__country__caliber__code',),
+    'date': ('load__headstamp__manufacturer__country__caliber__code',),
+    'variation': (
+        'load__headstamp__manufacturer__country__caliber__code',
+        'date__load__headstamp__manufacturer__country__caliber__code',
+    ),
+}
+
+_lock = threading.Lock()
+_codes = {}
+_loaded_at = time.monotonic()
+
+
+def caliber_code_for(model_name, pk):
+    """
+    Resolve the caliber code of a record with at most one query,
+    caching the answer for the process.
+
+    Args:
+        model_name (str): Lower-case model name, e.g. "headstamp"
+        pk (int): Primary key of the record
+
+    Returns:
+        str or None: The caliber code, or None if the record does not exist
+    """
+    global _loaded_at
+
+    if pk is None or model_name not in CALIBER_CODE_PATHS:
+        return None
+
+    key = (model_name, pk)
+    with _lock:
+        if time.monotonic() - _loaded_at > CALIBER_CACHE_TTL:
+            _codes.clear()
+            _loaded_at = time.monotonic()
+        if key in _codes:
+            return _codes[key]
+
+    from django.apps import apps
+    model = apps.get_model('collection', model_name)
+    row = model.objects.filter(pk=pk).values_list(*CALIBER_CODE_PATHS[model_name]).first()
+    code = next((value for value in row if value), None) if row else None
+
+    if code is not None:
+        with _lock:
+            _codes[key] = code
+    return code
+
+
+def invalidate_caliber_codes(model_name=None, pk=None):
+    """
+    Drop cached caliber codes. With a model name and key only that record is
+    forgotten; otherwise the whole cache is cleared (e.g. after a move that
+    affects every descendant).
+    """
+    with _lock:
+        if model_name is None:
+            _codes.clear()
+        else:
+            _codes.pop((model_name, pk), None)
@@ -0,0 +1,192 @@
+"""
+Conversation history of the Collection Assistant.
+
+Messages are stored in ChatConversation/ChatMessage with a token estimate
+each, so a prompt can be assembled to a token budget: the newest turns that
+fit HISTORY_TOKEN_BUDGET are sent verbatim, and once the uncompacted turns
+outgrow the budget the oldest are summarized into the conversation's summary
+(sent in the system prompt) and no longer sent. Request size therefore stays
+bounded however long a conversation runs.
+"""
+
+import logging
+import math
+from datetime import timedelta
+
+import anthropic
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..chat_prompt import COMPACTION_PROMPT
+from ..models import ChatConversation, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+# Session key holding the ID of the user's current conversation
+CONVERSATION_SESSION_KEY = 'chat_conversation_id'
+
+# Estimated tokens of past turns sent with each message
+HISTORY_TOKEN_BUDGET = 6000
+
+# Compaction keeps the newest turns up to this many tokens and summarizes the rest
+COMPACTION_KEEP_TOKENS = 3000
+
+# Maximum number of past messages sent, whatever their size (safety net)
+MAX_HISTORY_MESSAGES = 40
+
+# Rough size of English text in tokens, plus the per-message framing
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Model and length of conversation summaries
+SUMMARY_MODEL = "claude-3-5-haiku-20241022"
+SUMMARY_MAX_WORDS = 250
+SUMMARY_MAX_TOKENS = 600
+
+# Conversations idle this long are deleted by expire_imports (their sessions have expired)
+CONVERSATION_RETENTION = timedelta(seconds=settings.SESSION_COOKIE_AGE)
+
+
+def estimate_tokens(text):
+    """Estimated tokens of a message, without calling the API"""
+    return math.ceil(len(text or '') / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+def load_conversation(user, conversation_id):
+    """The user's conversation with this ID, or None"""
+    if not conversation_id:
+        return None
+    return ChatConversation.objects.filter(pk=conversation_id, user=user).first()
+
+
+def start_conversation(user, legacy_history=None):
+    """
+    Create a conversation, carrying over a chat_history list left in the
+    session by earlier versions.
+    """
+    conversation = ChatConversation.objects.create(user=user)
+    if legacy_history:
+        ChatMessage.objects.bulk_create([
+            ChatMessage(
+                conversation=conversation, role=message['role'], content=message['content'],
+                tokens=estimate_tokens(message['content']),
+            )
+            for message in legacy_history
+            if message.get('role') in ('user', 'assistant') and isinstance(message.get('content'), str)
+        ])
+    return conversation
+
+
+def record_exchange(conversation, user_message, reply):
+    """Store a user message and the reply to it"""
+    ChatMessage.objects.bulk_create([
+        ChatMessage(conversation=conversation, role='user', content=user_message,
+                    tokens=estimate_tokens(user_message)),
+        ChatMessage(conversation=conversation, role='assistant', content=reply,
+                    tokens=estimate_tokens(reply)),
+    ])
+    # Keeps the conversation from expiring while it is in use
+    conversation.save(update_fields=['updated_at'])
+
+
+def prompt_messages(conversation, user_message):
+    """
+    API messages for a new user message: the newest uncompacted turns that
+    fit HISTORY_TOKEN_BUDGET, then the message itself.
+    """
+    budget = HISTORY_TOKEN_BUDGET - estimate_tokens(user_message)
+    selected = []
+    recent = conversation.messages.filter(compacted=False).order_by('-id').values_list('role', 'content', 'tokens')
+    for role, content, tokens in recent[:MAX_HISTORY_MESSAGES]:
+        budget -= tokens
+        if budget < 0:
+            break
+        selected.append({"role": role, "content": content})
+    selected.reverse()
+
+    # The API expects the conversation to open with a user turn
+    while selected and selected[0]["role"] != "user":
+        selected.pop(0)
+    return selected + [{"role": "user", "content": user_message}]
+
+
+def _summarize(summary, messages):
+    """A new summary covering an earlier summary and the given messages, or None if the API call fails"""
+    transcript = []
+    if summary:
+        transcript.append(f"Summary of the conversation before this point:\n{summary}\n")
+    for message in messages:
+        speaker = "User" if message.role == "user" else "Assistant"
+        transcript.append(f"{speaker}: {message.content}")
+
+    try:
+        client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY, base_url=settings.ANTHROPIC_BASE_URL)
+        response = client.messages.create(
+            model=SUMMARY_MODEL,
+            max_tokens=SUMMARY_MAX_TOKENS,
+            system=COMPACTION_PROMPT.format(max_words=SUMMARY_MAX_WORDS),
+            messages=[{"role": "user", "content": '\n\n'.join(transcript)}],
+        )
+    except Exception as e:
+        logger.warning(f"Failed to summarize chat conversation: {e}")
+        return None
+    text = "\n\n".join(block.text for block in response.content if hasattr(block, 'text')).strip()
+    return text or None
+
+
+def compact_conversation(conversation):
+    """
+    Fold the oldest uncompacted turns into the summary once they outgrow
+    HISTORY_TOKEN_BUDGET, keeping the newest COMPACTION_KEEP_TOKENS verbatim.
+    When summarizing fails the turns stay as they are; prompt_messages()
+    still leaves out whatever does not fit the budget.
+
+    Returns:
+        bool: Whether any turns were compacted
+    """
+    messages = list(conversation.messages.filter(compacted=False).order_by('id'))
+    if sum(message.tokens for message in messages) <= HISTORY_TOKEN_BUDGET:
+        return False
+
+    # Keep whole turns: the kept part starts at a user message
+    keep_from = len(messages)
+    kept = 0
+    for i in range(len(messages) - 1, -1, -1):
+        kept += messages[i].tokens
+        if kept > COMPACTION_KEEP_TOKENS:
+            break
+        if messages[i].role == 'user':
+            keep_from = i
+    older = messages[:keep_from]
+    if not older:
+        return False
+
+    summary = _summarize(conversation.summary, older)
+    if summary is None:
+        return False
+
+    with transaction.atomic():
+        conversation.summary = summary
+        conversation.save(update_fields=['summary', 'updated_at'])
+        ChatMessage.objects.filter(pk__in=[message.pk for message in older]).update(compacted=True)
+    return True
+
+
+def conversation_messages(conversation):
+    """Every message of a conversation for display, compacted ones included"""
+    if conversation is None:
+        return []
+    return [
+        {"role": role, "content": content}
+        for role, content in conversation.messages.order_by('id').values_list('role', 'content')
+    ]
+
+
+def expire_conversations(now=None):
+    """Delete conversations idle for longer than CONVERSATION_RETENTION. Returns the number deleted."""
+    now = now or timezone.now()
+    expired = ChatConversation.objects.filter(updated_at__lt=now - CONVERSATION_RETENTION)
+    count = expired.count()
+    expired.delete()
+    return count
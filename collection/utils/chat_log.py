@@ -0,0 +1,181 @@
+"""
+Structured log of the Collection Assistant's exchanges.
+
+Every exchange becomes one compact JSON line in CHAT_LOG_DIR/chat.jsonl with
+its timings, API rounds (latency and token usage), tool calls (duration and
+cache hits) and the reply. Requests only put the record on a queue; a
+background thread writes it, rotating the file by size. chat_log_stats
+reports on these files.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import math
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+CHAT_LOG_NAME = 'chat.jsonl'
+
+# Size at which the log is rotated, and how many rotated files are kept
+CHAT_LOG_MAX_BYTES = getattr(settings, 'CHAT_LOG_MAX_BYTES', 10 * 1024 * 1024)
+CHAT_LOG_BACKUPS = getattr(settings, 'CHAT_LOG_BACKUPS', 10)
+
+# Records waiting for the writer; beyond this they are dropped rather than block a request
+CHAT_LOG_QUEUE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+_exchange_logger = None
+_setup_lock = threading.Lock()
+
+
+class SharedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler for a file several worker processes append to:
+    after another process rotated the file, reopen it instead of writing
+    on into the rotated copy. Each record is written with a single write.
+    """
+
+    def emit(self, record):
+        try:
+            if self.stream is not None:
+                try:
+                    moved = os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+                except FileNotFoundError:
+                    moved = True
+                if moved:
+                    self.stream.close()
+                    self.stream = None
+        except OSError:
+            self.stream = None
+        super().emit(record)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking the request"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def _get_exchange_logger():
+    """The queue-backed logger of exchange records, set up on first use"""
+    global _exchange_logger
+    with _setup_lock:
+        if _exchange_logger is None:
+            log_dir = getattr(settings, 'CHAT_LOG_DIR', None)
+            if not log_dir:
+                return None
+            os.makedirs(log_dir, exist_ok=True)
+
+            handler = SharedRotatingFileHandler(
+                os.path.join(log_dir, CHAT_LOG_NAME), maxBytes=CHAT_LOG_MAX_BYTES,
+                backupCount=CHAT_LOG_BACKUPS, encoding='utf-8',
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            records = queue.Queue(CHAT_LOG_QUEUE_SIZE)
+            listener = logging.handlers.QueueListener(records, handler)
+            listener.start()
+            # Write out what is still queued when the process exits
+            atexit.register(listener.stop)
+
+            exchange_logger = logging.getLogger('collection.chat_exchanges')
+            exchange_logger.setLevel(logging.INFO)
+            exchange_logger.propagate = False
+            exchange_logger.addHandler(DroppingQueueHandler(records))
+            _exchange_logger = exchange_logger
+        return _exchange_logger
+
+
+def round_usage(response, seconds):
+    """Latency and token usage of one API round"""
+    usage = getattr(response, 'usage', None)
+    return {
+        "seconds": round(seconds, 3),
+        "stop_reason": getattr(response, 'stop_reason', None),
+        "input_tokens": getattr(usage, 'input_tokens', None) or 0,
+        "output_tokens": getattr(usage, 'output_tokens', None) or 0,
+        "cache_creation_input_tokens": getattr(usage, 'cache_creation_input_tokens', None) or 0,
+        "cache_read_input_tokens": getattr(usage, 'cache_read_input_tokens', None) or 0,
+    }
+
+
+def log_chat_exchange(user, current_page, user_message, tool_calls, reply, *, model, started,
+                      rounds=(), streamed=False, error=None):
+    """
+    Queue the record of one chat exchange for the log.
+
+    Args:
+        user (str): Username
+        current_page (str): Page the chat was sent from
+        user_message (str): The user's message
+        tool_calls (list): Dicts with name, input, result, cached, seconds and round (1-based)
+        reply (str): The final reply ("" on error)
+        model (str): Model that answered
+        started (float): time.monotonic() when the request arrived
+        rounds (list): round_usage() of every API round
+        streamed (bool): Whether the reply was streamed
+        error (str, optional): What went wrong
+    """
+    exchange_logger = _get_exchange_logger()
+    if exchange_logger is None:
+        return
+
+    record = {
+        "ts": timezone.now().isoformat(),
+        "user": user,
+        "page": current_page,
+        "model": model,
+        "streamed": streamed,
+        "seconds": round(time.monotonic() - started, 3),
+        "rounds": list(rounds),
+        "tools": [
+            {
+                "name": tc["name"],
+                "round": tc.get("round"),
+                "seconds": tc.get("seconds"),
+                "cached": tc.get("cached", False),
+                "input": tc["input"],
+                "result": tc["result"],
+            }
+            for tc in tool_calls
+        ],
+        "message": user_message,
+        "reply": reply,
+        "error": error,
+    }
+    for field in ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"):
+        record[field] = sum(r[field] for r in record["rounds"])
+
+    try:
+        exchange_logger.info(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str))
+    except Exception as e:
+        logger.warning(f"Failed to queue chat log record: {e}")
+
+
+def chat_log_paths(log_dir=None):
+    """The chat log and its rotated copies, oldest first"""
+    log_dir = log_dir or getattr(settings, 'CHAT_LOG_DIR', None)
+    if not log_dir or not os.path.isdir(log_dir):
+        return []
+    base = os.path.join(log_dir, CHAT_LOG_NAME)
+    rotated = [f"{base}.{n}" for n in range(CHAT_LOG_BACKUPS, 0, -1)]
+    return [path for path in rotated + [base] if os.path.isfile(path)]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers, or None when it is empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
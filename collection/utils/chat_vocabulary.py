@@ -0,0 +1,73 @@
+"""
+Lookup vocabulary of the Collection Assistant's system prompt.
+
+The vocabulary lists a caliber's countries and the values of the five lookup
+tables. It is built once per caliber and kept in Django's cache, so every
+process shares it; signals bump a version number when a country or lookup
+row changes, which retires all cached copies at once (see utils.data_version).
+"""
+
+from django.core.cache import cache
+
+from .data_version import bump_version, current_version, on_commit_once
+
+VOCABULARY_CACHE_KEY = 'chat_vocabulary'
+VOCABULARY_VERSION_KEY = 'chat_vocabulary_version'
+
+# Safety net for writes that bypass signals (raw SQL, other tools)
+VOCABULARY_CACHE_TTL = 24 * 3600
+
+
+def build_lookup_vocabulary(caliber_code):
+    """Build a text summary of lookup table values for the system prompt."""
+    from ..models import Country, LoadType, BulletType, CaseType, PrimerType, PAColor
+
+    sections = []
+
+    # Countries for the current caliber
+    countries = Country.objects.filter(
+        caliber__code=caliber_code
+    ).order_by('name')
+    country_items = []
+    for c in countries:
+        if c.full_name and c.full_name != c.name:
+            country_items.append(f'"{c.name}" ({c.full_name})')
+        else:
+            country_items.append(f'"{c.name}"')
+    sections.append(f"Countries in this caliber: {', '.join(country_items)}")
+
+    # Lookup tables (shared across calibers)
+    for label, model in [
+        ("Load Types", LoadType),
+        ("Bullet Types", BulletType),
+        ("Case Types", CaseType),
+        ("Primer Types", PrimerType),
+        ("PA (Primer Annulus) Colors", PAColor),
+    ]:
+        values = model.objects.all().order_by('display_name')
+        items = [f'"{v.display_name}" (code: {v.value})' for v in values]
+        sections.append(f"{label}: {', '.join(items)}")
+    return '\n'.join(sections)
+
+
+def lookup_vocabulary(caliber_code):
+    """The caliber's lookup vocabulary, from the cache when it is current"""
+    key = f"{VOCABULARY_CACHE_KEY}:{current_version(VOCABULARY_VERSION_KEY)}:{caliber_code}"
+    vocabulary = cache.get(key)
+    if vocabulary is None:
+        vocabulary = build_lookup_vocabulary(caliber_code)
+        cache.set(key, vocabulary, VOCABULARY_CACHE_TTL)
+    return vocabulary
+
+
+def bump_vocabulary_version():
+    bump_version(VOCABULARY_VERSION_KEY)
+
+
+def invalidate_lookup_vocabulary():
+    """
+    Retire the cached vocabulary of every caliber once the current
+    transaction commits, so a concurrent request cannot cache the old
+    vocabulary under the new version.
+    """
+    on_commit_once(bump_vocabulary_version)
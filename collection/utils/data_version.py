@@ -0,0 +1,60 @@
+"""
+Version counters kept in Django's cache.
+
+A cached value that depends on collection data includes a version number
+in its key; bumping the version retires every value cached under the old
+one at once, in all processes, without having to know their keys. The
+collection data version is bumped after writes to the collection's records
+and lookup tables (by signals and by the bulk importers), once per
+transaction when it commits.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+DATA_VERSION_KEY = 'collection_data_version'
+
+
+def current_version(key):
+    """The version stored under key, starting at 1"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_version(key):
+    """Move the version stored under key forward"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        # No version yet, so nothing has been cached under one
+        cache.add(key, 1, timeout=None)
+
+
+def on_commit_once(func):
+    """
+    Run func once the current transaction commits, or right away outside
+    one. Scheduling it again while it is still pending does nothing.
+    """
+    pending = transaction.get_connection().run_on_commit
+    if not any(entry[1] is func for entry in pending):
+        transaction.on_commit(func)
+
+
+def data_version():
+    return current_version(DATA_VERSION_KEY)
+
+
+def bump_data_version():
+    bump_version(DATA_VERSION_KEY)
+
+
+def bump_data_version_on_commit():
+    """
+    Bump the data version once the current transaction commits, or right
+    away outside one. However many writes a transaction makes, it bumps
+    the version once.
+    """
+    on_commit_once(bump_data_version)
@@ -0,0 +1,289 @@
+import math
+
+# Hashes are 64-bit; Hamming distances up to this value count as near-duplicates
+DEFAULT_MAX_DISTANCE = 6
+
+# Largest distance the admin report searches within a request. Beyond it nearly
+# every pair is compared anyway; use find_duplicate_images --distance instead
+ADMIN_MAX_DISTANCE = 10
+
+# pHash is split into this many bands for multi-index lookups. With distance d,
+# two hashes share at least one identical band whenever d < HASH_BANDS.
+HASH_BANDS = 4
+BAND_BITS = 64 // HASH_BANDS
+
+# Image size the DCT for pHash is computed over, and the low-frequency block kept
+PHASH_SIZE = 32
+PHASH_LOW_FREQ = 8
+
+# Cosine table for the 1-D DCT: _DCT[u][x] = cos((2x + 1) * u * pi / 2N)
+_DCT = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * PHASH_SIZE)) for x in range(PHASH_SIZE)]
+    for u in range(PHASH_LOW_FREQ)
+]
+
+
+def dhash(img, hash_size=8):
+    """
+    Difference hash: compares horizontally adjacent pixels of a small grayscale image.
+
+    Args:
+        img: PIL Image
+        hash_size (int): Hash side length; the hash has hash_size^2 bits
+
+    Returns:
+        int: Unsigned hash value
+    """
+    from PIL import Image
+
+    small = img.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    width = hash_size + 1
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def phash(img):
+    """
+    Perceptual hash: signs of the low-frequency DCT coefficients relative to their median.
+    Uses a separable 2-D DCT computed only for the kept 8x8 block.
+
+    Args:
+        img: PIL Image
+
+    Returns:
+        int: Unsigned 64-bit hash value
+    """
+    from PIL import Image
+
+    small = img.convert('L').resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS)
+    pixels = list(small.getdata())
+    rows = [pixels[i * PHASH_SIZE:(i + 1) * PHASH_SIZE] for i in range(PHASH_SIZE)]
+
+    # DCT along each row, keeping the low frequencies
+    row_dct = [
+        [sum(c * p for c, p in zip(_DCT[u], row)) for u in range(PHASH_LOW_FREQ)]
+        for row in rows
+    ]
+    # DCT down each kept column
+    coefficients = [
+        sum(_DCT[v][y] * row_dct[y][u] for y in range(PHASH_SIZE))
+        for v in range(PHASH_LOW_FREQ)
+        for u in range(PHASH_LOW_FREQ)
+    ]
+
+    # Exclude the DC term from the median so overall brightness does not dominate
+    median = sorted(coefficients[1:])[len(coefficients[1:]) // 2]
+
+    value = 0
+    for coefficient in coefficients:
+        value = (value << 1) | (coefficient > median)
+    return value
+
+
+def compute_image_hashes(full_path):
+    """
+    Compute (dhash, phash) for a file. Safe to run in a worker process.
+
+    Returns:
+        tuple: (full_path, dhash, phash, error) - hashes are None on error
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(full_path) as img:
+            img.draft('L', (PHASH_SIZE * 4, PHASH_SIZE * 4))  # Cheap JPEG downscale on decode
+            return full_path, dhash(img), phash(img), None
+    except Exception as e:
+        return full_path, None, None, str(e)
+
+
+def hamming(a, b):
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+def to_signed(value):
+    """Store an unsigned 64-bit hash in a signed BIGINT column"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value):
+    """Inverse of to_signed"""
+    return value + (1 << 64) if value < 0 else value
+
+
+def hash_bands(value):
+    """Split an unsigned hash into HASH_BANDS integers of BAND_BITS bits each"""
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (BAND_BITS * i)) & mask for i in range(HASH_BANDS)]
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over Hamming distance.
+    Range queries only visit subtrees whose edge distance could hold a match,
+    avoiding an all-pairs comparison.
+    """
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, key):
+        """Insert a hash with an associated key (e.g. an ImageHash id)"""
+        if self.root is None:
+            self.root = [value, [key], {}]
+            return
+
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [key], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """
+        Find all stored hashes within max_distance of value.
+
+        Returns:
+            list: [(distance, key)]
+        """
+        results = []
+        if self.root is None:
+            return results
+
+        stack = [self.root]
+        while stack:
+            node_value, keys, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                results.extend((distance, key) for key in keys)
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for edge, child in children.items() if low <= edge <= high)
+        return results
+
+
+def find_near_duplicate_groups(hashes, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    Group near-duplicate images.
+
+    Args:
+        hashes (list): [(key, unsigned phash)]
+        max_distance (int): Largest Hamming distance treated as a duplicate
+
+    Returns:
+        list: Groups of keys (each with two or more members), largest first,
+              each as a dict with 'keys' and 'max_distance'
+    """
+    tree = BKTree()
+    for key, value in hashes:
+        tree.add(value, key)
+
+    # Union-find over the matching pairs
+    parent = {}
+
+    def find(key):
+        while parent.get(key, key) != key:
+            parent[key] = parent.get(parent[key], parent[key])
+            key = parent[key]
+        return key
+
+    worst = {}
+    for key, value in hashes:
+        for distance, other in tree.search(value, max_distance):
+            if other == key:
+                continue
+            root_a, root_b = find(key), find(other)
+            if root_a != root_b:
+                parent[root_b] = root_a
+                worst[root_a] = max(worst.get(root_a, 0), worst.pop(root_b, 0), distance)
+            else:
+                worst[root_a] = max(worst.get(root_a, 0), distance)
+
+    groups = {}
+    for key, _ in hashes:
+        groups.setdefault(find(key), []).append(key)
+
+    result = [
+        {'keys': keys, 'max_distance': worst.get(root, 0)}
+        for root, keys in groups.items() if len(keys) > 1
+    ]
+    result.sort(key=lambda group: (-len(group['keys']), group['max_distance']))
+    return result
+
+
+def similar_images(value, max_distance=HASH_BANDS - 1, exclude_id=None):
+    """
+    Find stored images whose pHash is within max_distance of a hash using the
+    band columns: any match shares at least one identical band when
+    max_distance < HASH_BANDS, so only those candidates are compared.
+
+    Returns:
+        list: [(distance, ImageHash)] sorted by distance
+    """
+    from django.db.models import Q
+    from ..models import ImageHash
+
+    bands = hash_bands(value)
+    query = Q()
+    for i, band in enumerate(bands):
+        query |= Q(**{f'band{i}': band})
+
+    candidates = ImageHash.objects.filter(query).select_related('image')
+    if exclude_id is not None:
+        candidates = candidates.exclude(id=exclude_id)
+
+    matches = []
+    for candidate in candidates:
+        distance = hamming(value, to_unsigned(candidate.phash))
+        if distance <= max_distance:
+            matches.append((distance, candidate))
+    matches.sort(key=lambda match: match[0])
+    return matches
+
+
+def near_duplicate_report(max_distance=DEFAULT_MAX_DISTANCE, caliber_code=None, record_types=None):
+    """
+    Group stored image hashes into near-duplicate sets.
+
+    Args:
+        max_distance (int): Largest pHash Hamming distance treated as a duplicate
+        caliber_code (str): Optional caliber filter
+        record_types (list): Optional record type filter (e.g. ['headstamp', 'load'])
+
+    Returns:
+        list: [{'images': [ImageFileIndex], 'max_distance': int}]
+    """
+    from ..models import ImageHash
+
+    qs = ImageHash.objects.all()
+    if caliber_code:
+        qs = qs.filter(image__caliber_code=caliber_code)
+    if record_types:
+        qs = qs.filter(image__record_type__in=record_types)
+
+    hashes = [(image_id, to_unsigned(value)) for image_id, value in qs.values_list('image_id', 'phash')]
+    groups = find_near_duplicate_groups(hashes, max_distance)
+
+    from ..models import ImageFileIndex
+    image_ids = [key for group in groups for key in group['keys']]
+    images = ImageFileIndex.objects.select_related('content_type').in_bulk(image_ids)
+
+    return [
+        {
+            'images': sorted((images[key] for key in group['keys'] if key in images), key=lambda i: i.path),
+            'max_distance': group['max_distance'],
+        }
+        for group in groups
+    ]
@@ -0,0 +1,277 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+
+# File extensions treated as images when indexing MEDIA_ROOT
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+
+# Top-level MEDIA_ROOT directories that never hold collection images
+EXCLUDED_DIRS = {'temp_imports', 'chat_logs', 'import_reports', 'text_index', 'thumbnails'}
+
+# Upload sub-directory (see the upload_to functions in models.py) -> record type
+RECORD_TYPE_DIRS = {
+    'headstamps': 'headstamp',
+    'loads': 'load',
+    'dates': 'date',
+    'variations': 'variation',
+    'boxes': 'box',
+}
+
+# How long the in-process set of stored paths is reloaded from ImageFileIndex
+# after; paths missing from it are checked on the filesystem
+STORED_PATHS_TTL = 300
+
+_stored_paths_lock = threading.Lock()
+_stored_paths = None
+_stored_paths_loaded_at = 0.0
+
+
+def normalize_path(path):
+    """Return a storage-relative path using forward slashes"""
+    return path.replace('\\', '/').lstrip('/')
+
+
+def is_image_path(path):
+    """Check whether a path has one of the indexed image extensions"""
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def describe_path(path):
+    """
+    Derive the caliber code and record type from a storage-relative path.
+
+    Args:
+        path (str): Path relative to MEDIA_ROOT, e.g. "9mmP/loads/L12.jpg"
+
+    Returns:
+        tuple: (caliber_code, record_type) - empty strings when unknown
+    """
+    parts = normalize_path(path).split('/')
+    if len(parts) >= 2 and parts[0] == 'calibers':
+        return '', 'caliber'
+    if len(parts) >= 3:
+        return parts[0], RECORD_TYPE_DIRS.get(parts[1], 'other')
+    return '', 'other'
+
+
+def read_image_stats(path, with_dimensions=True):
+    """
+    Read size, modification time and (optionally) pixel dimensions of a media file.
+
+    Args:
+        path (str): Path relative to MEDIA_ROOT
+        with_dimensions (bool): Whether to open the image header for width/height
+
+    Returns:
+        dict or None: File statistics, or None if the file does not exist
+    """
+    full_path = os.path.join(settings.MEDIA_ROOT, path)
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        return None
+
+    mtime = datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+    stats = {
+        'size': stat.st_size,
+        'mtime': mtime,
+        'year': mtime.year,
+        'width': None,
+        'height': None,
+    }
+
+    if with_dimensions:
+        try:
+            from PIL import Image
+            # Image.open only reads the header, so this stays cheap for large files
+            with Image.open(full_path) as img:
+                stats['width'], stats['height'] = img.size
+        except Exception:
+            pass
+
+    return stats
+
+
+def _load_stored_paths():
+    """Return the process-level set of indexed paths, reloading it when stale"""
+    global _stored_paths, _stored_paths_loaded_at
+    from ..models import ImageFileIndex
+
+    with _stored_paths_lock:
+        if _stored_paths is not None and time.monotonic() - _stored_paths_loaded_at < STORED_PATHS_TTL:
+            return _stored_paths
+
+    paths = set(ImageFileIndex.objects.values_list('path', flat=True))
+    with _stored_paths_lock:
+        _stored_paths = paths
+        _stored_paths_loaded_at = time.monotonic()
+    return paths
+
+
+def stored_image_exists(path):
+    """
+    Check whether a media file exists, answering from the index of stored
+    paths when it knows the file. A miss is confirmed on the filesystem,
+    since another process (a web worker, the import job or bulk_import_images)
+    may have written the file after the path set was loaded.
+    """
+    path = normalize_path(path)
+    if path in _load_stored_paths():
+        return True
+    if os.path.exists(os.path.join(settings.MEDIA_ROOT, path)):
+        remember_stored_image(path)
+        return True
+    return False
+
+
+def remember_stored_image(path):
+    """Record a newly stored file in the process-level path set"""
+    with _stored_paths_lock:
+        if _stored_paths is not None:
+            _stored_paths.add(normalize_path(path))
+
+
+def forget_stored_image(path):
+    """Remove a deleted file from the process-level path set"""
+    with _stored_paths_lock:
+        if _stored_paths is not None:
+            _stored_paths.discard(normalize_path(path))
+
+
+def build_index_entry(path, stats, content_type_id=None, object_id=None):
+    """Build an unsaved ImageFileIndex row for a path and its statistics"""
+    from ..models import ImageFileIndex
+
+    caliber_code, record_type = describe_path(path)
+    return ImageFileIndex(
+        path=path,
+        caliber_code=caliber_code,
+        record_type=record_type,
+        size=stats['size'],
+        width=stats['width'],
+        height=stats['height'],
+        mtime=stats['mtime'],
+        year=stats['year'],
+        content_type_id=content_type_id,
+        object_id=object_id,
+    )
+
+
+def index_image(path, owner=None):
+    """
+    Add or refresh the index entry for a single media file.
+
+    Args:
+        path (str): Path relative to MEDIA_ROOT
+        owner: Optional model instance that references the file
+
+    Returns:
+        ImageFileIndex or None: The entry, or None if the file does not exist
+    """
+    from ..models import ImageFileIndex
+
+    path = normalize_path(path)
+    stats = read_image_stats(path)
+    if stats is None:
+        ImageFileIndex.objects.filter(path=path).delete()
+        forget_stored_image(path)
+        return None
+
+    caliber_code, record_type = describe_path(path)
+    defaults = dict(stats, caliber_code=caliber_code, record_type=record_type)
+    if owner is not None:
+        defaults['content_type'] = ContentType.objects.get_for_model(owner)
+        defaults['object_id'] = owner.pk
+
+    entry, _ = ImageFileIndex.objects.update_or_create(path=path, defaults=defaults)
+    remember_stored_image(path)
+    return entry
+
+
+def find_image_owner(path, exclude=None):
+    """
+    Find a record that still references a media file.
+    Files can be shared by several records (see check_duplicate_image).
+
+    Args:
+        path (str): Path relative to MEDIA_ROOT
+        exclude: Optional model instance to ignore (e.g. the record being released)
+
+    Returns:
+        Model instance or None
+    """
+    from ..models import Caliber, Headstamp, Load, Date, Variation, Box
+
+    for model in (Caliber, Headstamp, Load, Date, Variation, Box):
+        qs = model.objects.filter(image=path)
+        if exclude is not None and isinstance(exclude, model):
+            qs = qs.exclude(pk=exclude.pk)
+        owner = qs.only('id').first()
+        if owner:
+            return owner
+    return None
+
+
+def release_image(path, released_by=None):
+    """
+    Detach a file from a record that no longer references it.
+    Ownership passes to another referencing record if there is one; otherwise
+    the entry is kept as an orphan, or removed if the file itself is gone.
+    """
+    from ..models import ImageFileIndex
+
+    path = normalize_path(path)
+    if not os.path.exists(os.path.join(settings.MEDIA_ROOT, path)):
+        ImageFileIndex.objects.filter(path=path).delete()
+        forget_stored_image(path)
+        return
+
+    owner = find_image_owner(path, exclude=released_by)
+    if owner is not None:
+        ImageFileIndex.objects.filter(path=path).update(
+            content_type=ContentType.objects.get_for_model(owner),
+            object_id=owner.pk,
+        )
+    else:
+        ImageFileIndex.objects.filter(path=path).update(content_type=None, object_id=None)
+
+
+def image_owner_map():
+    """
+    Map every image path referenced by the database to its owning record.
+    Uses one values_list query per image-bearing model.
+
+    Returns:
+        dict: {path: (content_type_id, object_id)}
+    """
+    from ..models import Caliber, Headstamp, Load, Date, Variation, Box
+
+    owners = {}
+    for model in (Caliber, Headstamp, Load, Date, Variation, Box):
+        ct_id = ContentType.objects.get_for_model(model).id
+        rows = model.objects.exclude(image='').exclude(image__isnull=True).values_list('id', 'image')
+        for object_id, image_name in rows:
+            owners[normalize_path(image_name)] = (ct_id, object_id)
+    return owners
+
+
+def iter_media_images(media_root=None):
+    """
+    Walk MEDIA_ROOT and yield the relative path of every image file.
+    Skips the directories listed in EXCLUDED_DIRS.
+    """
+    media_root = media_root or settings.MEDIA_ROOT
+    if not os.path.isdir(media_root):
+        return
+
+    for dirpath, dirnames, filenames in os.walk(media_root):
+        if dirpath == media_root:
+            dirnames[:] = [d for d in dirnames if d not in EXCLUDED_DIRS]
+        for filename in filenames:
+            if is_image_path(filename):
+                full_path = os.path.join(dirpath, filename)
+                yield normalize_path(os.path.relpath(full_path, media_root))
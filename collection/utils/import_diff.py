@@ -0,0 +1,160 @@
+"""
+Change-set preview of a legacy import.
+
+diff_table() walks a legacy table and the matching model side by side, both
+ordered by the preserved ID, and writes one JSONL line per difference:
+
+    {"table": "Load", "op": "new", "id": 12, "values": {...}}
+    {"table": "Load", "op": "changed", "id": 5, "fields": {"description": [old, new]}}
+    {"table": "Load", "op": "missing", "id": 7}
+    {"table": "Load", "op": "conflict", "id": 9, "reason": "...", "fields": {...}}
+
+followed by a {"op": "summary"} line with the counts of the same pass.
+Nothing is validated or written, so a diff runs at scan speed; its change set
+can be applied with a merge import limited to the listed IDs (read_change_set).
+"""
+
+import gzip
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import OuterRef, Subquery
+
+from .import_engine import PRELOAD_CHUNK, iter_rows, legacy_row_hash
+
+# Returned by a field's value function when the import keeps the stored value (e.g. generated cart IDs)
+KEEP = object()
+
+# Change-set operations a merge applies; conflicts need a decision first
+APPLY_OPS = {'new', 'changed', 'missing'}
+
+
+def open_change_set(path, mode='rt'):
+    """Open a change-set file, gzipped when the name ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode[0], encoding='utf-8')
+
+
+def values_match(old, new):
+    """Compare a stored value with a legacy value, treating None and blank alike"""
+    if old in (None, '') or new in (None, ''):
+        return old in (None, '') and new in (None, '')
+    if isinstance(old, Decimal) or isinstance(new, Decimal):
+        try:
+            return Decimal(str(old)) == Decimal(str(new))
+        except InvalidOperation:
+            pass
+    return str(old) == str(new)
+
+
+def diff_table(cursor, table_name, spec, out):
+    """
+    Diff one legacy table against the database and write its change set.
+
+    Args:
+        cursor: Cursor on the legacy SQLite database (row factory sqlite3.Row)
+        table_name (str): Legacy table name, e.g. "Load"
+        spec (dict): 'model', 'query', 'id_column' and 'fields' ({model field: column
+                     name or function of the legacy row})
+        out: Text file the JSONL lines are written to
+
+    Returns:
+        dict: Counts of new, changed, unchanged, missing, conflict and local records
+    """
+    from ..models import LegacyRowHash
+
+    model = spec['model']
+    id_column = spec['id_column']
+    fields = list(spec['fields'])
+    has_legacy_id = any(field.name == 'legacy_id' for field in model._meta.concrete_fields)
+    counts = dict.fromkeys(['new', 'changed', 'unchanged', 'missing', 'conflict', 'local', 'invalid'], 0)
+
+    def legacy_values(row):
+        values = {}
+        for field, source in spec['fields'].items():
+            value = source(row) if callable(source) else row[source]
+            if value is not KEEP:
+                values[field] = value
+        return values
+
+    def emit(op, record_id, **data):
+        counts[op] += 1
+        out.write(json.dumps({'table': table_name, 'op': op, 'id': record_id, **data}, default=str))
+        out.write('\n')
+
+    # Stored records with the hash of the legacy row they came from, in one ordered query
+    stored_hash = LegacyRowHash.objects.filter(
+        model_name=model._meta.model_name, record_id=OuterRef('pk')
+    ).values('row_hash')[:1]
+    columns = ['pk', *fields] + (['legacy_id'] if has_legacy_id else [])
+    stored = model.objects.order_by('pk').annotate(stored_hash=Subquery(stored_hash)).values_list(
+        *columns, 'stored_hash'
+    ).iterator(chunk_size=PRELOAD_CHUNK)
+
+    cursor.execute(f"{spec['query']} ORDER BY {id_column}")
+    legacy = iter_rows(cursor)
+
+    row = next(legacy, None)
+    record = next(stored, None)
+    while row is not None or record is not None:
+        if row is not None and row[id_column] is None:
+            counts['invalid'] += 1
+            row = next(legacy, None)
+            continue
+
+        if record is None or (row is not None and row[id_column] < record[0]):
+            emit('new', row[id_column], values=legacy_values(row))
+            row = next(legacy, None)
+            continue
+
+        if row is None or row[id_column] > record[0]:
+            # Only records that came from the legacy database can go missing from it
+            if record[-1]:
+                emit('missing', record[0])
+            else:
+                counts['local'] += 1
+            record = next(stored, None)
+            continue
+
+        pk, row_hash = record[0], record[-1]
+        if row_hash and row_hash == legacy_row_hash(row):
+            counts['unchanged'] += 1
+        else:
+            current = dict(zip(fields, record[1:1 + len(fields)]))
+            changed = {
+                field: [current[field], value]
+                for field, value in legacy_values(row).items()
+                if not values_match(current[field], value)
+            }
+            if not row_hash and has_legacy_id and record[-2] != str(pk):
+                emit('conflict', pk, fields=changed,
+                     reason="The ID is held by a record that was not imported from the legacy database")
+            elif not row_hash and not changed:
+                # Imported before row hashes were kept, and still the same
+                counts['unchanged'] += 1
+            else:
+                # An empty field list means only joined or lookup columns changed
+                emit('changed', pk, fields=changed)
+        row = next(legacy, None)
+        record = next(stored, None)
+
+    out.write(json.dumps({'table': table_name, 'op': 'summary', 'counts': counts}))
+    out.write('\n')
+    return counts
+
+
+def read_change_set(path):
+    """
+    Collect the IDs a merge should apply from a change-set file.
+
+    Returns:
+        dict: {legacy table name: set of IDs} for new, changed and missing records
+    """
+    ids = {}
+    with open_change_set(path) as change_set:
+        for line in change_set:
+            entry = json.loads(line)
+            if entry['op'] in APPLY_OPS:
+                ids.setdefault(entry['table'], set()).add(entry['id'])
+    return ids
@@ -0,0 +1,576 @@
+"""
+Bulk write path for the legacy importers in views/import_views.py.
+
+The importers stream legacy rows with iter_rows, validate each one in memory
+against preloaded lookups and key sets, then hand the unsaved model instance
+to a BulkImportEngine, which inserts in bulk_create batches, links sources in
+bulk, spools per-record results to disk and resets the table's ID sequence
+once at the end.
+
+In merge mode the engine upserts by preserved ID instead: rows whose legacy
+content hash is unchanged are skipped, changed rows are written with
+bulk_update and records whose legacy row disappeared are deleted.
+"""
+
+import hashlib
+import json
+import re
+import tempfile
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .caliber_lookup import CALIBER_CODE_PATHS, invalidate_caliber_codes
+from .chat_vocabulary import invalidate_lookup_vocabulary
+from .data_version import bump_data_version_on_commit
+from .text_index import mark_text_index_stale
+
+# Rows per bulk_create batch
+DEFAULT_BATCH_SIZE = 2000
+
+# Source names per IN (...) query when resolving sources
+SOURCE_QUERY_CHUNK = 500
+
+# Rows fetched per round trip when preloading lookups
+PRELOAD_CHUNK = 5000
+
+# Legacy rows fetched per round trip from the uploaded SQLite file
+FETCH_BATCH_SIZE = 1000
+
+# Records deleted per query when a merge removes records gone from the legacy database
+DELETE_CHUNK = 500
+
+
+def iter_rows(cursor, batch_size=FETCH_BATCH_SIZE):
+    """Yield the rows of an executed legacy query without loading them all at once"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+# ===============================
+# Preloaded Lookups
+# ===============================
+
+def index_rows(rows):
+    """
+    Group (key, pk) rows into {key: [pk, ...]}, keeping row order so the
+    first pk matches what .first() would have returned for the same ordering.
+    """
+    index = {}
+    for key, pk in rows:
+        index.setdefault(key, []).append(pk)
+    return index
+
+
+def caliber_codes_by_pk(model_name):
+    """
+    Map every record of a hierarchy model to its caliber code in one query.
+
+    Args:
+        model_name (str): Lower-case model name, e.g. "load"
+
+    Returns:
+        dict: {pk: caliber code or None}
+    """
+    model = apps.get_model('collection', model_name)
+    rows = model.objects.order_by().values_list('pk', *CALIBER_CODE_PATHS[model_name])
+    return {
+        row[0]: next((value for value in row[1:] if value), None)
+        for row in rows.iterator(chunk_size=PRELOAD_CHUNK)
+    }
+
+
+def manufacturer_index():
+    """{(manufacturer code, country name): [manufacturer ids]}"""
+    from ..models import Manufacturer
+
+    rows = Manufacturer.objects.order_by('id').values_list('code', 'country__name', 'id')
+    return index_rows(((code, country), pk) for code, country, pk in rows.iterator(chunk_size=PRELOAD_CHUNK))
+
+
+def headstamp_indexes():
+    """
+    Returns:
+        tuple: ({(code, manufacturer code, country name): [ids]},
+                {(code, manufacturer code): [ids]}) - both in Headstamp's default ordering
+    """
+    from ..models import Headstamp
+
+    rows = list(Headstamp.objects.values_list(
+        'code', 'manufacturer__code', 'manufacturer__country__name', 'id'
+    ).iterator(chunk_size=PRELOAD_CHUNK))
+    by_country = index_rows(((code, manuf, country), pk) for code, manuf, country, pk in rows)
+    by_manufacturer = index_rows(((code, manuf), pk) for code, manuf, _, pk in rows)
+    return by_country, by_manufacturer
+
+
+def existing_unique_keys(model_name, field):
+    """
+    Current values of a per-caliber unique field, to seed UniqueKeys in merge mode.
+
+    Returns:
+        list: [(caliber code, value, pk)]
+    """
+    model = apps.get_model('collection', model_name)
+    paths = CALIBER_CODE_PATHS[model_name]
+    rows = model.objects.order_by().values_list(field, 'pk', *paths)
+    return [
+        (next((code for code in row[2:] if code), None), row[0], row[1])
+        for row in rows.iterator(chunk_size=PRELOAD_CHUNK)
+    ]
+
+
+def legacy_row_hash(row):
+    """Stable content hash of a legacy sqlite3.Row, including the joined columns"""
+    payload = json.dumps(dict(zip(row.keys(), tuple(row))), default=str, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def cart_id_index(model_name):
+    """{cart_id: [ids]} for Load, Date or Variation"""
+    model = apps.get_model('collection', model_name)
+    rows = model.objects.order_by('id').values_list('cart_id', 'id')
+    return index_rows(rows.iterator(chunk_size=PRELOAD_CHUNK))
+
+
+# ===============================
+# Bulk Writes
+# ===============================
+
+def reset_sequences(*models):
+    """Move the ID sequences of the given models past the highest stored ID"""
+    statements = connection.ops.sequence_reset_sql(no_style(), list(models))
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+class QueryCounter:
+    """Database execute wrapper counting the queries run while it is installed"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class UniqueKeys:
+    """
+    In-memory replacement for the uniqueness queries in the models' clean()
+    methods, e.g. cart_id unique within a caliber. Also allocates the next
+    numeric ID (L123, D45, ...) the way the models' save() methods do.
+    """
+
+    def __init__(self, existing=()):
+        """
+        Args:
+            existing (iterable): (scope, value, owner pk) of stored records
+        """
+        self.keys = {}
+        self.owned = {}
+        self.max_numbers = {}
+        for scope, value, owner in existing:
+            self.claim(scope, value, owner)
+
+    def claim(self, scope, value, owner=None):
+        """
+        Reserve a value within a scope. A record may re-claim its own value.
+
+        Returns:
+            bool: False if the value is already taken in that scope
+        """
+        key = (scope, value)
+        if key in self.keys and (owner is None or self.keys[key] != owner):
+            return False
+        self.keys[key] = owner
+        if owner is not None:
+            self.owned[(scope, owner)] = value
+
+        match = re.match(r'^([A-Za-z]+)(\d+)$', value or '')
+        if match:
+            prefix, number = match.group(1), int(match.group(2))
+            counter = (scope, prefix)
+            self.max_numbers[counter] = max(self.max_numbers.get(counter, 0), number)
+        return True
+
+    def next_value(self, scope, prefix, owner=None):
+        """
+        Claim and return the next free <prefix><number> value in a scope.
+        A stored record keeps the value it already has in that scope.
+        """
+        if (scope, owner) in self.owned:
+            return self.owned[(scope, owner)]
+        number = self.max_numbers.get((scope, prefix), 0) + 1
+        value = f"{prefix}{number}"
+        while not self.claim(scope, value):
+            number += 1
+            value = f"{prefix}{number}"
+        return value
+
+
+class ImportResultLog:
+    """
+    Per-record import results spooled to an anonymous JSONL temp file, so
+    memory does not grow with the size of the legacy table. Records stay
+    buffered until the engine has written the rows they describe, since
+    source messages are added to them at that point.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.count = 0
+        self.file = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+
+    def append(self, record_result):
+        self.pending.append(record_result)
+
+    def flush(self):
+        """Write the buffered records to disk"""
+        for record_result in self.pending:
+            self.file.write(json.dumps(record_result, default=str))
+            self.file.write('\n')
+        self.count += len(self.pending)
+        self.pending = []
+
+    def __len__(self):
+        return self.count + len(self.pending)
+
+    def __iter__(self):
+        """Read the records back in order. Reading consumes the log and deletes the file."""
+        self.flush()
+        self.file.seek(0)
+        try:
+            for line in self.file:
+                yield json.loads(line)
+        finally:
+            self.file.close()
+
+
+class BulkImportEngine:
+    """
+    Collect validated model instances and write them in bulk.
+
+    Failed batches are retried row by row so the error is attributed to the
+    offending legacy record; those records end up in `failures`. Every
+    record result, successful or not, goes through record() so the report
+    keeps the legacy row order.
+    """
+
+    def __init__(self, model, link_model=None, link_field=None,
+                 batch_size=DEFAULT_BATCH_SIZE, dry_run=False, merge=False, only_ids=None,
+                 source_ids=None, fields=()):
+        """
+        Args:
+            model: Model class being imported
+            link_model: Optional source link model (e.g. LoadSource)
+            link_field (str): Name of the FK on link_model pointing at model
+            batch_size (int): Rows per bulk_create
+            dry_run (bool): Validate and count only; nothing is written
+            merge (bool): Upsert by preserved ID instead of inserting into an emptied table
+            only_ids (set): In merge mode, apply only these IDs (a diff change set);
+                            every other row is treated as unchanged
+            source_ids (dict): Source name -> ID map to share with other engines, so
+                               each name is resolved once per import
+            fields (list): Fields the importer fills from the legacy row; a merge
+                           updates only these, so app-maintained fields are kept
+        """
+        from ..models import LegacyRowHash
+
+        self.model = model
+        self.link_model = link_model
+        self.link_field = link_field
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.merge = merge
+        self.only_ids = only_ids if merge else None
+
+        self.pending = []
+        self.pending_updates = []
+        self.pending_sources = []
+        self.results = ImportResultLog()
+        self.failures = []
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.delete_failures = []
+
+        # Source name -> ID (None for sources a dry run would create)
+        self.source_ids = source_ids if source_ids is not None else {}
+        self.sources_created = 0
+        self.source_links_created = 0
+
+        # Merge state: stored records, their last imported row hashes and the legacy IDs seen
+        self.model_name = model._meta.model_name
+        if merge and not fields:
+            raise ValueError(f"A merge into {model.__name__} needs the list of legacy-mapped fields")
+        self.update_fields = list(fields)
+        if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+            self.update_fields.append('updated_at')
+        self.seen = set()
+        self.existing_ids = set()
+        self.stored_hashes = {}
+        if merge:
+            self.existing_ids = set(model.objects.values_list('pk', flat=True).iterator(chunk_size=PRELOAD_CHUNK))
+            self.stored_hashes = dict(
+                LegacyRowHash.objects.filter(model_name=self.model_name)
+                .values_list('record_id', 'row_hash').iterator(chunk_size=PRELOAD_CHUNK)
+            )
+
+    def is_unchanged(self, pk, row_hash):
+        """
+        Register a legacy row before it is transformed.
+
+        Returns:
+            bool: True in merge mode when the stored record was imported from
+                  identical legacy content, so the row can be skipped
+        """
+        self.seen.add(pk)
+        if self.only_ids is not None and pk not in self.only_ids:
+            self.unchanged += 1
+            return True
+        if self.merge and pk in self.existing_ids and self.stored_hashes.get(pk) == row_hash:
+            self.unchanged += 1
+            return True
+        return False
+
+    def add(self, obj, record_result, sources_info=(), row_hash=None):
+        """
+        Queue an unsaved instance with its report entry and extracted sources.
+        In merge mode instances whose ID is already stored are queued as updates.
+        Sources are ignored for models without a link model.
+        """
+        obj._legacy_row_hash = row_hash
+        if self.merge and obj.pk in self.existing_ids:
+            self.pending_updates.append((obj, record_result))
+            record_result['action'] = 'updated'
+        else:
+            self.pending.append((obj, record_result))
+            if self.merge:
+                record_result['action'] = 'inserted'
+        if sources_info and self.link_model:
+            self.pending_sources.append((obj, record_result, sources_info))
+
+    def record(self, record_result):
+        """Add a finished record result to the report, flushing a full batch"""
+        self.results.append(record_result)
+        if len(self.results.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the queued instances, link their sources and spool their results"""
+        batch, self.pending = self.pending, []
+        updates, self.pending_updates = self.pending_updates, []
+
+        if self.dry_run:
+            self.inserted += len(batch)
+            self.updated += len(updates)
+        else:
+            self.inserted += self._write(batch, lambda objs: self.model.objects.bulk_create(objs))
+
+            now = timezone.now()
+            for obj, _ in updates:
+                if hasattr(obj, 'updated_at'):
+                    obj.updated_at = now
+            self.updated += self._write(
+                updates, lambda objs: self.model.objects.bulk_update(objs, self.update_fields)
+            )
+            self._store_hashes(batch + updates)
+
+        self._link_sources()
+        self.results.flush()
+
+    def _write(self, batch, write):
+        """
+        Write a batch in one statement, or row by row if that fails.
+
+        Returns:
+            int: Number of records written
+        """
+        if not batch:
+            return 0
+        try:
+            with transaction.atomic():
+                write([obj for obj, _ in batch])
+            return len(batch)
+        except Exception:
+            # Retry one row at a time to find the records that cannot be written
+            written = 0
+            for obj, record_result in batch:
+                try:
+                    with transaction.atomic():
+                        write([obj])
+                    written += 1
+                except Exception as e:
+                    self._fail(obj, record_result, f"Error: {str(e)}")
+            return written
+
+    def _fail(self, obj, record_result, error_msg):
+        obj._import_failed = True
+        record_result['status'] = 'error'
+        record_result['errors'].append(error_msg)
+        self.failures.append((record_result, error_msg))
+
+    def _store_hashes(self, batch):
+        """Remember the legacy row hashes of the records just written"""
+        from ..models import LegacyRowHash
+
+        hashes = [
+            LegacyRowHash(model_name=self.model_name, record_id=obj.pk, row_hash=obj._legacy_row_hash)
+            for obj, _ in batch
+            if obj._legacy_row_hash and not getattr(obj, '_import_failed', False)
+        ]
+        if hashes:
+            LegacyRowHash.objects.bulk_create(
+                hashes,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['model_name', 'record_id'],
+                update_fields=['row_hash', 'imported_at'],
+            )
+
+    def finish(self):
+        """Flush remaining rows, remove records gone from the legacy database and reset the ID sequence"""
+        self.flush()
+        if self.merge:
+            self._delete_missing()
+        if not self.dry_run:
+            reset_sequences(self.model)
+            if self.link_model:
+                reset_sequences(self.link_model)
+            # bulk_create bypasses post_save, which normally keeps these caches fresh
+            invalidate_caliber_codes()
+            invalidate_lookup_vocabulary()
+            bump_data_version_on_commit()
+            # Too many records changed to journal one by one; the import worker or command rebuilds the index
+            transaction.on_commit(mark_text_index_stale)
+
+    def _delete_missing(self):
+        """
+        Delete previously imported records whose legacy row no longer exists.
+        Records created in the app have no stored hash and are never touched.
+        """
+        from django.db.models import ProtectedError
+        from django.db import IntegrityError
+        from ..models import LegacyRowHash
+
+        missing = sorted(set(self.stored_hashes) - self.seen)
+        if self.only_ids is not None:
+            missing = [pk for pk in missing if pk in self.only_ids]
+        stale = [pk for pk in missing if pk in self.existing_ids]
+        if self.dry_run:
+            self.deleted = len(stale)
+            return
+
+        deleted_ids = []
+        for start in range(0, len(stale), DELETE_CHUNK):
+            chunk = stale[start:start + DELETE_CHUNK]
+            try:
+                with transaction.atomic():
+                    self.model.objects.filter(pk__in=chunk).delete()
+                deleted_ids.extend(chunk)
+            except (ProtectedError, IntegrityError):
+                # Some records are still referenced; delete the rest one by one
+                for pk in chunk:
+                    try:
+                        with transaction.atomic():
+                            self.model.objects.filter(pk=pk).delete()
+                        deleted_ids.append(pk)
+                    except (ProtectedError, IntegrityError) as e:
+                        self.delete_failures.append((pk, str(e)))
+        self.deleted = len(deleted_ids)
+
+        # Forget hashes of deleted records and of records already removed in the app
+        forget = deleted_ids + [pk for pk in missing if pk not in self.existing_ids]
+        for start in range(0, len(forget), DELETE_CHUNK):
+            LegacyRowHash.objects.filter(
+                model_name=self.model_name, record_id__in=forget[start:start + DELETE_CHUNK]
+            ).delete()
+
+    def merge_stats(self):
+        """Inserted/updated/unchanged/deleted counts of a merge, or None for a replace"""
+        if not self.merge:
+            return None
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'deleted': self.deleted,
+            'not_deleted': len(self.delete_failures),
+        }
+
+    def _link_sources(self):
+        """Resolve the batch's source names and insert its links in bulk"""
+        from ..models import Source
+
+        entries = [entry for entry in self.pending_sources if not getattr(entry[0], '_import_failed', False)]
+        self.pending_sources = []
+        if not entries:
+            return
+
+        names = {info['name'] for _, _, sources_info in entries for info in sources_info}
+        unknown = names - set(self.source_ids)
+        if unknown:
+            self.source_ids.update(self._resolve_sources(Source, unknown))
+            created_names = unknown - set(self.source_ids)
+            if created_names and not self.dry_run:
+                now = timezone.now()
+                Source.objects.bulk_create(
+                    [Source(name=name, description='', created_at=now) for name in sorted(created_names)],
+                    batch_size=self.batch_size,
+                )
+                self.source_ids.update(self._resolve_sources(Source, created_names))
+            else:
+                self.source_ids.update(dict.fromkeys(created_names))
+            self.sources_created += len(created_names)
+        else:
+            created_names = set()
+
+        links = []
+        seen = set()
+        for obj, record_result, sources_info in entries:
+            for info in sources_info:
+                name = info['name']
+                if name in created_names:
+                    created_names.discard(name)
+                    prefix = "Would create" if self.dry_run else "Created"
+                    record_result['sources'].append(f"{prefix} new source: {name}")
+
+                key = (obj.pk, name)
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                self.source_links_created += 1
+                prefix = "Would link" if self.dry_run else "Linked"
+                record_result['sources'].append(f"{prefix} source: {name} ({info['date']})")
+
+                if not self.dry_run:
+                    links.append(self.link_model(**{
+                        f'{self.link_field}_id': obj.pk,
+                        'source_id': self.source_ids[name],
+                        'date_sourced': info['date'],
+                        'note': f"cc: {info['cc']}; note: {info.get('note', '')}",
+                    }))
+
+        if links:
+            self.link_model.objects.bulk_create(links, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def _resolve_sources(self, source_model, names):
+        """Map source names to IDs, preferring the oldest source for duplicated names"""
+        source_ids = {}
+        names = list(names)
+        for start in range(0, len(names), SOURCE_QUERY_CHUNK):
+            rows = source_model.objects.filter(
+                name__in=names[start:start + SOURCE_QUERY_CHUNK]
+            ).order_by('-id').values_list('name', 'id')
+            source_ids.update(rows)
+        return source_ids
@@ -0,0 +1,136 @@
+"""
+Storage for legacy-import uploads and reports under MEDIA_ROOT.
+
+Uploaded databases live in temp_imports/ and are described by ImportUpload
+rows; complete import reports are gzipped into import_reports/, under names
+that cannot be guessed from the job id, and referenced by ImportJob.report_file.
+serve_media_file never serves either folder. Both expire: expire_imports() removes old uploads,
+finished jobs with their reports, stray files and expired sessions. The
+run_import_jobs worker calls it periodically, and the expire_imports command
+runs it on demand.
+"""
+
+import gzip
+import os
+import secrets
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+UPLOAD_DIR = 'temp_imports'
+REPORT_DIR = 'import_reports'
+
+# Uploaded databases are only needed between the dry run and the actual import
+UPLOAD_RETENTION = timedelta(hours=getattr(settings, 'IMPORT_UPLOAD_RETENTION_HOURS', 24))
+
+# Finished jobs and their reports stay downloadable this long
+JOB_RETENTION = timedelta(days=getattr(settings, 'IMPORT_JOB_RETENTION_DAYS', 30))
+
+
+def write_report(job_id, chunks):
+    """
+    Stream report text to a gzipped file.
+
+    Args:
+        job_id (int): ID of the ImportJob the report belongs to
+        chunks (iterable): Report text pieces, written as they are produced
+
+    Returns:
+        str: Report path relative to MEDIA_ROOT
+    """
+    report_file = os.path.join(REPORT_DIR, f"job_{job_id}_{secrets.token_hex(16)}.txt.gz")
+    report_path = default_storage.path(report_file)
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with gzip.open(report_path, 'wt', encoding='utf-8') as report:
+        for chunk in chunks:
+            report.write(chunk)
+    return report_file
+
+
+def open_report(report_file):
+    """Open a stored report for reading as uncompressed bytes"""
+    if report_file.endswith('.gz'):
+        return gzip.open(default_storage.path(report_file), 'rb')
+    # Reports written before they were compressed
+    return default_storage.open(report_file, 'rb')
+
+
+def delete_file(path):
+    """Delete a stored file, ignoring files that are already gone"""
+    if path and default_storage.exists(path):
+        default_storage.delete(path)
+        return True
+    return False
+
+
+def _delete_stray_files(directory, keep, cutoff):
+    """Delete files in a MEDIA_ROOT directory older than cutoff that no row references"""
+    base = default_storage.path(directory)
+    if not os.path.isdir(base):
+        return 0
+
+    deleted = 0
+    for name in os.listdir(base):
+        path = os.path.join(directory, name)
+        full_path = os.path.join(base, name)
+        if path in keep or not os.path.isfile(full_path):
+            continue
+        if os.path.getmtime(full_path) < cutoff:
+            os.remove(full_path)
+            deleted += 1
+    return deleted
+
+
+def expire_imports(now=None):
+    """
+    Remove expired import uploads, finished jobs, their files, expired sessions
+    and the chat conversations of expired sessions.
+    Uploads still used by a queued or running job are kept.
+
+    Returns:
+        dict: Number of uploads, jobs, stray files and conversations removed
+    """
+    from ..models import ImportJob, ImportUpload
+    from .chat_history import expire_conversations
+
+    now = now or timezone.now()
+    active = [ImportJob.STATUS_QUEUED, ImportJob.STATUS_RUNNING]
+
+    jobs = ImportJob.objects.filter(
+        finished_at__lt=now - JOB_RETENTION
+    ).exclude(status__in=active)
+    expired_jobs = 0
+    for job in jobs.only('id', 'report_file').iterator():
+        delete_file(job.report_file)
+        job.delete()
+        expired_jobs += 1
+
+    uploads = ImportUpload.objects.filter(
+        created_at__lt=now - UPLOAD_RETENTION
+    ).exclude(jobs__status__in=active)
+    expired_uploads = 0
+    for upload in uploads.only('id', 'file_path').iterator():
+        delete_file(upload.file_path)
+        upload.delete()
+        expired_uploads += 1
+
+    # Files left behind by uploads and jobs that no longer have a row
+    keep = set(ImportUpload.objects.values_list('file_path', flat=True))
+    keep.update(ImportJob.objects.exclude(report_file='').values_list('report_file', flat=True))
+    keep.update(ImportJob.objects.filter(status__in=active).values_list('file_path', flat=True))
+    stray_files = _delete_stray_files(UPLOAD_DIR, keep, (now - UPLOAD_RETENTION).timestamp())
+    stray_files += _delete_stray_files(REPORT_DIR, keep, (now - JOB_RETENTION).timestamp())
+
+    # Sessions are never pruned otherwise
+    import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+    expired_conversations = expire_conversations(now)
+
+    return {
+        'uploads': expired_uploads,
+        'jobs': expired_jobs,
+        'files': stray_files,
+        'conversations': expired_conversations,
+    }
@@ -0,0 +1,237 @@
+"""
+Synthetic legacy databases for import benchmarks.
+
+generate_legacy_database() writes a SQLite file with the Country, Manuf,
+Headstamp, Load, Date, Variation and Box tables of the legacy collection
+database, at any size from a few hundred to millions of rows. Records refer
+to each other the way the real data does, and notes carry the
+"[Source: name, cc, year]" markers extract_sources_from_note() parses, so a
+generated file exercises every importer on its normal path. The same size
+and seed always produce the same file.
+"""
+
+import os
+import random
+import sqlite3
+
+LEGACY_SCHEMA = """
+CREATE TABLE Country (
+    country_id INTEGER PRIMARY KEY, name TEXT, full_name TEXT, note TEXT
+);
+CREATE TABLE Manuf (
+    manuf_id INTEGER PRIMARY KEY, code TEXT, name TEXT, country_id INTEGER, note TEXT
+);
+CREATE TABLE Headstamp (
+    headstamp_id INTEGER PRIMARY KEY, code TEXT, name TEXT, manuf_id INTEGER,
+    prim_man_id INTEGER, cc INTEGER, note TEXT
+);
+CREATE TABLE Load (
+    load_id INTEGER PRIMARY KEY, cart_id TEXT, headstamp_id INTEGER, load_type TEXT, bullet TEXT,
+    magnetic TEXT, case_type TEXT, primer TEXT, pa_color TEXT, description TEXT, cc INTEGER,
+    col_date TEXT, price TEXT, note TEXT
+);
+CREATE TABLE Date (
+    date_id INTEGER PRIMARY KEY, cart_id TEXT, load_id INTEGER, year TEXT, lot_month TEXT,
+    cc INTEGER, col_date TEXT, price TEXT, note TEXT
+);
+CREATE TABLE Variation (
+    var_id INTEGER PRIMARY KEY, cart_id TEXT, load_id INTEGER, date_id INTEGER, var_type TEXT,
+    description TEXT, cc INTEGER, col_date TEXT, price TEXT, note TEXT
+);
+CREATE TABLE Box (
+    box_id INTEGER PRIMARY KEY, bid TEXT, sup_type TEXT, sup_id INTEGER, location TEXT,
+    description TEXT, art_type TEXT, cc INTEGER, col_date TEXT, price TEXT, note TEXT
+);
+"""
+
+# Share of the requested rows each table gets, close to the real collection
+TABLE_SHARES = {
+    'Country': 0.005,
+    'Manuf': 0.03,
+    'Headstamp': 0.12,
+    'Load': 0.45,
+    'Date': 0.18,
+    'Variation': 0.115,
+    'Box': 0.10,
+}
+
+# Legacy lookup values, including a few spellings no lookup table maps
+LOAD_TYPES = ['Ball', 'ball', 'AP', 'Tracer', 'Incendiary', 'API', 'Blank', 'Dummy', 'Proof', 'Grenade', '']
+BULLETS = ['FMJ', 'RN', 'SP', 'HP', 'Wadcutter', 'Spitzer', 'Lead', '']
+CASE_TYPES = ['Brass', 'Steel', 'Lacquered steel', 'Aluminum', 'Copper-washed steel', '']
+PRIMERS = ['Boxer', 'Berdan', 'Rimfire', '']
+PA_COLORS = ['Red', 'Green', 'Purple', 'Black', 'Blue', 'Yellow', 'None', '']
+ART_TYPES = ['box', 'Box', 'label', 'photo', 'drawing', 'document', 'Carton', 'Bandolier', None]
+
+# Parent types of boxes, weighted like the real data; box parents are skipped by the importer
+BOX_PARENTS = ['load'] * 10 + ['date'] * 4 + ['var'] * 2 + ['hst'] * 2 + ['manuf', 'country', 'box']
+
+NOTE_PHRASES = [
+    'Acquired at the annual show.', 'Traded with a fellow collector.', 'Headstamp partly struck.',
+    'Case shows light corrosion.', 'Primer annulus color faded.', 'Bullet seated deep.',
+    'Ex-museum specimen.', 'Unfired, inert.', 'Original packaging lot.', 'Known from one other example.',
+]
+SOURCE_FIRST = ['John', 'Anna', 'Peter', 'Maria', 'Hans', 'Luis', 'Chen', 'Olga', 'Tom', 'Erik']
+SOURCE_LAST = ['Smith', 'Müller', 'Rossi', 'Dubois', 'Kowalski', 'Ivanov', 'Tanaka', 'Silva', 'Berg']
+
+
+def table_sizes(rows):
+    """Rows per legacy table for a file of about `rows` rows in total"""
+    return {table: max(1, round(rows * share)) for table, share in TABLE_SHARES.items()}
+
+
+class _NoteWriter:
+    """Notes with embedded source markers, drawn from a pool of source names that grows with the data"""
+
+    def __init__(self, rng, rows):
+        self.rng = rng
+        pool_size = max(10, int(rows ** 0.5))
+        self.sources = [
+            f"{rng.choice(SOURCE_FIRST)} {rng.choice(SOURCE_LAST)} {n}" if n >= 50
+            else f"{rng.choice(SOURCE_FIRST)} {rng.choice(SOURCE_LAST)}"
+            for n in range(pool_size)
+        ]
+
+    def source_entry(self):
+        rng = self.rng
+        year = rng.choice([rng.randint(0, 59), rng.randint(60, 99), rng.randint(1950, 2024)])
+        entry = f"{rng.choice(self.sources)}, {rng.randint(1, 5)}, {year:02d}"
+        if rng.random() < 0.2:
+            entry += f" ({rng.choice(['box', 'letter', 'catalog', 'photo'])})"
+        return entry
+
+    def note(self):
+        rng = self.rng
+        text = ' '.join(rng.sample(NOTE_PHRASES, rng.randint(0, 2)))
+        roll = rng.random()
+        if roll < 0.35:
+            text += f" [Source: {self.source_entry()}]"
+        elif roll < 0.45:
+            entries = '; '.join(self.source_entry() for _ in range(rng.randint(2, 3)))
+            text += f" [Source: {entries}]"
+        elif roll < 0.46:
+            # Malformed markers the importer warns about
+            text += f" [Source: {rng.choice(self.sources)}]"
+        return text.strip()
+
+
+def _price(rng):
+    roll = rng.random()
+    if roll < 0.6:
+        return None
+    if roll < 0.95:
+        return f"${rng.randint(0, 400)}.{rng.choice(['00', '50', '25', '99'])}"
+    return rng.choice(['trade', 'gift', '?'])
+
+
+def _col_date(rng):
+    if rng.random() < 0.5:
+        return None
+    return rng.choice([f"{rng.randint(1970, 2024)}", f"{rng.randint(1, 12)}/{rng.randint(1970, 2024)}", 'SLICS'])
+
+
+def generate_legacy_database(path, rows=10000, seed=0, batch_size=5000):
+    """
+    Write a synthetic legacy database.
+
+    Args:
+        path (str): SQLite file to create; an existing file is replaced
+        rows (int): Approximate number of rows over all tables
+        seed (int): Random seed; the same rows and seed give the same file
+        batch_size (int): Rows per executemany
+
+    Returns:
+        dict: Rows written per table
+    """
+    rng = random.Random(seed)
+    notes = _NoteWriter(rng, rows)
+    sizes = table_sizes(rows)
+
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(LEGACY_SCHEMA)
+
+        def insert(table, generate):
+            placeholders = None
+            batch = []
+            for row in generate():
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    placeholders = placeholders or ','.join('?' * len(row))
+                    conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", batch)
+                    batch = []
+            if batch:
+                placeholders = placeholders or ','.join('?' * len(batch[0]))
+                conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", batch)
+
+        n_country = sizes['Country']
+        n_manuf = sizes['Manuf']
+        n_headstamp = sizes['Headstamp']
+        n_load = sizes['Load']
+        n_date = sizes['Date']
+        n_variation = sizes['Variation']
+
+        insert('Country', lambda: (
+            (i, f"Country {i}", f"Republic of Country {i}", notes.note() if rng.random() < 0.2 else None)
+            for i in range(1, n_country + 1)
+        ))
+        # Codes repeat across countries, as they do in the real data
+        insert('Manuf', lambda: (
+            (i, f"M{(i - 1) // n_country + 1}", f"Manufacturer {i}", (i - 1) % n_country + 1, notes.note())
+            for i in range(1, n_manuf + 1)
+        ))
+        insert('Headstamp', lambda: (
+            (i, f"HS{(i - 1) // n_manuf + 1}", rng.choice(['', f"Headstamp {i}"]), (i - 1) % n_manuf + 1,
+             rng.randint(1, n_manuf) if rng.random() < 0.1 else None, rng.randint(1, 5), notes.note())
+            for i in range(1, n_headstamp + 1)
+        ))
+        insert('Load', lambda: (
+            (i, f"L{i}" if rng.random() > 0.02 else None, rng.randint(1, n_headstamp),
+             rng.choice(LOAD_TYPES), rng.choice(BULLETS), rng.choice(['Y', 'N', None]),
+             rng.choice(CASE_TYPES), rng.choice(PRIMERS), rng.choice(PA_COLORS),
+             rng.choice(['', 'Ball', 'Match grade', 'Short case', f"Lot {rng.randint(1, 999)}"]),
+             rng.randint(1, 5), _col_date(rng), _price(rng), notes.note())
+            for i in range(1, n_load + 1)
+        ))
+        insert('Date', lambda: (
+            (i, f"D{i}" if rng.random() > 0.02 else None, rng.randint(1, n_load),
+             str(rng.randint(1900, 2020)) if rng.random() > 0.1 else None,
+             rng.choice(['', str(rng.randint(1, 12)), f"Lot {rng.randint(1, 200)}"]),
+             rng.randint(1, 5), _col_date(rng), _price(rng), notes.note())
+            for i in range(1, n_date + 1)
+        ))
+
+        def variations():
+            for i in range(1, n_variation + 1):
+                on_date = rng.random() < 0.3
+                yield (
+                    i, f"V{i}" if rng.random() > 0.02 else None,
+                    None if on_date else rng.randint(1, n_load), rng.randint(1, n_date) if on_date else None,
+                    'date' if on_date else 'load', rng.choice(['Red tip', 'Nickel case', 'Knurled', '']),
+                    rng.randint(1, 5), _col_date(rng), _price(rng), notes.note(),
+                )
+        insert('Variation', variations)
+
+        parent_counts = {
+            'country': n_country, 'manuf': n_manuf, 'hst': n_headstamp, 'load': n_load,
+            'date': n_date, 'var': n_variation, 'box': sizes['Box'],
+        }
+
+        def boxes():
+            for i in range(1, sizes['Box'] + 1):
+                sup_type = rng.choice(BOX_PARENTS)
+                yield (
+                    i, f"B{i}" if rng.random() > 0.02 else None, sup_type,
+                    rng.randint(1, parent_counts[sup_type]), rng.choice(['Shelf A', 'Shelf B', 'Drawer 3', None]),
+                    rng.choice(['20 rds', 'Label only', 'Sealed', '']), rng.choice(ART_TYPES),
+                    rng.randint(1, 5), _col_date(rng), _price(rng), notes.note(),
+                )
+        insert('Box', boxes)
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    return sizes
@@ -0,0 +1,219 @@
+"""
+Resolution of legacy values to records of the new database.
+
+LegacyResolver compiles the five extensible lookup tables (matched through
+their legacy_mappings text) and the country, manufacturer and headstamp
+natural keys into read-only dict indexes the first time each is needed, then
+answers every lookup with dict gets while counting hits and misses. One
+resolver is meant to be shared for a whole import: by the importers, the
+import pipeline and the data_migration lookup scripts.
+"""
+
+import json
+from collections import Counter
+from types import MappingProxyType
+
+from django.apps import apps
+
+from .import_engine import PRELOAD_CHUNK, headstamp_indexes, index_rows, manufacturer_index
+
+# Legacy Load column -> lookup model holding its values
+LOOKUP_MODELS = {
+    'load_type': 'LoadType',
+    'bullet': 'BulletType',
+    'case_type': 'CaseType',
+    'primer': 'PrimerType',
+    'pa_color': 'PAColor',
+}
+
+# Indexes built from records the importers write; refresh() them after a table is imported
+NATURAL_KEYS = ('country', 'manufacturer', 'headstamp')
+
+
+def parse_legacy_mappings(text):
+    """
+    Split a legacy_mappings field into its values. Accepts the plain
+    comma-separated form as well as JSON-like lists such as "['a', 'b']".
+    """
+    if not text:
+        return []
+
+    if text.startswith('[') and text.endswith(']'):
+        try:
+            values = json.loads(text.replace("'", '"'))
+        except json.JSONDecodeError:
+            values = [value.strip(' "\'') for value in text.strip('[]').split(',')]
+    else:
+        values = [value.strip() for value in text.split(',')]
+
+    return [str(value) for value in values if value]
+
+
+def freeze(index):
+    """Read-only view of a {key: [ids]} index with tuple values"""
+    return MappingProxyType({key: tuple(ids) for key, ids in index.items()})
+
+
+class LegacyResolver:
+    """
+    Compiled legacy-value indexes with hit/miss statistics.
+
+    Lookup values are matched exactly, then case-insensitively, then with
+    surrounding whitespace removed, the same order the importers always used.
+    Each distinct legacy value is resolved once and remembered.
+    """
+
+    def __init__(self):
+        self.indexes = {}
+        self.lookup_objects = {}
+        self.resolved = {}
+        self.counts = Counter()
+
+    # ===============================
+    # Lookup Tables
+    # ===============================
+
+    def lookup_index(self, field):
+        """{legacy value: lookup object} for a legacy Load column, compiled on first use"""
+        index = self.indexes.get(field)
+        if index is None:
+            model = apps.get_model('collection', LOOKUP_MODELS[field])
+            objects = tuple(model.objects.all())
+            mapping = {}
+            for obj in objects:
+                for value in parse_legacy_mappings(obj.legacy_mappings):
+                    mapping[value] = obj
+                    mapping[value.lower()] = obj
+            self.lookup_objects[field] = objects
+            index = self.indexes[field] = MappingProxyType(mapping)
+        return index
+
+    def objects(self, field):
+        """All records of a lookup table, in the model's default ordering"""
+        self.lookup_index(field)
+        return self.lookup_objects[field]
+
+    def default_load_type(self):
+        """The "Unknown" or "Unspecified" load type, else the first one"""
+        load_types = self.objects('load_type')
+        for load_type in load_types:
+            if load_type.display_name in ("Unknown", "Unspecified"):
+                return load_type
+        return load_types[0] if load_types else None
+
+    def resolve(self, field, value):
+        """
+        Returns:
+            The lookup object a legacy value maps to, or None
+        """
+        key = (field, value)
+        if key in self.resolved:
+            obj = self.resolved[key]
+        else:
+            index = self.lookup_index(field)
+            obj = index.get(value) or index.get(value.lower())
+            if not obj and value.strip() != value:
+                obj = index.get(value.strip()) or index.get(value.strip().lower())
+            self.resolved[key] = obj
+        self._count(field, obj)
+        return obj
+
+    def map_value(self, field, value, default=None):
+        """
+        Map a legacy value, falling back to a default.
+
+        Returns:
+            tuple: (mapped object or None, warning message or empty string)
+        """
+        if not value:
+            if default is not None:
+                return default, f"No {field} specified, using default"
+            return None, ""
+
+        obj = self.resolve(field, value)
+        if not obj:
+            if default is not None:
+                return default, f"Unknown {field} '{value}', using default"
+            return None, f"Unknown {field} '{value}', leaving blank"
+        return obj, ""
+
+    # ===============================
+    # Natural Keys
+    # ===============================
+
+    def _natural_index(self, name):
+        index = self.indexes.get(name)
+        if index is None:
+            if name == 'country':
+                Country = apps.get_model('collection', 'Country')
+                rows = Country.objects.order_by('id').values_list('name', 'id')
+                index = {'by_name': freeze(index_rows(rows.iterator(chunk_size=PRELOAD_CHUNK)))}
+            elif name == 'manufacturer':
+                index = {'by_code': freeze(manufacturer_index())}
+            else:
+                by_country, by_manufacturer = headstamp_indexes()
+                index = {'by_country': freeze(by_country), 'by_manufacturer': freeze(by_manufacturer)}
+            index = self.indexes[name] = MappingProxyType(index)
+        return index
+
+    def country_ids(self, name):
+        """IDs of the countries with this name"""
+        ids = self._natural_index('country')['by_name'].get(name, ())
+        self._count('country', ids)
+        return ids
+
+    def manufacturer(self, manuf_code, country_name):
+        """
+        Find the one manufacturer with a code in a country.
+
+        Returns:
+            tuple: (manufacturer ID or None, error message or empty string)
+        """
+        if not manuf_code or not country_name:
+            return None, "Missing manufacturer code or country name"
+
+        if not self._natural_index('country')['by_name'].get(country_name):
+            self._count('manufacturer', None)
+            return None, f"Country '{country_name}' not found in the new database"
+
+        matches = self._natural_index('manufacturer')['by_code'].get((manuf_code, country_name), ())
+        self._count('manufacturer', matches)
+        if not matches:
+            return None, f"Manufacturer with code '{manuf_code}' for country '{country_name}' not found"
+        if len(matches) > 1:
+            return None, f"Multiple manufacturers found with code '{manuf_code}' for country '{country_name}'"
+        return matches[0], ""
+
+    def headstamp_ids(self, code, manuf_code, country_name=None):
+        """
+        IDs of the headstamps with a code and manufacturer code, narrowed to a
+        country when one is given. Ordered like Headstamp's default ordering.
+        """
+        index = self._natural_index('headstamp')
+        if country_name is None:
+            ids = index['by_manufacturer'].get((code, manuf_code), ())
+        else:
+            ids = index['by_country'].get((code, manuf_code, country_name), ())
+        self._count('headstamp', ids)
+        return ids
+
+    def refresh(self, *names):
+        """Forget compiled indexes (all by default) so they are rebuilt on next use"""
+        for name in names or list(self.indexes):
+            self.indexes.pop(name, None)
+            self.lookup_objects.pop(name, None)
+        self.resolved = {key: obj for key, obj in self.resolved.items() if key[0] not in names} if names else {}
+
+    # ===============================
+    # Statistics
+    # ===============================
+
+    def _count(self, name, found):
+        self.counts[(name, 'hits' if found else 'misses')] += 1
+
+    def stats(self):
+        """{index name: {'hits': n, 'misses': n}} for every index used so far"""
+        summary = {}
+        for (name, outcome), count in sorted(self.counts.items()):
+            summary.setdefault(name, {'hits': 0, 'misses': 0})[outcome] = count
+        return summary
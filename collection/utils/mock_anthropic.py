@@ -0,0 +1,264 @@
+"""
+Local stand-in for the Anthropic Messages API, for benchmarking and load
+testing the chat without spending API calls.
+
+It replays scripts: one script per user message, each a list of turns, and
+each turn either tool calls or the final text. Scripts are read from chat
+logs (every logged exchange becomes one, with its tool calls grouped by
+round) or from a JSON file of the same shape:
+
+    [{"message": "How many Belgian loads?", "turns": [
+        {"tools": [{"name": "aggregate_collection", "input": {...}}]},
+        {"text": "There are 42."}]}]
+
+A request is matched to the script of its last user text message; unknown
+messages pick a script by hash. How far the exchange has got is read from
+the request itself: the number of tool_result turns since that message.
+Responses follow the Messages API, streamed as Server-Sent Events when the
+request asks for it, after a configurable delay.
+"""
+
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .chat_log import chat_log_paths
+
+DEFAULT_SCRIPTS = [
+    {
+        "message": "What countries are in the collection?",
+        "turns": [
+            {"tools": [{"name": "browse_children", "input": {"caliber_code": "9mmP", "child_type": "country"}}]},
+            {"text": "The collection has loads from several countries; the list above links to each one."},
+        ],
+    },
+    {
+        "message": "How many loads are there by country and case type?",
+        "turns": [
+            {"tools": [{"name": "aggregate_collection",
+                        "input": {"caliber_code": "9mmP", "group_by": ["country", "case_type"]}}]},
+            {"text": "Here is the breakdown of loads by country and case type."},
+        ],
+    },
+    {
+        "message": "Show me steel case loads and any notes about corrosion.",
+        "turns": [
+            {"tools": [
+                {"name": "search_loads", "input": {"caliber_code": "9mmP", "case_type": "Steel"}},
+                {"name": "search_text", "input": {"caliber_code": "9mmP", "query": "corrosion"}},
+            ]},
+            {"text": "These are the steel case loads, and the records whose notes mention corrosion."},
+        ],
+    },
+    {
+        "message": "How do I add a new headstamp?",
+        "turns": [
+            {"text": "Open the manufacturer's page and click the green Add Headstamp button."},
+        ],
+    },
+]
+
+# Characters per streamed text chunk
+STREAM_CHUNK_CHARS = 12
+
+
+def scripts_from_chat_logs(log_dir=None):
+    """One script per successful exchange in the chat logs"""
+    scripts = []
+    for path in chat_log_paths(log_dir):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('error') or not record.get('message'):
+                    continue
+                rounds = {}
+                for tool in record.get('tools', []):
+                    rounds.setdefault(tool.get('round') or 1, []).append(
+                        {"name": tool['name'], "input": tool['input']}
+                    )
+                turns = [{"tools": rounds[number]} for number in sorted(rounds)]
+                turns.append({"text": record.get('reply') or "Done."})
+                scripts.append({"message": record['message'], "turns": turns})
+    return scripts
+
+
+def load_scripts(path=None, log_dir=None):
+    """Scripts from a JSON file, else from the chat logs, else DEFAULT_SCRIPTS"""
+    if path:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return scripts_from_chat_logs(log_dir) or DEFAULT_SCRIPTS
+
+
+def _text_of(content):
+    if isinstance(content, str):
+        return content
+    return ''.join(block.get('text', '') for block in content if block.get('type') == 'text')
+
+
+def _is_tool_result(message):
+    content = message.get('content')
+    return isinstance(content, list) and any(block.get('type') == 'tool_result' for block in content)
+
+
+class ScriptBook:
+    """Picks the script and turn answering a request"""
+
+    def __init__(self, scripts):
+        self.scripts = scripts
+        self.by_message = {script['message']: script for script in scripts}
+
+    def turn_for(self, body):
+        messages = body.get('messages', [])
+        # The user's text message, and the tool rounds answered since
+        position = len(messages) - 1
+        rounds_done = 0
+        while position > 0 and _is_tool_result(messages[position]):
+            rounds_done += 1
+            position -= 2
+        message = _text_of(messages[position].get('content', '')) if messages else ''
+
+        if not body.get('tools'):
+            # Not a chat turn (e.g. a conversation summary): answer with plain text
+            return {"text": f"Summary of {len(messages)} message(s)."}
+
+        script = self.by_message.get(message)
+        if script is None:
+            digest = hashlib.sha1(message.encode('utf-8')).digest()
+            script = self.scripts[int.from_bytes(digest[:4], 'big') % len(self.scripts)]
+        turns = script['turns']
+        return turns[min(rounds_done, len(turns) - 1)]
+
+
+class MockMessagesHandler(BaseHTTPRequestHandler):
+    # One response per connection; lets streamed responses end by closing it
+    protocol_version = 'HTTP/1.0'
+    ids = itertools.count(1)
+    id_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def next_id(self, prefix):
+        with self.id_lock:
+            return f"{prefix}_mock{next(self.ids):08d}"
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/v1/messages'):
+            self.send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError:
+            self.send_json(400, {"type": "error", "error": {"type": "invalid_request_error", "message": "Bad JSON"}})
+            return
+
+        turn = self.server.book.turn_for(body)
+        content = []
+        if turn.get('tools'):
+            for tool in turn['tools']:
+                content.append({"type": "tool_use", "id": self.next_id('toolu'), "name": tool['name'],
+                                "input": tool['input']})
+            stop_reason = "tool_use"
+        else:
+            content.append({"type": "text", "text": turn.get('text', '')})
+            stop_reason = "end_turn"
+
+        # Rough usage, so logs and stats have something to add up
+        input_tokens = len(json.dumps(body.get('messages', []))) // 4 + len(json.dumps(body.get('system', ''))) // 4
+        output_tokens = len(json.dumps(content)) // 4
+        message = {
+            "id": self.next_id('msg'), "type": "message", "role": "assistant",
+            "model": body.get('model', 'mock'), "content": content,
+            "stop_reason": stop_reason, "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                      "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0},
+        }
+
+        self.server.wait_first_token()
+        if body.get('stream'):
+            self.send_stream(message)
+        else:
+            for _ in self.chunks(message):
+                self.server.wait_chunk()
+            self.send_json(200, message)
+
+    def chunks(self, message):
+        """(block index, delta) pairs a message is streamed as"""
+        for index, block in enumerate(message['content']):
+            if block['type'] == 'text':
+                text = block['text']
+                for start in range(0, len(text), STREAM_CHUNK_CHARS):
+                    yield index, {"type": "text_delta", "text": text[start:start + STREAM_CHUNK_CHARS]}
+            else:
+                yield index, {"type": "input_json_delta", "partial_json": json.dumps(block['input'])}
+
+    def send_json(self, status, data):
+        payload = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_event(self, event, data):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def send_stream(self, message):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        start = dict(message, content=[], stop_reason=None,
+                     usage=dict(message['usage'], output_tokens=1))
+        self.send_event('message_start', {"type": "message_start", "message": start})
+        open_block = None
+        for index, delta in self.chunks(message):
+            if index != open_block:
+                if open_block is not None:
+                    self.send_event('content_block_stop', {"type": "content_block_stop", "index": open_block})
+                block = message['content'][index]
+                empty = {"type": "text", "text": ""} if block['type'] == 'text' else dict(block, input={})
+                self.send_event('content_block_start', {"type": "content_block_start", "index": index,
+                                                        "content_block": empty})
+                open_block = index
+            self.server.wait_chunk()
+            self.send_event('content_block_delta', {"type": "content_block_delta", "index": index, "delta": delta})
+        if open_block is not None:
+            self.send_event('content_block_stop', {"type": "content_block_stop", "index": open_block})
+        self.send_event('message_delta', {
+            "type": "message_delta",
+            "delta": {"stop_reason": message['stop_reason'], "stop_sequence": None},
+            "usage": {"output_tokens": message['usage']['output_tokens']},
+        })
+        self.send_event('message_stop', {"type": "message_stop"})
+
+
+class MockMessagesServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, scripts, latency=1.0, jitter=0.0, chunk_delay=0.02, verbose=False):
+        super().__init__(address, MockMessagesHandler)
+        self.book = ScriptBook(scripts)
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.verbose = verbose
+
+    def wait_first_token(self):
+        """Time the model takes before its first token"""
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def wait_chunk(self):
+        if self.chunk_delay:
+            time.sleep(self.chunk_delay)
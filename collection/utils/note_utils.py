@@ -2,6 +2,12 @@ import re
 from django.utils.safestring import mark_safe
 from django.utils.html import linebreaks
 
+def public_note_text(note_text):
+    """The plain text of a note with its confidential {{...}} sections removed"""
+    if not note_text:
+        return ''
+    return re.sub(r'{{.*?}}', '', note_text).strip()
+
 def process_notes(note_text):
     """
     Process note text to separate public and confidential sections.
@@ -38,7 +44,7 @@ def process_notes(note_text):
         result['confidential_notes'] = mark_safe(linebreaks(confidential_text))
     
     # Extract public notes (everything not in double braces)
-    public_text = re.sub(r'{{.*?}}', '', note_text).strip()
+    public_text = public_note_text(note_text)
     if public_text:
         result['public_notes'] = mark_safe(linebreaks(public_text))
     
@@ -0,0 +1,511 @@
+"""
+BM25 full-text index of the collection, searched by the chat assistant's
+search_text tool.
+
+Documents are headstamps (code, name and notes) and loads, dates, variations
+and boxes (description and notes). Confidential {{...}} note sections are
+removed before indexing, as on the detail pages.
+
+A full build writes one immutable segment file, which every process
+memory-maps, so postings are read from the page cache instead of being held
+in memory. Saves and deletes after the build are appended to the segment's
+journal as term counts; each process replays new journal lines before a
+search, hiding the segment's copy of every document the journal replaced.
+Bulk imports mark the index stale; the import worker and the import command
+rebuild it afterwards, and searches keep using the current segment meanwhile.
+
+Segment layout (little-endian):
+    header     MAGIC, generation, counts, total document length and the offsets below
+    documents  (kind, pk, caliber_id, length) per document, sorted by (kind, pk)
+    offsets    term count + 1 offsets into the term text
+    text       the UTF-8 terms, sorted
+    term info  (first posting, document frequency) per term
+    postings   (document number, term frequency) per posting, grouped by term
+"""
+
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+
+from .note_utils import public_note_text
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CCBM25v1'
+HEADER = struct.Struct('<8sQIIQQQQQQ')
+DOCUMENT = struct.Struct('<BIII')
+OFFSET = struct.Struct('<I')
+TERM_INFO = struct.Struct('<QI')
+POSTING = struct.Struct('<IH')
+
+SEGMENT_NAME = 'segment.bin'
+STALE_NAME = 'stale'
+
+# BM25 term frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Record types in the index, numbered by their position
+KINDS = ('headstamp', 'load', 'date', 'variation', 'box')
+
+# Text fields indexed for each record type
+INDEXED_FIELDS = {
+    'headstamp': ('code', 'name', 'note'),
+    'load': ('description', 'note'),
+    'date': ('description', 'note'),
+    'variation': ('description', 'note'),
+    'box': ('description', 'note'),
+}
+
+# Lookup path from each record type (and box parent type) to its caliber ID
+CALIBER_ID_PATHS = {
+    'country': ('caliber_id',),
+    'manufacturer': ('country__caliber_id',),
+    'headstamp': ('manufacturer__country__caliber_id',),
+    'load': ('headstamp__manufacturer__country__caliber_id',),
+    'date': ('load__headstamp__manufacturer__country__caliber_id',),
+    'variation': (
+        'load__headstamp__manufacturer__country__caliber_id',
+        'date__load__headstamp__manufacturer__country__caliber_id',
+    ),
+}
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def _stem(token):
+    """Strip plural endings, so "tracers" finds "tracer" and "cases" finds "case"."""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lower-cased, accent-free, lightly stemmed terms of a text"""
+    folded = unicodedata.normalize('NFKD', (text or '').lower())
+    folded = ''.join(c for c in folded if not unicodedata.combining(c))
+    return [_stem(token) for token in TOKEN_PATTERN.findall(folded) if len(token) > 1 or token.isdigit()]
+
+
+def document_terms(kind, values):
+    """Term counts of a record, from a dict of its INDEXED_FIELDS"""
+    parts = []
+    for field in INDEXED_FIELDS[kind]:
+        value = values.get(field)
+        parts.append(public_note_text(value) if field == 'note' else value or '')
+    return Counter(tokenize(' '.join(parts)))
+
+
+def collect_documents():
+    """Yield (kind number, pk, caliber ID, term counts) for every indexed record with any text."""
+    from django.apps import apps
+
+    for kind_no, kind in enumerate(KINDS):
+        model = apps.get_model('collection', kind)
+        fields = INDEXED_FIELDS[kind]
+
+        if kind == 'box':
+            # Boxes hang off any level; resolve their calibers per parent type
+            paths = ('content_type__model', 'object_id')
+            parent_calibers = {}
+            for parent in model.objects.values_list('content_type__model', flat=True).distinct():
+                if parent in CALIBER_ID_PATHS:
+                    rows = apps.get_model('collection', parent).objects.values_list('pk', *CALIBER_ID_PATHS[parent])
+                    parent_calibers[parent] = {row[0]: next((v for v in row[1:] if v), 0) for row in rows}
+        else:
+            paths = CALIBER_ID_PATHS[kind]
+
+        for row in model.objects.values_list('pk', *fields, *paths).iterator(chunk_size=2000):
+            counts = document_terms(kind, dict(zip(fields, row[1:])))
+            if not counts:
+                continue
+            located = row[1 + len(fields):]
+            if kind == 'box':
+                caliber_id = parent_calibers.get(located[0], {}).get(located[1], 0)
+            else:
+                caliber_id = next((v for v in located if v), 0)
+            yield kind_no, row[0], caliber_id, counts
+
+
+def record_caliber_id(instance):
+    """The caliber ID of one record (one query), 0 when it has none"""
+    from django.apps import apps
+    from django.contrib.contenttypes.models import ContentType
+
+    if instance._meta.model_name == 'box':
+        parent = ContentType.objects.get_for_id(instance.content_type_id).model
+        if parent not in CALIBER_ID_PATHS:
+            return 0
+        model, pk = apps.get_model('collection', parent), instance.object_id
+    else:
+        parent = instance._meta.model_name
+        model, pk = type(instance), instance.pk
+    row = model.objects.filter(pk=pk).values_list(*CALIBER_ID_PATHS[parent]).first()
+    return next((v for v in row if v), 0) if row else 0
+
+
+def write_segment(path, documents, generation):
+    """Write a segment of (kind number, pk, caliber ID, term counts) documents to path."""
+    documents = sorted(documents, key=lambda document: (document[0], document[1]))
+    postings = {}
+    total_length = 0
+    document_rows = bytearray()
+    for doc_no, (kind_no, pk, caliber_id, counts) in enumerate(documents):
+        length = sum(counts.values())
+        total_length += length
+        document_rows += DOCUMENT.pack(kind_no, pk, caliber_id, length)
+        for term, frequency in counts.items():
+            postings.setdefault(term.encode('utf-8'), []).append((doc_no, min(frequency, 0xFFFF)))
+
+    terms = sorted(postings)
+    offsets = bytearray(OFFSET.pack(0))
+    text = bytearray()
+    info = bytearray()
+    posting_rows = bytearray()
+    first = 0
+    for term in terms:
+        text += term
+        offsets += OFFSET.pack(len(text))
+        info += TERM_INFO.pack(first, len(postings[term]))
+        for posting in postings[term]:
+            posting_rows += POSTING.pack(*posting)
+        first += len(postings[term])
+
+    sections = [document_rows, offsets, text, info, posting_rows]
+    starts = []
+    position = HEADER.size
+    for section in sections:
+        starts.append(position)
+        position += len(section)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, generation, len(documents), len(terms), total_length, *starts))
+        for section in sections:
+            f.write(section)
+
+
+class Segment:
+    """A memory-mapped segment file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.generation, self.document_count, self.term_count, self.total_length,
+         self.documents_at, self.offsets_at, self.text_at, self.info_at, self.postings_at) = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a text index segment")
+
+    def close(self):
+        self.map.close()
+
+    def document(self, doc_no):
+        """(kind number, pk, caliber ID, length) of a document"""
+        return DOCUMENT.unpack_from(self.map, self.documents_at + doc_no * DOCUMENT.size)
+
+    def find_document(self, kind_no, pk):
+        """Number of the document of a record, or None"""
+        low, high = 0, self.document_count
+        while low < high:
+            middle = (low + high) // 2
+            key = self.document(middle)[:2]
+            if key == (kind_no, pk):
+                return middle
+            if key < (kind_no, pk):
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _term(self, term_no):
+        start, end = struct.unpack_from('<II', self.map, self.offsets_at + term_no * OFFSET.size)
+        return self.map[self.text_at + start:self.text_at + end]
+
+    def postings(self, term):
+        """(document number, term frequency) pairs of a term"""
+        wanted = term.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            found = self._term(middle)
+            if found == wanted:
+                first, count = TERM_INFO.unpack_from(self.map, self.info_at + middle * TERM_INFO.size)
+                start = self.postings_at + first * POSTING.size
+                return POSTING.iter_unpack(self.map[start:start + count * POSTING.size])
+            if found < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        return iter(())
+
+
+class TextIndex:
+    """The segment of a directory plus the journal of changes since it was built"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.segment_path = os.path.join(directory, SEGMENT_NAME)
+        self.stale_path = os.path.join(directory, STALE_NAME)
+        self.lock = threading.RLock()
+        self.segment = None
+        self.segment_stat = None
+        self._reset_journal()
+
+    def _reset_journal(self):
+        self.journal_position = 0
+        self.hidden = set()       # segment documents replaced or deleted since the build
+        self.hidden_length = 0
+        self.documents = {}       # (kind number, pk) -> (caliber ID, length, term counts) from the journal
+        self.postings = {}        # term -> {(kind number, pk): term frequency} from the journal
+        self.journal_length = 0
+
+    def journal_path(self, generation=None):
+        if generation is None:
+            generation = self.segment.generation if self.segment else 0
+        return os.path.join(self.directory, f'journal-{generation}.jsonl')
+
+    def open(self):
+        """Map the segment on disk, or a newer one than the mapped segment, and replay its journal."""
+        with self.lock:
+            try:
+                stat = os.stat(self.segment_path)
+                stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                stat = None
+            if stat != self.segment_stat:
+                if self.segment:
+                    self.segment.close()
+                self.segment = Segment(self.segment_path) if stat else None
+                self.segment_stat = stat
+                self._reset_journal()
+            self._replay_journal()
+
+    def _replay_journal(self):
+        try:
+            with open(self.journal_path(), 'rb') as f:
+                f.seek(self.journal_position)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # A line still being written is read next time
+        complete = data[:data.rfind(b'\n') + 1]
+        self.journal_position += len(complete)
+        for line in complete.splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Skipping bad text index journal line: {e}")
+
+    def _apply(self, entry):
+        key = (KINDS.index(entry['kind']), entry['pk'])
+        previous = self.documents.pop(key, None)
+        if previous:
+            self.journal_length -= previous[1]
+            for term in previous[2]:
+                del self.postings[term][key]
+                if not self.postings[term]:
+                    del self.postings[term]
+        elif self.segment:
+            doc_no = self.segment.find_document(*key)
+            if doc_no is not None and doc_no not in self.hidden:
+                self.hidden.add(doc_no)
+                self.hidden_length += self.segment.document(doc_no)[3]
+
+        if entry['op'] == 'put':
+            counts = entry['terms']
+            length = sum(counts.values())
+            self.documents[key] = (entry['caliber'], length, counts)
+            self.journal_length += length
+            for term, frequency in counts.items():
+                self.postings.setdefault(term, {})[key] = frequency
+
+    def _append(self, entry):
+        with self.lock:
+            self.open()
+            os.makedirs(self.directory, exist_ok=True)
+            # One short write per line, so lines from several processes do not interleave
+            with open(self.journal_path(), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def put(self, kind, pk, caliber_id, counts):
+        """Record a new or changed document; one without terms is removed instead."""
+        if not counts:
+            self.delete(kind, pk)
+            return
+        self._append({'op': 'put', 'kind': kind, 'pk': pk, 'caliber': caliber_id, 'terms': dict(counts)})
+
+    def delete(self, kind, pk):
+        self._append({'op': 'delete', 'kind': kind, 'pk': pk})
+
+    def mark_stale(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.stale_path, 'w') as f:
+            f.write(str(time.time()))
+
+    def needs_build(self):
+        return self.segment is None or os.path.exists(self.stale_path)
+
+    def rebuild(self):
+        """
+        Build a new segment from the database. Journal lines written while the
+        build read the database are carried over to the new segment's journal.
+
+        Returns:
+            tuple: (documents, terms) of the new segment
+        """
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            # Marks made from now on ask for another build
+            try:
+                os.remove(self.stale_path)
+            except FileNotFoundError:
+                pass
+            self.open()
+            old_journal = self.journal_path()
+            try:
+                carried_from = os.path.getsize(old_journal)
+            except FileNotFoundError:
+                carried_from = 0
+
+            generation = time.time_ns()
+            temporary = f'{self.segment_path}.{os.getpid()}.tmp'
+            write_segment(temporary, collect_documents(), generation)
+            try:
+                with open(old_journal, 'rb') as f:
+                    f.seek(carried_from)
+                    carried = f.read()
+            except FileNotFoundError:
+                carried = b''
+            with open(self.journal_path(generation), 'ab') as f:
+                f.write(carried[:carried.rfind(b'\n') + 1])
+            os.replace(temporary, self.segment_path)
+            try:
+                os.remove(old_journal)
+            except FileNotFoundError:
+                pass
+
+            self.open()
+            return self.segment.document_count, self.segment.term_count
+
+    def search(self, query, caliber_id=None, kinds=None, limit=10):
+        """
+        Rank documents against a query with BM25.
+
+        Args:
+            query (str): Free text
+            caliber_id (int, optional): Only documents of this caliber
+            kinds (iterable, optional): Only these record types
+            limit (int): Number of results
+
+        Returns:
+            list: (kind, pk, score) tuples, best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self.lock:
+            self.open()
+            segment = self.segment
+
+            document_count = len(self.documents) - len(self.hidden)
+            total_length = self.journal_length - self.hidden_length
+            if segment:
+                document_count += segment.document_count
+                total_length += segment.total_length
+            if not document_count or not terms:
+                return []
+            average_length = total_length / document_count
+
+            scores = {}
+            for term in terms:
+                matches = []
+                for doc_no, frequency in segment.postings(term) if segment else ():
+                    if doc_no not in self.hidden:
+                        kind_no, pk, document_caliber, length = segment.document(doc_no)
+                        matches.append(((kind_no, pk), frequency, length, document_caliber))
+                for key, frequency in self.postings.get(term, {}).items():
+                    document_caliber, length, _ = self.documents[key]
+                    matches.append((key, frequency, length, document_caliber))
+                if not matches:
+                    continue
+
+                idf = math.log(1 + (document_count - len(matches) + 0.5) / (len(matches) + 0.5))
+                for key, frequency, length, document_caliber in matches:
+                    if caliber_id is not None and document_caliber != caliber_id:
+                        continue
+                    if kinds and KINDS[key[0]] not in kinds:
+                        continue
+                    norm = frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (BM25_K1 + 1) / norm
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(KINDS[kind_no], pk, score) for (kind_no, pk), score in best]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_text_index():
+    """The process's TextIndex of settings.TEXT_INDEX_DIR"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = TextIndex(settings.TEXT_INDEX_DIR)
+        return _index
+
+
+def index_record(instance):
+    """Journal the current text of a saved record"""
+    kind = instance._meta.model_name
+    values = {field: getattr(instance, field) for field in INDEXED_FIELDS[kind]}
+    counts = document_terms(kind, values)
+    index = get_text_index()
+    if counts:
+        index.put(kind, instance.pk, record_caliber_id(instance), counts)
+    else:
+        index.delete(kind, instance.pk)
+
+
+def remove_record(kind, pk):
+    """Journal the deletion of a record"""
+    get_text_index().delete(kind, pk)
+
+
+def mark_text_index_stale():
+    """Ask for a rebuild after writes too many to journal one by one"""
+    get_text_index().mark_stale()
+
+
+def rebuild_text_index():
+    return get_text_index().rebuild()
+
+
+def rebuild_stale_text_index():
+    """
+    Rebuild the index when it is missing or marked stale.
+
+    Returns:
+        tuple: (documents, terms) of the new segment, or None when it was current
+    """
+    index = get_text_index()
+    with index.lock:
+        index.open()
+        if not index.needs_build():
+            return None
+        return index.rebuild()
+
+
+def search_text_index(query, caliber_id=None, kinds=None, limit=10):
+    return get_text_index().search(query, caliber_id=caliber_id, kinds=kinds, limit=limit)
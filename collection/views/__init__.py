@@ -40,13 +40,17 @@ from .box_views import (
 )
 
 from .import_views import (
-    import_records, download_results
+    import_records, download_results, import_job_progress
 )
 
 from .ref_views import (
     nine_mm_guide, collection_highlights
 )
 
+from .gallery_views import (
+    image_gallery, image_gallery_page, gallery_thumbnail,
+)
+
 from .chat_views import (
-    chat_message, chat_clear, chat_history,
+    chat_message, chat_stream, chat_clear, chat_history,
 )
\ No newline at end of file
@@ -1,95 +1,79 @@
 import json
-import os
 import logging
-from datetime import datetime
-from django.http import JsonResponse
+import time
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
 import anthropic
 
-from collection.chat_prompt import SYSTEM_PROMPT
-from collection.chat_tools import TOOL_DEFINITIONS, execute_tool
-from collection.models import (
-    Caliber, Country, LoadType, BulletType, CaseType, PrimerType, PAColor,
+from collection.chat_prompt import CONVERSATION_SUMMARY_PROMPT, PAGE_CONTEXT_PROMPT, SYSTEM_PROMPT
+from collection.chat_tools import TOOL_DEFINITIONS, execute_tools
+from collection.models import Caliber
+from collection.utils.chat_history import (
+    CONVERSATION_SESSION_KEY, compact_conversation, conversation_messages, load_conversation,
+    prompt_messages, record_exchange, start_conversation,
 )
+from collection.utils.chat_log import log_chat_exchange, round_usage
+from collection.utils.chat_vocabulary import lookup_vocabulary
 
 logger = logging.getLogger(__name__)
 
-# Maximum number of messages to send to the API (sliding window safety net)
-MAX_HISTORY_MESSAGES = 40
-
 # Maximum tool-call round-trips per user message (safety limit)
 MAX_TOOL_ROUNDS = 5
 
+# Model answering the chat
+CHAT_MODEL = "claude-sonnet-4-20250514"
 
-def _log_chat_exchange(user, current_page, user_message, tool_calls, reply, error=None):
-    """Log a chat exchange to a file for debugging and prompt tuning."""
-    log_dir = getattr(settings, 'CHAT_LOG_DIR', None)
-    if not log_dir:
-        return
+# Reply used when the tool-calling loop runs out of rounds
+GIVE_UP_REPLY = "I'm sorry, I wasn't able to complete that request. Please try rephrasing your question."
 
-    try:
-        os.makedirs(log_dir, exist_ok=True)
-        # One file per day, named by date
-        date_str = datetime.now().strftime('%Y-%m-%d')
-        log_path = os.path.join(log_dir, f'chat_{date_str}.log')
-
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        lines = [
-            f"\n{'='*60}",
-            f"[{timestamp}] User: {user} | Page: {current_page}",
-            f"{'='*60}",
-            f"USER: {user_message}",
-        ]
-
-        # Log each tool call round
-        for i, tc in enumerate(tool_calls, 1):
-            lines.append(f"\n--- Tool Call #{i}: {tc['name']} ---")
-            lines.append(f"Input: {json.dumps(tc['input'], indent=2)}")
-            lines.append(f"Result: {json.dumps(tc['result'], indent=2)}")
-
-        if error:
-            lines.append(f"\nERROR: {error}")
-        else:
-            lines.append(f"\nASSISTANT: {reply}")
 
-        lines.append("")
+def _build_system_prompt(current_page, summary=''):
+    """
+    System prompt blocks for a message. The instructions and the caliber's
+    lookup vocabulary form a prompt-cached prefix (together with the tool
+    definitions before it); the current page and the summary of compacted
+    earlier turns follow outside the cache.
+    """
+    # Extract the current caliber code from the URL path (e.g., /9mmP/loads/42/ → 9mmP)
+    current_caliber = ''
+    if current_page:
+        parts = current_page.strip('/').split('/')
+        if parts and parts[0]:
+            if Caliber.objects.filter(code=parts[0]).exists():
+                current_caliber = parts[0]
+
+    # Default to 9mmP when no caliber is in the URL (landing page, etc.)
+    # This is appropriate for the primary collection; other deployments may want
+    # a different default or to prompt the user.
+    if not current_caliber:
+        current_caliber = '9mmP'
 
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write('\n'.join(lines))
-    except Exception as e:
-        logger.warning(f"Failed to write chat log: {e}")
+    # Lookup vocabulary so Claude knows the valid database values
+    static_prompt = SYSTEM_PROMPT.format(lookup_vocabulary=lookup_vocabulary(current_caliber))
+    page_context = PAGE_CONTEXT_PROMPT.format(
+        current_page=current_page or 'unknown',
+        current_caliber=current_caliber,
+    )
 
+    blocks = [
+        {"type": "text", "text": static_prompt, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": page_context},
+    ]
+    if summary:
+        blocks.append({"type": "text", "text": CONVERSATION_SUMMARY_PROMPT.format(summary=summary)})
+    return blocks
 
-def _build_lookup_vocabulary(caliber_code):
-    """Build a text summary of lookup table values for the system prompt."""
-    sections = []
 
-    # Countries for the current caliber
-    countries = Country.objects.filter(
-        caliber__code=caliber_code
-    ).order_by('name')
-    country_items = []
-    for c in countries:
-        if c.full_name and c.full_name != c.name:
-            country_items.append(f'"{c.name}" ({c.full_name})')
-        else:
-            country_items.append(f'"{c.name}"')
-    sections.append(f"Countries in this caliber: {', '.join(country_items)}")
-
-    # Lookup tables (shared across calibers)
-    for label, model in [
-        ("Load Types", LoadType),
-        ("Bullet Types", BulletType),
-        ("Case Types", CaseType),
-        ("Primer Types", PrimerType),
-        ("PA (Primer Annulus) Colors", PAColor),
-    ]:
-        values = model.objects.all().order_by('display_name')
-        items = [f'"{v.display_name}" (code: {v.value})' for v in values]
-        sections.append(f"{label}: {', '.join(items)}")
-    return '\n'.join(sections)
+def _session_conversation(session, user):
+    """The conversation whose ID the session holds, started when there is none yet."""
+    conversation = load_conversation(user, session.get(CONVERSATION_SESSION_KEY))
+    if conversation is None:
+        conversation = start_conversation(user, session.pop('chat_history', None))
+        session[CONVERSATION_SESSION_KEY] = conversation.pk
+    return conversation
 
 
 @login_required
@@ -98,7 +82,7 @@ def chat_message(request):
     """
     Chat endpoint that sends user messages to the Claude API.
     Handles tool calling with multi-turn round-trips.
-    Maintains conversation history in the Django session.
+    Keeps the conversation in ChatConversation; the session only holds its ID.
     """
     try:
         data = json.loads(request.body)
@@ -113,55 +97,34 @@ def chat_message(request):
     if not settings.ANTHROPIC_API_KEY:
         return JsonResponse({'error': 'Chat is not configured. API key is missing.'}, status=500)
 
-    # Retrieve or initialize conversation history from session
-    history = request.session.get('chat_history', [])
-
-    # Add the new user message
-    history.append({"role": "user", "content": user_message})
-
-    # Apply sliding window to keep history manageable
-    api_messages = history[-MAX_HISTORY_MESSAGES:]
-
-    # Extract the current caliber code from the URL path (e.g., /9mmP/loads/42/ → 9mmP)
-    current_caliber = ''
-    if current_page:
-        parts = current_page.strip('/').split('/')
-        if parts and parts[0]:
-            if Caliber.objects.filter(code=parts[0]).exists():
-                current_caliber = parts[0]
-
-    # Default to 9mmP when no caliber is in the URL (landing page, etc.)
-    # This is appropriate for the primary collection; other deployments may want
-    # a different default or to prompt the user.
-    if not current_caliber:
-        current_caliber = '9mmP'
+    started = time.monotonic()
 
-    # Build lookup vocabulary so Claude knows the valid database values
-    lookup_vocab = _build_lookup_vocabulary(current_caliber)
+    # Past turns that fit the token budget, then the new user message
+    conversation = _session_conversation(request.session, request.user)
+    api_messages = prompt_messages(conversation, user_message)
 
-    # Build the system prompt with current page, caliber, and vocabulary context
-    system = SYSTEM_PROMPT.format(
-        current_page=current_page or 'unknown',
-        current_caliber=current_caliber,
-        lookup_vocabulary=lookup_vocab,
-    )
+    # Build the system prompt with current page, caliber, vocabulary and conversation summary
+    system = _build_system_prompt(current_page, conversation.summary)
 
-    # Track tool calls for logging
+    # Track API rounds and tool calls for logging
+    rounds = []
     tool_call_log = []
 
     try:
-        client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY, base_url=settings.ANTHROPIC_BASE_URL)
 
         # Tool-calling loop: Claude may request one or more tool calls
         # before giving a final text response
         for _ in range(MAX_TOOL_ROUNDS):
+            round_started = time.monotonic()
             response = client.messages.create(
-                model="claude-sonnet-4-20250514",
+                model=CHAT_MODEL,
                 max_tokens=1024,
                 system=system,
                 messages=api_messages,
                 tools=TOOL_DEFINITIONS,
             )
+            rounds.append(round_usage(response, time.monotonic() - round_started))
 
             # If Claude responds with just text, we're done
             if response.stop_reason == "end_of_turn":
@@ -176,21 +139,10 @@ def chat_message(request):
                     "content": response.content,
                 })
 
-                # Execute each tool call and collect results
-                tool_results = []
-                for block in response.content:
-                    if block.type == "tool_use":
-                        result = execute_tool(block.name, block.input)
-                        tool_call_log.append({
-                            "name": block.name,
-                            "input": block.input,
-                            "result": result,
-                        })
-                        tool_results.append({
-                            "type": "tool_result",
-                            "tool_use_id": block.id,
-                            "content": json.dumps(result),
-                        })
+                # Execute the round's tool calls concurrently and collect results in order
+                tool_blocks = [block for block in response.content if block.type == "tool_use"]
+                results = execute_tools([(block.name, block.input) for block in tool_blocks])
+                tool_results = _tool_results(tool_blocks, results, tool_call_log, len(rounds))
 
                 # Add tool results to messages for the next round
                 api_messages.append({
@@ -202,35 +154,171 @@ def chat_message(request):
                 reply = _extract_text(response)
                 break
         else:
-            reply = "I'm sorry, I wasn't able to complete that request. Please try rephrasing your question."
+            reply = GIVE_UP_REPLY
 
-        # Save only the user message and final text reply to session history
-        # (tool call details are not persisted — they'd bloat the session)
-        history.append({"role": "assistant", "content": reply})
-        request.session['chat_history'] = history
+        # Save only the user message and final text reply
+        # (tool call details are not persisted — they'd bloat the history)
+        record_exchange(conversation, user_message, reply)
 
         # Log the exchange
-        _log_chat_exchange(
-            user=request.user.username,
-            current_page=current_page,
-            user_message=user_message,
-            tool_calls=tool_call_log,
-            reply=reply,
+        log_chat_exchange(
+            request.user.username, current_page, user_message, tool_call_log, reply,
+            model=CHAT_MODEL, started=started, rounds=rounds,
         )
 
     except anthropic.AuthenticationError:
-        _log_chat_exchange(request.user.username, current_page, user_message, tool_call_log, "", error="AuthenticationError")
+        log_chat_exchange(request.user.username, current_page, user_message, tool_call_log, "",
+                          model=CHAT_MODEL, started=started, rounds=rounds, error="AuthenticationError")
         return JsonResponse({'error': 'Invalid API key.'}, status=500)
     except anthropic.RateLimitError:
-        _log_chat_exchange(request.user.username, current_page, user_message, tool_call_log, "", error="RateLimitError")
+        log_chat_exchange(request.user.username, current_page, user_message, tool_call_log, "",
+                          model=CHAT_MODEL, started=started, rounds=rounds, error="RateLimitError")
         return JsonResponse({'error': 'Rate limit reached. Please wait a moment and try again.'}, status=429)
     except Exception as e:
-        _log_chat_exchange(request.user.username, current_page, user_message, tool_call_log, "", error=str(e))
+        log_chat_exchange(request.user.username, current_page, user_message, tool_call_log, "",
+                          model=CHAT_MODEL, started=started, rounds=rounds, error=str(e))
         return JsonResponse({'error': f'Something went wrong: {str(e)}'}, status=500)
 
+    # Summarize older turns once they outgrow the prompt budget
+    compact_conversation(conversation)
+
     return JsonResponse({'reply': reply})
 
 
+def _tool_results(tool_blocks, results, tool_call_log, round_no):
+    """Pair tool_use blocks with their results as tool_result content, logging each call with its API round."""
+    tool_results = []
+    for block, (result, cached, seconds) in zip(tool_blocks, results):
+        tool_call_log.append({
+            "name": block.name,
+            "input": block.input,
+            "result": result,
+            "cached": cached,
+            "seconds": round(seconds, 3),
+            "round": round_no,
+        })
+        tool_results.append({
+            "type": "tool_result",
+            "tool_use_id": block.id,
+            "content": json.dumps(result),
+        })
+    return tool_results
+
+
+def _sse(event, data):
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@login_required
+@require_POST
+async def chat_stream(request):
+    """
+    Streaming variant of chat_message used by the chat widget.
+    Relays Claude's text deltas and tool progress as Server-Sent Events:
+    "text" (a delta), "tool" (a tool call starting), then "done" with the
+    final reply or "error". Runs as an async view, so under ASGI an open
+    stream does not hold a worker thread while it waits on the API.
+    """
+    try:
+        data = json.loads(request.body)
+        user_message = data.get('message', '').strip()
+        current_page = data.get('current_page', '')
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    if not user_message:
+        return JsonResponse({'error': 'Empty message'}, status=400)
+
+    if not settings.ANTHROPIC_API_KEY:
+        return JsonResponse({'error': 'Chat is not configured. API key is missing.'}, status=500)
+
+    started = time.monotonic()
+    user = await request.auser()
+    conversation = await sync_to_async(load_conversation)(user, await request.session.aget(CONVERSATION_SESSION_KEY))
+    if conversation is None:
+        legacy_history = await request.session.apop('chat_history', None)
+        conversation = await sync_to_async(start_conversation)(user, legacy_history)
+        # Saved by the session middleware before the stream starts
+        await request.session.aset(CONVERSATION_SESSION_KEY, conversation.pk)
+    api_messages = await sync_to_async(prompt_messages)(conversation, user_message)
+    system = await sync_to_async(_build_system_prompt)(current_page, conversation.summary)
+
+    async def events():
+        rounds = []
+        tool_call_log = []
+        reply = ""
+        error = None
+        try:
+            client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY, base_url=settings.ANTHROPIC_BASE_URL)
+
+            for _ in range(MAX_TOOL_ROUNDS):
+                round_started = time.monotonic()
+                async with client.messages.stream(
+                    model=CHAT_MODEL,
+                    max_tokens=1024,
+                    system=system,
+                    messages=api_messages,
+                    tools=TOOL_DEFINITIONS,
+                ) as stream:
+                    async for text in stream.text_stream:
+                        yield _sse('text', {'text': text})
+                    response = await stream.get_final_message()
+                rounds.append(round_usage(response, time.monotonic() - round_started))
+
+                if response.stop_reason != "tool_use":
+                    reply = _extract_text(response)
+                    break
+
+                api_messages.append({
+                    "role": "assistant",
+                    "content": response.content,
+                })
+
+                tool_blocks = [block for block in response.content if block.type == "tool_use"]
+                for block in tool_blocks:
+                    yield _sse('tool', {'name': block.name})
+                # Tools query the database, which is synchronous; they run concurrently on their own pool
+                results = await sync_to_async(execute_tools, thread_sensitive=False)(
+                    [(block.name, block.input) for block in tool_blocks]
+                )
+                tool_results = _tool_results(tool_blocks, results, tool_call_log, len(rounds))
+
+                api_messages.append({
+                    "role": "user",
+                    "content": tool_results,
+                })
+            else:
+                reply = GIVE_UP_REPLY
+
+            await sync_to_async(record_exchange)(conversation, user_message, reply)
+            yield _sse('done', {'reply': reply})
+
+        except anthropic.AuthenticationError:
+            error = "AuthenticationError"
+            yield _sse('error', {'error': 'Invalid API key.'})
+        except anthropic.RateLimitError:
+            error = "RateLimitError"
+            yield _sse('error', {'error': 'Rate limit reached. Please wait a moment and try again.'})
+        except Exception as e:
+            error = str(e)
+            yield _sse('error', {'error': f'Something went wrong: {str(e)}'})
+
+        log_chat_exchange(
+            user.username, current_page, user_message, tool_call_log, reply,
+            model=CHAT_MODEL, started=started, rounds=rounds, streamed=True, error=error,
+        )
+        if not error:
+            # After "done", so the reply is not held up by summarizing
+            await sync_to_async(compact_conversation)(conversation)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 def _extract_text(response):
     """Extract text content from a Claude API response."""
     texts = [block.text for block in response.content if hasattr(block, 'text')]
@@ -239,14 +327,20 @@ def _extract_text(response):
 
 @login_required
 def chat_history(request):
-    """Return the conversation history from the session."""
-    history = request.session.get('chat_history', [])
-    return JsonResponse({'messages': history})
+    """Return the messages of the session's conversation."""
+    conversation = load_conversation(request.user, request.session.get(CONVERSATION_SESSION_KEY))
+    if conversation is None:
+        # Sessions from before conversations were stored in the database
+        return JsonResponse({'messages': request.session.get('chat_history', [])})
+    return JsonResponse({'messages': conversation_messages(conversation)})
 
 
 @login_required
 @require_POST
 def chat_clear(request):
     """Clear the conversation history."""
+    conversation = load_conversation(request.user, request.session.pop(CONVERSATION_SESSION_KEY, None))
+    if conversation is not None:
+        conversation.delete()
     request.session.pop('chat_history', None)
     return JsonResponse({'status': 'ok'})
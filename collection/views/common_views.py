@@ -16,6 +16,7 @@ from django.http import FileResponse, Http404, HttpResponse
 from django.views.decorators.cache import cache_control
 
 from ..models import Caliber, Country, Manufacturer, Headstamp, Load, LoadType, Date, Variation, Box, CollectionInfo
+from ..utils.import_store import REPORT_DIR, UPLOAD_DIR
 
 def landing(request):
     """Landing page with caliber selection"""
@@ -339,10 +340,18 @@ def support_view(request):
 #         return render(request, 'collection/resources.html', context)
 
 
+# MEDIA_ROOT folders holding import uploads, import reports, chat logs and the text index, which are never served
+PRIVATE_MEDIA_DIRS = {UPLOAD_DIR, REPORT_DIR, 'chat_logs', 'text_index'}
+
+
 @cache_control(max_age=3600)  # Cache for 1 hour
 def serve_media_file(request, path):
     """View to serve media files directly from Django"""
-    file_path = os.path.join(settings.MEDIA_ROOT, path)
+    relative_path = os.path.normpath(path)
+    if (os.path.isabs(relative_path) or relative_path.startswith(os.pardir)
+            or relative_path.split(os.sep)[0] in PRIVATE_MEDIA_DIRS):
+        raise Http404(f"Media file {path} not found")
+    file_path = os.path.join(settings.MEDIA_ROOT, relative_path)
     
     if os.path.exists(file_path) and os.path.isfile(file_path):
         return FileResponse(open(file_path, 'rb'))
@@ -0,0 +1,271 @@
+import base64
+import heapq
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import render, get_object_or_404
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+
+from ..models import Caliber, Country, Manufacturer, Headstamp, Load, Date, Variation, Box
+from ..utils.image_index import normalize_path, is_image_path
+
+# Number of images returned per gallery page
+GALLERY_PAGE_SIZE = 48
+
+# Longest edge of generated gallery thumbnails, in pixels
+THUMBNAIL_SIZE = 240
+
+# Directory under MEDIA_ROOT where thumbnails are cached
+THUMBNAIL_DIR = 'thumbnails'
+
+# Record types shown in the gallery. The rank is part of the combined ordering
+# (updated_at DESC, rank DESC, id DESC), so it must be unique per type.
+GALLERY_KINDS = {
+    'headstamp': {'model': Headstamp, 'rank': 5, 'label': 'code', 'detail': 'headstamp_detail'},
+    'load': {'model': Load, 'rank': 4, 'label': 'cart_id', 'detail': 'load_detail'},
+    'date': {'model': Date, 'rank': 3, 'label': 'cart_id', 'detail': 'date_detail'},
+    'variation': {'model': Variation, 'rank': 2, 'label': 'cart_id', 'detail': 'variation_detail'},
+    'box': {'model': Box, 'rank': 1, 'label': 'bid', 'detail': 'box_detail'},
+}
+
+
+def _encode_cursor(updated_at, kind, pk):
+    """Encode the keyset position of the last item on a page"""
+    raw = f"{updated_at.isoformat()}|{kind}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """Decode a gallery cursor, returning (updated_at, kind, pk) or None"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        updated_str, kind, pk = raw.split('|')
+        if kind not in GALLERY_KINDS:
+            return None
+        return datetime.fromisoformat(updated_str), kind, int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _keyset_filter(kind, cursor):
+    """
+    Build the keyset condition for one record type.
+    Each type has a constant rank, so the tuple comparison
+    (updated_at, rank, id) < cursor reduces to a simple per-type filter.
+    """
+    if not cursor:
+        return Q()
+
+    updated_at, cursor_kind, cursor_pk = cursor
+    rank = GALLERY_KINDS[kind]['rank']
+    cursor_rank = GALLERY_KINDS[cursor_kind]['rank']
+
+    if rank < cursor_rank:
+        return Q(updated_at__lte=updated_at)
+    if rank > cursor_rank:
+        return Q(updated_at__lt=updated_at)
+    return Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=cursor_pk)
+
+
+def _scope_filters(caliber, country_id=None, manufacturer_id=None):
+    """
+    Build the caliber/country/manufacturer filter for each record type.
+
+    Returns:
+        dict: {kind: Q object}
+    """
+    manuf_filter = {'country__caliber': caliber}
+    if country_id:
+        manuf_filter['country_id'] = country_id
+    if manufacturer_id:
+        manuf_filter['id'] = manufacturer_id
+    manufacturers = Manufacturer.objects.filter(**manuf_filter).values('id')
+
+    headstamps = Headstamp.objects.filter(manufacturer__in=manufacturers).values('id')
+    loads = Load.objects.filter(headstamp__in=headstamps).values('id')
+    dates = Date.objects.filter(load__in=loads).values('id')
+    variations = Variation.objects.filter(Q(load__in=loads) | Q(date__in=dates)).values('id')
+
+    # Boxes attach to any level through a generic relation
+    box_scope = (
+        Q(content_type=ContentType.objects.get_for_model(Manufacturer), object_id__in=manufacturers) |
+        Q(content_type=ContentType.objects.get_for_model(Headstamp), object_id__in=headstamps) |
+        Q(content_type=ContentType.objects.get_for_model(Load), object_id__in=loads) |
+        Q(content_type=ContentType.objects.get_for_model(Date), object_id__in=dates) |
+        Q(content_type=ContentType.objects.get_for_model(Variation), object_id__in=variations)
+    )
+    if not manufacturer_id:
+        countries = Country.objects.filter(caliber=caliber)
+        if country_id:
+            countries = countries.filter(id=country_id)
+        box_scope |= Q(
+            content_type=ContentType.objects.get_for_model(Country),
+            object_id__in=countries.values('id'),
+        )
+
+    return {
+        'headstamp': Q(manufacturer__in=manufacturers),
+        'load': Q(headstamp__in=headstamps),
+        'date': Q(load__in=loads),
+        'variation': Q(load__in=loads) | Q(date__in=dates),
+        'box': box_scope,
+    }
+
+
+def get_gallery_page(caliber, country_id=None, manufacturer_id=None, cursor=None,
+                     page_size=GALLERY_PAGE_SIZE):
+    """
+    Fetch one page of image-bearing records across all record types.
+
+    Each type is queried with its own keyset condition and LIMIT, then the
+    sorted streams are merged, so every page costs one indexed query per type
+    regardless of how many images the collection holds.
+
+    Returns:
+        tuple: (items, next_cursor) - next_cursor is None on the last page
+    """
+    position = _decode_cursor(cursor)
+    scopes = _scope_filters(caliber, country_id, manufacturer_id)
+    streams = []
+
+    for kind, config in GALLERY_KINDS.items():
+        model = config['model']
+        rows = model.objects.filter(
+            scopes[kind], _keyset_filter(kind, position)
+        ).exclude(
+            image=''
+        ).exclude(
+            image__isnull=True
+        ).order_by(
+            '-updated_at', '-id'
+        ).values(
+            'id', 'image', 'updated_at', config['label']
+        )[:page_size + 1]
+
+        streams.append([
+            ((row['updated_at'], config['rank'], row['id']), kind, row)
+            for row in rows
+        ])
+
+    # Merge the per-type streams in descending (updated_at, rank, id) order
+    merged = heapq.merge(*streams, key=lambda entry: entry[0], reverse=True)
+
+    items = []
+    has_more = False
+    for sort_key, kind, row in merged:
+        if len(items) == page_size:
+            has_more = True
+            break
+        config = GALLERY_KINDS[kind]
+        image_path = normalize_path(row['image'])
+        items.append({
+            'kind': kind,
+            'id': row['id'],
+            'label': row[config['label']],
+            'updated_at': row['updated_at'],
+            'image_url': settings.MEDIA_URL + image_path,
+            'thumbnail_url': reverse('gallery_thumbnail', args=[caliber.code, image_path]),
+            'detail_url': reverse(config['detail'], args=[caliber.code, row['id']]),
+        })
+
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = _encode_cursor(last['updated_at'], last['kind'], last['id'])
+
+    return items, next_cursor
+
+
+def _gallery_filters(request, caliber):
+    """Read and validate the country/manufacturer filters from the query string"""
+    country_id = request.GET.get('country') or None
+    manufacturer_id = request.GET.get('manufacturer') or None
+
+    if country_id and not country_id.isdigit():
+        country_id = None
+    if manufacturer_id and not manufacturer_id.isdigit():
+        manufacturer_id = None
+
+    return (int(country_id) if country_id else None,
+            int(manufacturer_id) if manufacturer_id else None)
+
+
+def image_gallery(request, caliber_code):
+    """Browse all images in a caliber, newest first, with infinite scrolling"""
+    caliber = get_object_or_404(Caliber, code=caliber_code)
+    all_calibers = Caliber.objects.all().order_by('order', 'name')
+
+    country_id, manufacturer_id = _gallery_filters(request, caliber)
+
+    countries = Country.objects.filter(caliber=caliber).order_by('name').only('id', 'name')
+    manufacturers = Manufacturer.objects.none()
+    if country_id:
+        manufacturers = Manufacturer.objects.filter(
+            country_id=country_id, country__caliber=caliber
+        ).order_by('code').only('id', 'code', 'name')
+
+    items, next_cursor = get_gallery_page(caliber, country_id, manufacturer_id)
+
+    return render(request, 'collection/image_gallery.html', {
+        'caliber': caliber,
+        'all_calibers': all_calibers,
+        'countries': countries,
+        'manufacturers': manufacturers,
+        'selected_country': country_id,
+        'selected_manufacturer': manufacturer_id,
+        'items': items,
+        'next_cursor': next_cursor,
+    })
+
+
+def image_gallery_page(request, caliber_code):
+    """JSON endpoint returning the next page of gallery items for infinite scroll"""
+    caliber = get_object_or_404(Caliber, code=caliber_code)
+    country_id, manufacturer_id = _gallery_filters(request, caliber)
+
+    items, next_cursor = get_gallery_page(
+        caliber, country_id, manufacturer_id, cursor=request.GET.get('cursor')
+    )
+
+    for item in items:
+        item['updated_at'] = item['updated_at'].isoformat()
+
+    return JsonResponse({'items': items, 'next_cursor': next_cursor})
+
+
+@cache_control(max_age=86400)  # Cache for 1 day
+def gallery_thumbnail(request, caliber_code, image_path):
+    """
+    Serve a small thumbnail of a media image, generating and caching it under
+    MEDIA_ROOT/thumbnails on first request or when the original has changed.
+    """
+    image_path = normalize_path(image_path)
+    if '..' in image_path.split('/') or not is_image_path(image_path):
+        raise Http404("Invalid image path")
+
+    source_path = os.path.join(settings.MEDIA_ROOT, image_path)
+    if not os.path.isfile(source_path):
+        raise Http404(f"Media file {image_path} not found")
+
+    # Keep the original extension, so X.png and X.jpg in one folder get thumbnails of their own
+    thumb_path = os.path.join(settings.MEDIA_ROOT, THUMBNAIL_DIR, image_path + '.jpg')
+
+    if not os.path.exists(thumb_path) or os.path.getmtime(thumb_path) < os.path.getmtime(source_path):
+        try:
+            from PIL import Image
+            os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+            with Image.open(source_path) as img:
+                img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+                img.convert('RGB').save(thumb_path, 'JPEG', quality=80)
+        except Exception:
+            # Fall back to the original image if it cannot be thumbnailed
+            return FileResponse(open(source_path, 'rb'))
+
+    return FileResponse(open(thumb_path, 'rb'), content_type='image/jpeg')
@@ -1,16 +1,28 @@
+import graphlib
+import itertools
 import os
 import tempfile
 import sqlite3
+import time
 import uuid
-import json
+from concurrent.futures import ThreadPoolExecutor
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import Http404, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.db import connection
-from ..models import Caliber
+from django.urls import reverse
+from ..models import Caliber, ImportJob, ImportUpload
+from ..utils.import_engine import (
+    BulkImportEngine, QueryCounter, UniqueKeys, caliber_codes_by_pk, cart_id_index, existing_unique_keys,
+    iter_rows, legacy_row_hash,
+)
+from ..utils.import_diff import KEEP, diff_table, open_change_set
+from ..utils.import_store import UPLOAD_DIR, open_report, write_report
+from ..utils.legacy_resolver import LegacyResolver
 
 
 # ===============================
@@ -29,10 +41,15 @@ def reset_table_and_sequence(model_class):
     """
     Reset a table and its ID sequence back to 1.
     Removes all existing records and resets the auto-increment sequence.
+    Legacy row hashes of the removed records are forgotten as well.
     """
+    from ..models import LegacyRowHash
+    
     table_name = model_class._meta.db_table
     sequence_name = f"{table_name}_id_seq"
     
+    LegacyRowHash.objects.filter(model_name=model_class._meta.model_name).delete()
+    
     with connection.cursor() as cursor:
         # Delete all records
         cursor.execute(f"DELETE FROM {table_name}")
@@ -127,59 +144,94 @@ def extract_sources_from_note(note):
     return clean_note, sources_info, warnings
 
 
-def process_sources(record_obj, sources_info, dry_run=True):
+class NoteSourceCache:
+    """
+    extract_sources_from_note results shared by the stages of a pipeline import.
+    Prefetch threads fill it for upcoming tables while the current stage is
+    writing, so by the time a stage reaches a note it is usually parsed already.
+    Only notes carrying source markers are kept; the rest are cheap to parse.
+    The Source IDs the stages resolve are shared too, so each source name
+    costs one lookup per import rather than one per table.
+    """
+    MARKER = '[Source:'
+
+    def __init__(self):
+        self.results = {}
+        # Source name -> ID, filled by the stages' import engines
+        self.source_ids = {}
+
+    def extract(self, note):
+        """Drop-in replacement for extract_sources_from_note"""
+        if not note or self.MARKER not in note:
+            return extract_sources_from_note(note)
+        result = self.results.get(note)
+        if result is None:
+            result = self.results[note] = extract_sources_from_note(note)
+        return result
+
+    def prefetch(self, db_path, table_name):
+        """
+        Parse the notes of a legacy table from a separate read-only connection.
+
+        Returns:
+            int: Number of notes parsed
+        """
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                f"SELECT DISTINCT note FROM [{table_name}] WHERE note LIKE ?", (f"%{self.MARKER}%",)
+            )
+            parsed = 0
+            for (note,) in rows:
+                if note not in self.results:
+                    self.results[note] = extract_sources_from_note(note)
+                    parsed += 1
+            return parsed
+        except sqlite3.OperationalError:
+            # Table or note column missing; the stage reports it
+            return 0
+        finally:
+            conn.close()
+
+
+def collect_engine_failures(engine, first_failures, key):
     """
-    Process source information and link sources to a record object.
+    Add records the bulk insert rejected to the sample failures.
 
     Args:
-        record_obj: The Django model instance to link sources to
-        sources_info (list): List of dictionaries with source data
-        dry_run (bool): If True, no database changes are made
+        engine (BulkImportEngine): A finished engine
+        first_failures (list): Sample failures for the web display
+        key (str): Identifier field of the record results ('code', 'cart_id', ...)
 
     Returns:
-        tuple: (sources_created, source_links_created, source_messages)
-            - sources_created (int): Number of new sources created
-            - source_links_created (int): Number of sources linked
-            - source_messages (list): Messages about created/linked sources
+        int: Number of records that failed during the bulk insert
     """
-    from django.utils import timezone
-    from ..models import Source
+    for record_result, error_msg in engine.failures:
+        if len(first_failures) < 2:
+            first_failures.append({
+                'id': record_result['id'],
+                key: record_result[key],
+                'error': error_msg
+            })
+    return len(engine.failures)
 
-    sources_created = 0
-    source_links_created = 0
-    source_messages = []
-
-    if dry_run:
-        for source_info in sources_info:
-            existing_source = Source.objects.filter(name=source_info['name']).exists()
-            if not existing_source:
-                sources_created += 1
-                source_messages.append(f"Would create new source: {source_info['name']}")
-
-            source_links_created += 1
-            source_messages.append(f"Would link source: {source_info['name']} ({source_info['date']})")
-
-    else:
-        for source_info in sources_info:
-            source, source_created = Source.objects.get_or_create(
-                name=source_info['name'],
-                defaults={'description': '', 'created_at': timezone.now()}
-            )
 
-            if source_created:
-                sources_created += 1
-                source_messages.append(f"Created new source: {source_info['name']}")
+def existing_box_ids(content_types, parent_calibers):
+    """
+    Box IDs of stored boxes, to keep them reserved for their owners in a merge.
+    A box's caliber is the caliber of its parent record.
 
-            if hasattr(record_obj, 'add_source'):
-                record_obj.add_source(
-                    source=source,
-                    date=source_info['date'],
-                    note=f"cc: {source_info['cc']}; note: {source_info.get('note', '')}"
-                )
-                source_links_created += 1
-                source_messages.append(f"Linked source: {source_info['name']} ({source_info['date']})")
+    Returns:
+        list: [(caliber code, bid, pk)]
+    """
+    from ..models import Box
 
-    return sources_created, source_links_created, source_messages
+    model_names = {ct.id: ct.model for ct in content_types.values() if ct}
+    rows = Box.objects.order_by().values_list('content_type_id', 'object_id', 'bid', 'pk')
+    return [
+        (parent_calibers.get(model_names.get(ct_id), {}).get(object_id), bid, pk)
+        for ct_id, object_id, bid, pk in rows.iterator()
+    ]
 
 
 def parse_date(date_str):
@@ -236,131 +288,10 @@ def parse_price(price_str):
     except (InvalidOperation, ValueError):
         return None, f"Invalid price format '{price_str}', leaving blank"
 
-def find_manufacturer_by_code_and_country(manuf_code, country_name):
-    """
-    Find a manufacturer by code and country name.
-    
-    Args:
-        manuf_code (str): The manufacturer code
-        country_name (str): The country name
-        
-    Returns:
-        tuple: (manufacturer, error_message)
-            - manufacturer: Manufacturer object or None if not found
-            - error_message: Error message if not found, empty string otherwise
-    """
-    from ..models import Manufacturer, Country
-    
-    if not manuf_code or not country_name:
-        return None, "Missing manufacturer code or country name"
-    
-    try:
-        # First find the country
-        country = Country.objects.filter(name=country_name).first()
-        if not country:
-            return None, f"Country '{country_name}' not found in the new database"
-        
-        # Then find the manufacturer by both code and country
-        manufacturer = Manufacturer.objects.get(code=manuf_code, country=country)
-        return manufacturer, ""
-    except Manufacturer.DoesNotExist:
-        return None, f"Manufacturer with code '{manuf_code}' for country '{country_name}' not found"
-    except Manufacturer.MultipleObjectsReturned:
-        return None, f"Multiple manufacturers found with code '{manuf_code}' for country '{country_name}'"
-    except Exception as e:
-        return None, f"Error finding manufacturer: {str(e)}"
-    
-
-
-def create_legacy_mapping(objects_dict):
-    """
-    Create a mapping dictionary from legacy values to model objects.
-    
-    Args:
-        objects_dict (dict): Dictionary of model objects keyed by id
-        
-    Returns:
-        dict: Mapping from legacy values to model objects
-    """
-    mapping = {}
-    
-    for obj in objects_dict.values():
-        if hasattr(obj, 'legacy_mappings') and obj.legacy_mappings:
-            # Handle different string formats that might be in the database
-            legacy_str = obj.legacy_mappings
-            
-            # Check if the field contains a JSON-like format with brackets
-            if legacy_str.startswith('[') and legacy_str.endswith(']'):
-                try:
-                    # Try to parse it like JSON (removing single quotes if present)
-                    import json
-                    legacy_str = legacy_str.replace("'", '"')
-                    mappings = json.loads(legacy_str)
-                except json.JSONDecodeError:
-                    # If JSON parsing fails, fall back to simpler processing
-                    # Remove brackets and split by commas
-                    legacy_str = legacy_str.strip('[]')
-                    mappings = [m.strip(' "\'') for m in legacy_str.split(',')]
-            else:
-                # Plain comma-separated string
-                mappings = [m.strip() for m in legacy_str.split(',')]
-            
-            # Add each mapping to the dictionary
-            for m in mappings:
-                if m:  # Only add non-empty mappings
-                    mapping[m] = obj
-                    
-                    # Also add lowercase version for case-insensitive matching
-                    mapping[m.lower()] = obj
-    
-    return mapping
-
-def map_lookup_value(value, mapping_dict, field_name, get_default=None):
-    """
-    Map a value from the old database to a model object using a mapping dictionary.
-    
-    Args:
-        value (str): The value to map
-        mapping_dict (dict): Dictionary mapping old values to model objects
-        field_name (str): Name of the field (for warning messages)
-        get_default (callable, optional): Function to get a default value if not found
-        
-    Returns:
-        tuple: (mapped_object, warning_message)
-            - mapped_object: The mapped model object or None
-            - warning_message: Warning message if mapping failed, empty string otherwise
-    """
-    if not value:
-        if get_default:
-            default_obj = get_default()
-            return default_obj, f"No {field_name} specified, using default"
-        return None, ""
-    
-    # Try an exact match first
-    mapped_obj = mapping_dict.get(value)
-    
-    # If no match, try a case-insensitive match
-    if not mapped_obj:
-        mapped_obj = mapping_dict.get(value.lower())
-    
-    # If still no match, try with whitespace trimmed
-    if not mapped_obj and value.strip() != value:
-        mapped_obj = mapping_dict.get(value.strip())
-        if not mapped_obj:
-            mapped_obj = mapping_dict.get(value.strip().lower())
-    
-    # If no match found, use default or return None with warning
-    if not mapped_obj:
-        if get_default:
-            default_obj = get_default()
-            return default_obj, f"Unknown {field_name} '{value}', using default"
-        return None, f"Unknown {field_name} '{value}', leaving blank"
-    
-    return mapped_obj, ""
-
 def generate_import_report(table_name, total_records, processed, success, failed, warnings, 
                            sources_created, source_links_created, record_results, 
-                           field_mapping_items, first_failures, first_warnings, dry_run=True):
+                           field_mapping_items, first_failures, first_warnings, dry_run=True,
+                           merge_stats=None):
     """
     Generate import report with summary and details.
     
@@ -373,11 +304,12 @@ def generate_import_report(table_name, total_records, processed, success, failed
         warnings (int): Number of warnings generated
         sources_created (int): Number of new sources created
         source_links_created (int): Number of source links created
-        record_results (list): Detailed results for each record
+        record_results (iterable): Detailed results for each record, read lazily
         field_mapping_items (list): List of tuples with field mappings (old_field, new_field)
         first_failures (list): List of first few failures for web display
         first_warnings (list): List of first few warnings for web display
         dry_run (bool): Whether this was a dry run
+        merge_stats (dict, optional): Inserted/updated/unchanged/deleted counts of a merge import
         
     Returns:
         dict: Report components including summary, details, and web summary
@@ -393,6 +325,14 @@ def generate_import_report(table_name, total_records, processed, success, failed
     summary += f"{'Would be ' if dry_run else ''}Sources created: {sources_created}\n"
     summary += f"{'Would be ' if dry_run else ''}Source links created: {source_links_created}\n"
     
+    if merge_stats:
+        summary += f"{'Would be ' if dry_run else ''}Inserted: {merge_stats['inserted']}\n"
+        summary += f"{'Would be ' if dry_run else ''}Updated: {merge_stats['updated']}\n"
+        summary += f"Unchanged (skipped): {merge_stats['unchanged']}\n"
+        summary += f"{'Would be ' if dry_run else ''}Deleted: {merge_stats['deleted']}\n"
+        if merge_stats['not_deleted']:
+            summary += f"Not deleted (still referenced): {merge_stats['not_deleted']}\n"
+    
     # Field mapping info
     field_mapping = "\nField mapping used:\n"
     field_mapping += "-" * 30 + "\n"
@@ -419,14 +359,43 @@ def generate_import_report(table_name, total_records, processed, success, failed
             identifier = warning.get('code', warning.get('cart_id', warning.get('id', 'Unknown')))
             web_summary += f"{i+1}. {table_name} {identifier} (ID: {warning['id']}): {warning['warning']}\n"
     
-    # Create detailed report depending on record type
-    details = f"\nDETAILED RECORD PROCESSING - {table_name.upper()}\n"
-    details += "-" * 40 + "\n"
+    # Return all components
+    return {
+        'summary': summary + field_mapping,  # Header of the downloadable report
+        'web_summary': web_summary,          # For web display
+        'details': iter_report_details(table_name, record_results),  # Streamed after the summary
+        'stats': {
+            'processed': processed,
+            'success': success,
+            'failed': failed,
+            'warnings': warnings,
+            'sources_created': sources_created,
+            'source_links_created': source_links_created,
+            **(merge_stats or {})
+        },
+        'first_failures': first_failures,
+        'first_warnings': first_warnings
+    }
+
+
+def iter_report_details(table_name, record_results):
+    """
+    Yield the detailed section of an import report one record at a time,
+    so the full report never has to be held in memory.
+    
+    Args:
+        table_name (str): The name of the table being imported
+        record_results (iterable): Detailed results for each record
+        
+    Yields:
+        str: Report text
+    """
+    yield f"\nDETAILED RECORD PROCESSING - {table_name.upper()}\n" + "-" * 40 + "\n"
     
     for i, record in enumerate(record_results):
         # Get a primary identifier (code for headstamps, cart_id for others)
         identifier = record.get('code', record.get('cart_id', record.get('id', 'Unknown')))
-        details += f"Record {i+1}: {identifier} ({table_name} ID: {record['id']}) - {record['status'].upper()}\n"
+        details = f"Record {i+1}: {identifier} ({table_name} ID: {record['id']}) - {record['status'].upper()}\n"
         
         # Include record-specific details if successful
         if record['status'] == 'success':
@@ -462,37 +431,116 @@ def generate_import_report(table_name, total_records, processed, success, failed
             for error in record['errors']:
                 details += f"    - {error}\n"
         
-        details += "\n"
-    
-    # Return all components
-    return {
-        'summary': summary + field_mapping,  # For downloadable report
-        'web_summary': web_summary,          # For web display
-        'details': details,                  # Detailed results for downloadable report
-        'complete_report': summary + field_mapping + details,  # Full report
-        'stats': {
-            'processed': processed,
-            'success': success,
-            'failed': failed,
-            'warnings': warnings,
-            'sources_created': sources_created,
-            'source_links_created': source_links_created
-        },
-        'first_failures': first_failures,
-        'first_warnings': first_warnings
-    }
+        yield details + "\n"
 
-def import_countries(cursor, dry_run):
+
+# ===============================
+# Legacy Queries
+# ===============================
+
+# Query each importer streams its legacy rows from. Row hashes cover every
+# selected column, so the diff engine must read rows through the same query.
+LEGACY_QUERIES = {
+    'Country': "SELECT * FROM Country",
+    'Manuf': """
+        SELECT 
+            m.*,
+            c.name as country_name
+        FROM Manuf m
+        LEFT JOIN Country c ON m.country_id = c.country_id
+    """,
+    'Headstamp': """
+        SELECT 
+            h.*, 
+            m1.code as manuf_code,
+            m1.country_id as manuf_country_id,
+            c1.name as country_name,
+            m2.code as prim_man_code,
+            m2.country_id as prim_man_country_id,
+            c2.name as prim_country_name
+        FROM Headstamp h
+        LEFT JOIN Manuf m1 ON h.manuf_id = m1.manuf_id
+        LEFT JOIN Country c1 ON m1.country_id = c1.country_id
+        LEFT JOIN Manuf m2 ON h.prim_man_id = m2.manuf_id
+        LEFT JOIN Country c2 ON m2.country_id = c2.country_id
+    """,
+    'Load': """
+        SELECT 
+            l.*,
+            h.code as headstamp_code,
+            m.code as manuf_code,
+            c.name as country_name
+        FROM Load l
+        LEFT JOIN Headstamp h ON l.headstamp_id = h.headstamp_id
+        LEFT JOIN Manuf m ON h.manuf_id = m.manuf_id
+        LEFT JOIN Country c ON m.country_id = c.country_id
+    """,
+    'Date': """
+        SELECT 
+            d.*,
+            l.cart_id as load_cart_id,
+            l.headstamp_id,
+            h.code as headstamp_code,
+            m.code as manuf_code,
+            c.name as country_name
+        FROM Date d
+        LEFT JOIN Load l ON d.load_id = l.load_id
+        LEFT JOIN Headstamp h ON l.headstamp_id = h.headstamp_id
+        LEFT JOIN Manuf m ON h.manuf_id = m.manuf_id
+        LEFT JOIN Country c ON m.country_id = c.country_id
+    """,
+    'Variation': """
+        SELECT 
+            v.*,
+            l.cart_id as load_cart_id,
+            d.cart_id as date_cart_id
+        FROM Variation v
+        LEFT JOIN Load l ON v.load_id = l.load_id
+        LEFT JOIN Date d ON v.date_id = d.date_id
+    """,
+    'Box': """
+        SELECT * FROM Box
+    """,
+}
+
+# Model fields each importer fills from the legacy row. A merge updates only
+# these (plus updated_at); fields maintained in the app, such as a country's
+# short_name and description or a record's image, keep their stored values.
+LEGACY_FIELDS = {
+    'Country': ['name', 'full_name', 'note'],
+    'Manuf': ['code', 'name', 'country', 'note'],
+    'Headstamp': ['code', 'name', 'manufacturer', 'primary_manufacturer', 'cc', 'note'],
+    'Load': [
+        'legacy_id', 'cart_id', 'load_type', 'bullet', 'is_magnetic', 'case_type', 'primer',
+        'pa_color', 'description', 'headstamp', 'cc', 'acquisition_note', 'price', 'note',
+    ],
+    'Date': [
+        'legacy_id', 'cart_id', 'year', 'lot_month', 'load', 'cc', 'acquisition_note', 'price', 'note',
+    ],
+    'Variation': [
+        'legacy_id', 'cart_id', 'load', 'date', 'description', 'cc', 'acquisition_note', 'price', 'note',
+    ],
+    'Box': [
+        'legacy_id', 'bid', 'location', 'description', 'art_type', 'art_type_other', 'cc',
+        'acquisition_note', 'price', 'note', 'content_type', 'object_id',
+    ],
+}
+
+
+def import_countries(cursor, dry_run, progress=None, import_mode='replace', note_sources=None, resolver=None,
+                     only_ids=None):
     """
     Import country records from SQLite database
     Returns a dictionary with summary, stats, and detailed results
     """
-    from django.utils import timezone
-    from django.db import transaction, IntegrityError
     from ..models import Country, Caliber
-    
-    # Clear existing data if not in dry run mode
-    if not dry_run:
+
+    merge = import_mode == 'merge'
+    extract_sources = note_sources.extract if note_sources else extract_sources_from_note
+    resolver = resolver or LegacyResolver()
+
+    # Clear existing data unless this is a dry run or a merge
+    if not dry_run and not merge:
         reset_table_and_sequence(Country)
     
     # Get the caliber - we'll use the same caliber for all countries
@@ -506,9 +554,9 @@ def import_countries(cursor, dry_run):
     # Get record count
     total_records = _get_table_count(cursor, "Country")
     
-    # Get all countries
-    cursor.execute("SELECT * FROM Country")
-    countries = cursor.fetchall()
+    # Stream all countries
+    cursor.execute(LEGACY_QUERIES['Country'])
+    countries = iter_rows(cursor)
     
     # Initialize counters
     processed = 0
@@ -522,11 +570,13 @@ def import_countries(cursor, dry_run):
     first_failures = []
     first_warnings = []
     
-    # Results for detailed record processing
-    record_results = []
-    
+    engine = BulkImportEngine(Country, dry_run=dry_run, merge=merge, only_ids=only_ids,
+                              fields=LEGACY_FIELDS['Country'])
+
     # Process each country
     for country in countries:
+        if progress:
+            progress(processed, success, failed)
         processed += 1
         record_result = {
             'id': country['country_id'],
@@ -539,9 +589,15 @@ def import_countries(cursor, dry_run):
         }
         
         try:
+            row_hash = legacy_row_hash(country)
+            if engine.is_unchanged(country['country_id'], row_hash):
+                record_result['status'] = 'unchanged'
+                engine.record(record_result)
+                continue
+
             # Process note and extract sources if needed
             note = country['note'] or ''
-            clean_note, sources_info, source_warnings = extract_sources_from_note(note)
+            clean_note, sources_info, source_warnings = extract_sources(note)
             
             # Add any source warnings to the record
             for warning in source_warnings:
@@ -566,42 +622,19 @@ def import_countries(cursor, dry_run):
                 'sources_count': len(sources_info)
             }
             
-            # Process the country record
-            if not dry_run:
-                with transaction.atomic():
-                    # Create country with explicit ID to maintain the same record number
-                    country_obj = Country.objects.create(
-                        id=country['country_id'],
-                        name=country['name'],
-                        full_name=country['full_name'],
-                        caliber=caliber,
-                        note=clean_note,
-                    )
-                    
-                    # Process source links if supported
-                    if hasattr(country_obj, 'add_source'):
-                        new_sources, new_links, source_msgs = process_sources(
-                            country_obj, 
-                            sources_info, 
-                            dry_run=False
-                        )
-                        
-                        sources_created += new_sources
-                        source_links_created += new_links
-                        record_result['sources'].extend(source_msgs)
-            else:
-                # Simulate source processing in dry run mode
-                if sources_info:
-                    new_sources, new_links, source_msgs = process_sources(
-                        None,  # No actual object in dry run
-                        sources_info, 
-                        dry_run=True
-                    )
-                    
-                    sources_created += new_sources
-                    source_links_created += new_links
-                    record_result['sources'].extend(source_msgs)
-            
+            # Queue the country with explicit ID to maintain the same record number
+            engine.add(
+                Country(
+                    id=country['country_id'],
+                    name=country['name'],
+                    full_name=country['full_name'],
+                    caliber=caliber,
+                    note=clean_note,
+                ),
+                record_result,
+                row_hash=row_hash
+            )
+
             # Mark record as successful
             record_result['status'] = 'success'
             record_result['note_before'] = note
@@ -622,8 +655,14 @@ def import_countries(cursor, dry_run):
                     'error': error_msg
                 })
         
-        record_results.append(record_result)
-    
+        engine.record(record_result)
+
+    # Write the remaining rows and reset the ID sequence
+    engine.finish()
+    late_failures = collect_engine_failures(engine, first_failures, 'name')
+    success -= late_failures
+    failed += late_failures
+
     # Generate the import report using the utility function
     field_mapping_items = [
         ('country_id', 'id (preserved)'),
@@ -642,39 +681,37 @@ def import_countries(cursor, dry_run):
         warnings=warnings,
         sources_created=sources_created,
         source_links_created=source_links_created,
-        record_results=record_results,
+        record_results=engine.results,
         field_mapping_items=field_mapping_items,
         first_failures=first_failures,
         first_warnings=first_warnings,
-        dry_run=dry_run
+        dry_run=dry_run,
+        merge_stats=engine.merge_stats()
     )
 
 
-def import_manufacturers(cursor, dry_run):
+def import_manufacturers(cursor, dry_run, progress=None, import_mode='replace', note_sources=None, resolver=None,
+                         only_ids=None):
     """
     Import manufacturer records from SQLite database
     Returns a dictionary with summary, stats, and detailed results
     """
-    from django.utils import timezone
-    from django.db import transaction, IntegrityError
-    from ..models import Manufacturer, Country
-    
-    # Clear existing data if not in dry run mode
-    if not dry_run:
+    from ..models import Manufacturer
+
+    merge = import_mode == 'merge'
+    extract_sources = note_sources.extract if note_sources else extract_sources_from_note
+    resolver = resolver or LegacyResolver()
+
+    # Clear existing data unless this is a dry run or a merge
+    if not dry_run and not merge:
         reset_table_and_sequence(Manufacturer)
     
     # Get record count
     total_records = _get_table_count(cursor, "Manuf")
     
-    # Get all manufacturers with country info
-    cursor.execute("""
-        SELECT 
-            m.*,
-            c.name as country_name
-        FROM Manuf m
-        LEFT JOIN Country c ON m.country_id = c.country_id
-    """)
-    manufacturers = cursor.fetchall()
+    # Stream all manufacturers with country info
+    cursor.execute(LEGACY_QUERIES['Manuf'])
+    manufacturers = iter_rows(cursor)
     
     # Initialize counters
     processed = 0
@@ -688,11 +725,13 @@ def import_manufacturers(cursor, dry_run):
     first_failures = []
     first_warnings = []
     
-    # Results for detailed record processing
-    record_results = []
-    
+    engine = BulkImportEngine(Manufacturer, dry_run=dry_run, merge=merge, only_ids=only_ids,
+                              fields=LEGACY_FIELDS['Manuf'])
+
     # Process each manufacturer
     for manuf in manufacturers:
+        if progress:
+            progress(processed, success, failed)
         processed += 1
         record_result = {
             'id': manuf['manuf_id'],
@@ -705,11 +744,19 @@ def import_manufacturers(cursor, dry_run):
         }
         
         try:
+            row_hash = legacy_row_hash(manuf)
+            if engine.is_unchanged(manuf['manuf_id'], row_hash):
+                record_result['status'] = 'unchanged'
+                engine.record(record_result)
+                continue
+
             # Find country by name
-            try:
-                country = Country.objects.get(name=manuf['country_name'])
-            except Country.DoesNotExist:
-                error_msg = f"Country '{manuf['country_name']}' not found"
+            country_ids = resolver.country_ids(manuf['country_name'])
+            if len(country_ids) != 1:
+                if country_ids:
+                    error_msg = f"Multiple countries found with name '{manuf['country_name']}'"
+                else:
+                    error_msg = f"Country '{manuf['country_name']}' not found"
                 record_result['status'] = 'error'
                 record_result['errors'].append(error_msg)
                 failed += 1
@@ -722,12 +769,12 @@ def import_manufacturers(cursor, dry_run):
                         'error': error_msg
                     })
                 
-                record_results.append(record_result)
+                engine.record(record_result)
                 continue
             
             # Process note and extract sources
             note = manuf['note'] or ''
-            clean_note, sources_info, source_warnings = extract_sources_from_note(note)
+            clean_note, sources_info, source_warnings = extract_sources(note)
             
             # Add any source warnings to the record
             for warning in source_warnings:
@@ -752,42 +799,19 @@ def import_manufacturers(cursor, dry_run):
                 'sources_count': len(sources_info)
             }
             
-            # Process the manufacturer record
-            if not dry_run:
-                with transaction.atomic():
-                    # Create manufacturer with explicit ID to maintain the same record number
-                    manufacturer = Manufacturer.objects.create(
-                        id=manuf['manuf_id'],
-                        code=manuf['code'],
-                        name=manuf['name'],
-                        country=country,
-                        note=clean_note
-                    )
-                    
-                    # Process source links if supported
-                    if hasattr(manufacturer, 'add_source'):
-                        new_sources, new_links, source_msgs = process_sources(
-                            manufacturer, 
-                            sources_info, 
-                            dry_run=False
-                        )
-                        
-                        sources_created += new_sources
-                        source_links_created += new_links
-                        record_result['sources'].extend(source_msgs)
-            else:
-                # Simulate source processing in dry run mode
-                if sources_info:
-                    new_sources, new_links, source_msgs = process_sources(
-                        None,  # No actual object in dry run
-                        sources_info, 
-                        dry_run=True
-                    )
-                    
-                    sources_created += new_sources
-                    source_links_created += new_links
-                    record_result['sources'].extend(source_msgs)
-            
+            # Queue the manufacturer with explicit ID to maintain the same record number
+            engine.add(
+                Manufacturer(
+                    id=manuf['manuf_id'],
+                    code=manuf['code'],
+                    name=manuf['name'],
+                    country_id=country_ids[0],
+                    note=clean_note
+                ),
+                record_result,
+                row_hash=row_hash
+            )
+
             # Mark record as successful
             record_result['status'] = 'success'
             record_result['note_before'] = note
@@ -808,8 +832,14 @@ def import_manufacturers(cursor, dry_run):
                     'error': error_msg
                 })
         
-        record_results.append(record_result)
-    
+        engine.record(record_result)
+
+    # Write the remaining rows and reset the ID sequence
+    engine.finish()
+    late_failures = collect_engine_failures(engine, first_failures, 'code')
+    success -= late_failures
+    failed += late_failures
+
     # Generate the import report using the utility function
     field_mapping_items = [
         ('manuf_id', 'id (preserved)'),
@@ -828,49 +858,38 @@ def import_manufacturers(cursor, dry_run):
         warnings=warnings,
         sources_created=sources_created,
         source_links_created=source_links_created,
-        record_results=record_results,
+        record_results=engine.results,
         field_mapping_items=field_mapping_items,
         first_failures=first_failures,
         first_warnings=first_warnings,
-        dry_run=dry_run
+        dry_run=dry_run,
+        merge_stats=engine.merge_stats()
     )
 
 
-def import_headstamps(cursor, dry_run):
+def import_headstamps(cursor, dry_run, progress=None, import_mode='replace', note_sources=None, resolver=None,
+                      only_ids=None):
     """
     Import headstamp records from SQLite database
     Returns a dictionary with summary, stats, and detailed results
     """
-    from datetime import datetime, date
     from django.utils import timezone
-    from ..models import Headstamp, Manufacturer, Source, HeadstampSource, Country
-    import re
-    from django.db import transaction, IntegrityError
-    
-    # Clear existing data if not in dry run mode
-    if not dry_run:
+    from ..models import Headstamp, HeadstampSource
+
+    merge = import_mode == 'merge'
+    extract_sources = note_sources.extract if note_sources else extract_sources_from_note
+    resolver = resolver or LegacyResolver()
+
+    # Clear existing data unless this is a dry run or a merge
+    if not dry_run and not merge:
         reset_table_and_sequence(Headstamp)
     
     # Get record count
     total_records = _get_table_count(cursor, "Headstamp")
     
-    # Get all headstamps with manufacturer and country info
-    cursor.execute("""
-        SELECT 
-            h.*, 
-            m1.code as manuf_code,
-            m1.country_id as manuf_country_id,
-            c1.name as country_name,
-            m2.code as prim_man_code,
-            m2.country_id as prim_man_country_id,
-            c2.name as prim_country_name
-        FROM Headstamp h
-        LEFT JOIN Manuf m1 ON h.manuf_id = m1.manuf_id
-        LEFT JOIN Country c1 ON m1.country_id = c1.country_id
-        LEFT JOIN Manuf m2 ON h.prim_man_id = m2.manuf_id
-        LEFT JOIN Country c2 ON m2.country_id = c2.country_id
-    """)
-    headstamps = cursor.fetchall()
+    # Stream all headstamps with manufacturer and country info
+    cursor.execute(LEGACY_QUERIES['Headstamp'])
+    headstamps = iter_rows(cursor)
     
     # Initialize counters
     processed = 0
@@ -884,11 +903,20 @@ def import_headstamps(cursor, dry_run):
     first_failures = []
     first_warnings = []
     
-    # Results for detailed record processing
-    record_results = []
-    
+    # A merge keeps the codes of stored headstamps reserved for their owners
+    unique_keys = UniqueKeys(
+        Headstamp.objects.values_list('manufacturer_id', 'code', 'pk') if merge else ()
+    )
+    engine = BulkImportEngine(
+        Headstamp, HeadstampSource, 'headstamp', dry_run=dry_run, merge=merge, only_ids=only_ids,
+        source_ids=note_sources.source_ids if note_sources else None,
+        fields=LEGACY_FIELDS['Headstamp'],
+    )
+
     # Process each headstamp
     for hs in headstamps:
+        if progress:
+            progress(processed, success, failed)
         processed += 1
         record_result = {
             'id': hs['headstamp_id'],
@@ -900,13 +928,21 @@ def import_headstamps(cursor, dry_run):
         }
         
         try:
+            row_hash = legacy_row_hash(hs)
+            if engine.is_unchanged(hs['headstamp_id'], row_hash):
+                record_result['status'] = 'unchanged'
+                engine.record(record_result)
+                continue
+
             # Find manufacturer by code and country
-            manufacturer, error_msg = find_manufacturer_by_code_and_country(
-                hs['manuf_code'], 
-                hs['country_name']
-            )
+            manufacturer_id, error_msg = resolver.manufacturer(hs['manuf_code'], hs['country_name'])
+            
+            # Codes are unique per manufacturer
+            if manufacturer_id and not unique_keys.claim(manufacturer_id, hs['code'], hs['headstamp_id']):
+                manufacturer_id = None
+                error_msg = f"Headstamp '{hs['code']}' already exists for manufacturer {hs['manuf_code']} ({hs['country_name']})"
             
-            if not manufacturer:
+            if not manufacturer_id:
                 record_result['status'] = 'error'
                 record_result['errors'].append(error_msg)
                 failed += 1
@@ -919,19 +955,18 @@ def import_headstamps(cursor, dry_run):
                         'error': error_msg
                     })
                 
-                record_results.append(record_result)
+                engine.record(record_result)
                 continue
             
             # Find primary manufacturer
-            primary_manufacturer = None
+            primary_manufacturer_id = None
             if hs['prim_man_id']:
                 # Try to find primary manufacturer by code and country
-                primary_manufacturer, error_msg = find_manufacturer_by_code_and_country(
-                    hs['prim_man_code'], 
-                    hs['prim_country_name']
+                primary_manufacturer_id, error_msg = resolver.manufacturer(
+                    hs['prim_man_code'], hs['prim_country_name']
                 )
                 
-                if not primary_manufacturer:
+                if not primary_manufacturer_id:
                     warning_msg = f"Primary manufacturer issue: {error_msg}, using main manufacturer"
                     record_result['warnings'].append(warning_msg)
                     warnings += 1
@@ -944,13 +979,13 @@ def import_headstamps(cursor, dry_run):
                             'warning': warning_msg
                         })
                     
-                    primary_manufacturer = manufacturer
+                    primary_manufacturer_id = manufacturer_id
             else:
-                primary_manufacturer = manufacturer
+                primary_manufacturer_id = manufacturer_id
             
             # Process note and extract sources
             note = hs['note'] or ''
-            clean_note, sources_info, source_warnings = extract_sources_from_note(note)
+            clean_note, sources_info, source_warnings = extract_sources(note)
             
             # Add any source warnings to the record
             for warning in source_warnings:
@@ -965,44 +1000,24 @@ def import_headstamps(cursor, dry_run):
                         'warning': warning
                     })
             
-            # Process the headstamp record
-            if not dry_run:
-                with transaction.atomic():
-                    # Create headstamp with explicit ID to maintain the same record number
-                    headstamp = Headstamp.objects.create(
-                        id=hs['headstamp_id'],
-                        code=hs['code'],
-                        name=hs['name'],
-                        manufacturer=manufacturer,
-                        primary_manufacturer=primary_manufacturer,
-                        cc=hs['cc'],
-                        note=clean_note,
-                        updated_at=timezone.now(),
-                        # Set image to None explicitly, as we're not importing images
-                        image=None
-                    )
-                    
-                    # Process source links
-                    new_sources, new_links, source_msgs = process_sources(
-                        headstamp, 
-                        sources_info, 
-                        dry_run=False
-                    )
-                    
-                    sources_created += new_sources
-                    source_links_created += new_links
-                    record_result['sources'].extend(source_msgs)
-            else:
-                # Simulate source processing in dry run mode
-                new_sources, new_links, source_msgs = process_sources(
-                    None,  # No actual object in dry run
-                    sources_info, 
-                    dry_run=True
-                )
-                
-                sources_created += new_sources
-                source_links_created += new_links
-                record_result['sources'].extend(source_msgs)
+            # Queue the headstamp with explicit ID to maintain the same record number
+            engine.add(
+                Headstamp(
+                    id=hs['headstamp_id'],
+                    code=hs['code'],
+                    name=hs['name'],
+                    manufacturer_id=manufacturer_id,
+                    primary_manufacturer_id=primary_manufacturer_id,
+                    cc=hs['cc'],
+                    note=clean_note,
+                    updated_at=timezone.now(),
+                    # Set image to None explicitly, as we're not importing images
+                    image=None
+                ),
+                record_result,
+                sources_info,
+                row_hash=row_hash
+            )
             
             record_result['status'] = 'success'
             record_result['note_before'] = note
@@ -1026,8 +1041,16 @@ def import_headstamps(cursor, dry_run):
                     'error': error_msg
                 })
         
-        record_results.append(record_result)
-    
+        engine.record(record_result)
+
+    # Write the remaining rows and source links, then reset the ID sequences
+    engine.finish()
+    late_failures = collect_engine_failures(engine, first_failures, 'code')
+    success -= late_failures
+    failed += late_failures
+    sources_created = engine.sources_created
+    source_links_created = engine.source_links_created
+
     # Generate the import report using the utility function
     field_mapping_items = [
         ('headstamp_id', 'id (preserved)'),
@@ -1048,46 +1071,38 @@ def import_headstamps(cursor, dry_run):
         warnings=warnings,
         sources_created=sources_created,
         source_links_created=source_links_created,
-        record_results=record_results,
+        record_results=engine.results,
         field_mapping_items=field_mapping_items,
         first_failures=first_failures,
         first_warnings=first_warnings,
-        dry_run=dry_run
+        dry_run=dry_run,
+        merge_stats=engine.merge_stats()
     )
 
 
-def import_loads(cursor, dry_run):
+def import_loads(cursor, dry_run, progress=None, import_mode='replace', note_sources=None, resolver=None,
+                 only_ids=None):
     """
     Import load records from SQLite database
     Returns a dictionary with summary, stats, and detailed results
     """
     from django.utils import timezone
-    from django.db import transaction
-    from ..models import (
-        Load, Headstamp, Source, LoadSource, 
-        LoadType, BulletType, CaseType, PrimerType, PAColor
-    )
+    from ..models import Load, LoadSource
     
-    # Clear existing data if not in dry run mode
-    if not dry_run:
+    merge = import_mode == 'merge'
+    extract_sources = note_sources.extract if note_sources else extract_sources_from_note
+    resolver = resolver or LegacyResolver()
+
+    # Clear existing data unless this is a dry run or a merge
+    if not dry_run and not merge:
         reset_table_and_sequence(Load)
     
     # Get record count
     total_records = _get_table_count(cursor, "Load")
     
-    # Get all loads with headstamp info
-    cursor.execute("""
-        SELECT 
-            l.*,
-            h.code as headstamp_code,
-            m.code as manuf_code,
-            c.name as country_name
-        FROM Load l
-        LEFT JOIN Headstamp h ON l.headstamp_id = h.headstamp_id
-        LEFT JOIN Manuf m ON h.manuf_id = m.manuf_id
-        LEFT JOIN Country c ON m.country_id = c.country_id
-    """)
-    loads = cursor.fetchall()
+    # Stream all loads with headstamp info
+    cursor.execute(LEGACY_QUERIES['Load'])
+    loads = iter_rows(cursor)
     
     # Initialize counters
     processed = 0
@@ -1101,38 +1116,23 @@ def import_loads(cursor, dry_run):
     first_failures = []
     first_warnings = []
     
-    # Results for detailed record processing
-    record_results = []
-    
-    # Load all lookup tables for reference
-    load_types = {lt.id: lt for lt in LoadType.objects.all()}
-    bullet_types = {bt.id: bt for bt in BulletType.objects.all()}
-    case_types = {ct.id: ct for ct in CaseType.objects.all()}
-    primer_types = {pt.id: pt for pt in PrimerType.objects.all()}
-    pa_colors = {pc.id: pc for pc in PAColor.objects.all()}
-    
-    # Create mapping dictionaries from legacy_mappings
-    lookup_tables = {
-        'load_type': create_legacy_mapping(load_types),
-        'bullet': create_legacy_mapping(bullet_types),
-        'case_type': create_legacy_mapping(case_types),
-        'primer': create_legacy_mapping(primer_types),
-        'pa_color': create_legacy_mapping(pa_colors)
-    }
+    # Default LoadType for both blank and unknown values
+    default_load_type = resolver.default_load_type()
     
-    # Find a good default LoadType to use for both blank and unknown values
-    default_load_type = None
-    for lt in load_types.values():
-        if lt.display_name == "Unknown" or lt.display_name == "Unspecified":  
-            default_load_type = lt
-            break
+    headstamp_calibers = caliber_codes_by_pk('headstamp')
+
+    # Cart IDs must be unique within a caliber
+    unique_keys = UniqueKeys(existing_unique_keys('load', 'cart_id') if merge else ())
+    engine = BulkImportEngine(
+        Load, LoadSource, 'load', dry_run=dry_run, merge=merge, only_ids=only_ids,
+        source_ids=note_sources.source_ids if note_sources else None,
+        fields=LEGACY_FIELDS['Load'],
+    )
 
-    # If no specific match found, use the first load type as a fallback
-    if not default_load_type and load_types:
-        default_load_type = next(iter(load_types.values()))
-    
     # Process each load
     for ld in loads:
+        if progress:
+            progress(processed, success, failed)
         processed += 1
         record_result = {
             'id': ld['load_id'],
@@ -1145,15 +1145,15 @@ def import_loads(cursor, dry_run):
         }
         
         try:
-            # Check if headstamp exists
-            try:
-                # Find the headstamp by its code and manufacturer (country)
-                headstamp = Headstamp.objects.get(
-                    code=ld['headstamp_code'],
-                    manufacturer__code=ld['manuf_code'],
-                    manufacturer__country__name=ld['country_name']
-                )
-            except Headstamp.DoesNotExist:
+            row_hash = legacy_row_hash(ld)
+            if engine.is_unchanged(ld['load_id'], row_hash):
+                record_result['status'] = 'unchanged'
+                engine.record(record_result)
+                continue
+
+            # Find the headstamp by its code and manufacturer (country)
+            headstamp_ids = resolver.headstamp_ids(ld['headstamp_code'], ld['manuf_code'], ld['country_name'])
+            if not headstamp_ids:
                 error_msg = f"Headstamp '{ld['headstamp_code']}' (manufacturer: {ld['manuf_code']}, country: {ld['country_name']}) not found"
                 record_result['status'] = 'error'
                 record_result['errors'].append(error_msg)
@@ -1167,19 +1167,15 @@ def import_loads(cursor, dry_run):
                         'error': error_msg
                     })
                 
-                record_results.append(record_result)
+                engine.record(record_result)
                 continue
-            except Headstamp.MultipleObjectsReturned:
+            
+            if len(headstamp_ids) > 1:
                 # Try to find a unique match with just code and manufacturer
-                try:
-                    headstamp = Headstamp.objects.filter(
-                        code=ld['headstamp_code'],
-                        manufacturer__code=ld['manuf_code']
-                    ).first()
+                matches = resolver.headstamp_ids(ld['headstamp_code'], ld['manuf_code'])
+                if matches:
+                    headstamp_ids = matches[:1]
                     
-                    if not headstamp:
-                        raise Headstamp.DoesNotExist()
-                        
                     warning_msg = f"Multiple headstamps found with code '{ld['headstamp_code']}' for manufacturer '{ld['manuf_code']}', using the first one"
                     record_result['warnings'].append(warning_msg)
                     warnings += 1
@@ -1191,7 +1187,7 @@ def import_loads(cursor, dry_run):
                             'cart_id': ld['cart_id'],
                             'warning': warning_msg
                         })
-                except Headstamp.DoesNotExist:
+                else:
                     error_msg = f"Headstamp '{ld['headstamp_code']}' (manufacturer: {ld['manuf_code']}) not found"
                     record_result['status'] = 'error'
                     record_result['errors'].append(error_msg)
@@ -1205,18 +1201,39 @@ def import_loads(cursor, dry_run):
                             'error': error_msg
                         })
                     
-                    record_results.append(record_result)
+                    engine.record(record_result)
                     continue
+            
+            headstamp_id = headstamp_ids[0]
+            caliber_code = headstamp_calibers.get(headstamp_id)
+            
+            # Validate cart_id uniqueness within the caliber, or assign the next free one
+            cart_id = ld['cart_id']
+            if not cart_id:
+                cart_id = unique_keys.next_value(caliber_code, 'L', ld['load_id'])
+            elif not unique_keys.claim(caliber_code, cart_id, ld['load_id']):
+                error_msg = f"Load with cart_id '{cart_id}' already exists in caliber {caliber_code}"
+                record_result['status'] = 'error'
+                record_result['errors'].append(error_msg)
+                failed += 1
+                
+                # Track for web display
+                if len(first_failures) < 2:
+                    first_failures.append({
+                        'id': ld['load_id'],
+                        'cart_id': ld['cart_id'],
+                        'error': error_msg
+                    })
+                
+                engine.record(record_result)
+                continue
                     
             # Map lookup fields using the utility function
             mappings = {}
             
             # Map load_type
-            mappings['load_type'], warning = map_lookup_value(
-                ld['load_type'], 
-                lookup_tables['load_type'], 
-                'load_type', 
-                get_default=lambda: default_load_type
+            mappings['load_type'], warning = resolver.map_value(
+                'load_type', ld['load_type'], default=default_load_type
             )
             if warning:
                 record_result['warnings'].append(warning)
@@ -1230,11 +1247,7 @@ def import_loads(cursor, dry_run):
                     })
             
             # Map bullet
-            mappings['bullet'], warning = map_lookup_value(
-                ld['bullet'], 
-                lookup_tables['bullet'], 
-                'bullet'
-            )
+            mappings['bullet'], warning = resolver.map_value('bullet', ld['bullet'])
             if warning:
                 record_result['warnings'].append(warning)
                 warnings += 1
@@ -1250,11 +1263,7 @@ def import_loads(cursor, dry_run):
             mappings['is_magnetic'] = ld['magnetic'] == 'Y' if ld['magnetic'] else False
             
             # Map case_type
-            mappings['case_type'], warning = map_lookup_value(
-                ld['case_type'], 
-                lookup_tables['case_type'], 
-                'case_type'
-            )
+            mappings['case_type'], warning = resolver.map_value('case_type', ld['case_type'])
             if warning:
                 record_result['warnings'].append(warning)
                 warnings += 1
@@ -1267,11 +1276,7 @@ def import_loads(cursor, dry_run):
                     })
                     
             # Map primer
-            mappings['primer'], warning = map_lookup_value(
-                ld['primer'], 
-                lookup_tables['primer'], 
-                'primer'
-            )
+            mappings['primer'], warning = resolver.map_value('primer', ld['primer'])
             if warning:
                 record_result['warnings'].append(warning)
                 warnings += 1
@@ -1284,11 +1289,7 @@ def import_loads(cursor, dry_run):
                     })
             
             # Map pa_color
-            mappings['pa_color'], warning = map_lookup_value(
-                ld['pa_color'], 
-                lookup_tables['pa_color'], 
-                'pa_color'
-            )
+            mappings['pa_color'], warning = resolver.map_value('pa_color', ld['pa_color'])
             if warning:
                 record_result['warnings'].append(warning)
                 warnings += 1
@@ -1318,7 +1319,7 @@ def import_loads(cursor, dry_run):
             
             # Process note and extract sources
             note = ld['note'] or ''
-            clean_note, sources_info, source_warnings = extract_sources_from_note(note)
+            clean_note, sources_info, source_warnings = extract_sources(note)
             
             # Add any source warnings to the record
             for warning in source_warnings:
@@ -1358,51 +1359,32 @@ def import_loads(cursor, dry_run):
                 'sources_count': len(sources_info)
             }
             
-            # Process the load record
-            if not dry_run:
-                with transaction.atomic():
-                    # Create load with explicit ID to maintain the same record number
-                    load = Load.objects.create(
-                        id=ld['load_id'],
-                        cart_id=ld['cart_id'],
-                        load_type=mappings['load_type'],
-                        bullet=mappings['bullet'],
-                        is_magnetic=mappings['is_magnetic'],
-                        case_type=mappings['case_type'],
-                        primer=mappings['primer'],
-                        pa_color=mappings['pa_color'],
-                        description=ld['description'],
-                        headstamp=headstamp,
-                        cc=ld['cc'],
-                        acquisition_note=acquisition_note,  # Use col_date as acquisition_note
-                        price=price,
-                        note=clean_note,
-                        updated_at=timezone.now(),
-                        # Set image to None explicitly, as we're not importing images
-                        image=None
-                    )
-                    
-                    # Process source links
-                    new_sources, new_links, source_msgs = process_sources(
-                        load, 
-                        sources_info, 
-                        dry_run=False
-                    )
-                    
-                    sources_created += new_sources
-                    source_links_created += new_links
-                    record_result['sources'].extend(source_msgs)
-            else:
-                # Simulate source processing in dry run mode
-                new_sources, new_links, source_msgs = process_sources(
-                    None,  # No actual object in dry run
-                    sources_info, 
-                    dry_run=True
-                )
-                
-                sources_created += new_sources
-                source_links_created += new_links
-                record_result['sources'].extend(source_msgs)
+            # Queue the load with explicit ID to maintain the same record number
+            engine.add(
+                Load(
+                    id=ld['load_id'],
+                    legacy_id=str(ld['load_id']),
+                    cart_id=cart_id,
+                    load_type=mappings['load_type'],
+                    bullet=mappings['bullet'],
+                    is_magnetic=mappings['is_magnetic'],
+                    case_type=mappings['case_type'],
+                    primer=mappings['primer'],
+                    pa_color=mappings['pa_color'],
+                    description=ld['description'],
+                    headstamp_id=headstamp_id,
+                    cc=ld['cc'],
+                    acquisition_note=acquisition_note,  # Use col_date as acquisition_note
+                    price=price,
+                    note=clean_note,
+                    updated_at=timezone.now(),
+                    # Set image to None explicitly, as we're not importing images
+                    image=None
+                ),
+                record_result,
+                sources_info,
+                row_hash=row_hash
+            )
             
             # Mark record as successful
             record_result['status'] = 'success'
@@ -1423,8 +1405,16 @@ def import_loads(cursor, dry_run):
                 })
         
         # Add result to record results list
-        record_results.append(record_result)
-    
+        engine.record(record_result)
+
+    # Write the remaining rows and source links, then reset the ID sequences
+    engine.finish()
+    late_failures = collect_engine_failures(engine, first_failures, 'cart_id')
+    success -= late_failures
+    failed += late_failures
+    sources_created = engine.sources_created
+    source_links_created = engine.source_links_created
+
     # Generate the import report using the utility function
     field_mapping_items = [
         ('load_id', 'id (preserved)'),
@@ -1452,47 +1442,38 @@ def import_loads(cursor, dry_run):
         warnings=warnings,
         sources_created=sources_created,
         source_links_created=source_links_created,
-        record_results=record_results,
+        record_results=engine.results,
         field_mapping_items=field_mapping_items,
         first_failures=first_failures,
         first_warnings=first_warnings,
-        dry_run=dry_run
+        dry_run=dry_run,
+        merge_stats=engine.merge_stats()
     )
 
 
-def import_dates(cursor, dry_run):
+def import_dates(cursor, dry_run, progress=None, import_mode='replace', note_sources=None, resolver=None,
+                 only_ids=None):
     """
     Import date records from SQLite database
     Returns a dictionary with summary, stats, and detailed results
     """
-    from datetime import datetime, date
     from django.utils import timezone
-    from django.db import transaction, IntegrityError
-    from ..models import Date, Load, Source, DateSource
+    from ..models import Date, DateSource
     
-    # Clear existing data if not in dry run mode
-    if not dry_run:
+    merge = import_mode == 'merge'
+    extract_sources = note_sources.extract if note_sources else extract_sources_from_note
+    resolver = resolver or LegacyResolver()
+
+    # Clear existing data unless this is a dry run or a merge
+    if not dry_run and not merge:
         reset_table_and_sequence(Date)
     
     # Get record count
     total_records = _get_table_count(cursor, "Date")
     
-    # Get all dates with load info
-    cursor.execute("""
-        SELECT 
-            d.*,
-            l.cart_id as load_cart_id,
-            l.headstamp_id,
-            h.code as headstamp_code,
-            m.code as manuf_code,
-            c.name as country_name
-        FROM Date d
-        LEFT JOIN Load l ON d.load_id = l.load_id
-        LEFT JOIN Headstamp h ON l.headstamp_id = h.headstamp_id
-        LEFT JOIN Manuf m ON h.manuf_id = m.manuf_id
-        LEFT JOIN Country c ON m.country_id = c.country_id
-    """)
-    dates = cursor.fetchall()
+    # Stream all dates with load info
+    cursor.execute(LEGACY_QUERIES['Date'])
+    dates = iter_rows(cursor)
     
     # Initialize counters
     processed = 0
@@ -1506,11 +1487,22 @@ def import_dates(cursor, dry_run):
     first_failures = []
     first_warnings = []
     
-    # Results for detailed record processing
-    record_results = []
-    
+    # Preload loads so each row is matched without a query
+    loads_by_cart_id = cart_id_index('load')
+    load_calibers = caliber_codes_by_pk('load')
+
+    # Cart IDs must be unique within a caliber
+    unique_keys = UniqueKeys(existing_unique_keys('date', 'cart_id') if merge else ())
+    engine = BulkImportEngine(
+        Date, DateSource, 'date', dry_run=dry_run, merge=merge, only_ids=only_ids,
+        source_ids=note_sources.source_ids if note_sources else None,
+        fields=LEGACY_FIELDS['Date'],
+    )
+
     # Process each date
     for dt in dates:
+        if progress:
+            progress(processed, success, failed)
         processed += 1
         record_result = {
             'id': dt['date_id'],
@@ -1523,11 +1515,27 @@ def import_dates(cursor, dry_run):
         }
         
         try:
-            # Find the load by cart_id
-            try:
-                load = Load.objects.get(cart_id=dt['load_cart_id'])
-            except Load.DoesNotExist:
+            row_hash = legacy_row_hash(dt)
+            if engine.is_unchanged(dt['date_id'], row_hash):
+                record_result['status'] = 'unchanged'
+                engine.record(record_result)
+                continue
+
+            # Find the load by cart_id, then check the date's cart_id is free in its caliber
+            load_ids = loads_by_cart_id.get(dt['load_cart_id'], [])
+            caliber_code = load_calibers.get(load_ids[0]) if len(load_ids) == 1 else None
+            cart_id = dt['cart_id']
+            error_msg = None
+            if not load_ids:
                 error_msg = f"Load with cart_id '{dt['load_cart_id']}' not found"
+            elif len(load_ids) > 1:
+                error_msg = f"Multiple loads found with cart_id '{dt['load_cart_id']}'"
+            elif not cart_id:
+                cart_id = unique_keys.next_value(caliber_code, 'D', dt['date_id'])
+            elif not unique_keys.claim(caliber_code, cart_id, dt['date_id']):
+                error_msg = f"Date with cart_id '{cart_id}' already exists in caliber {caliber_code}"
+            
+            if error_msg:
                 record_result['status'] = 'error'
                 record_result['errors'].append(error_msg)
                 failed += 1
@@ -1540,7 +1548,7 @@ def import_dates(cursor, dry_run):
                         'error': error_msg
                     })
                 
-                record_results.append(record_result)
+                engine.record(record_result)
                 continue
             
             # Get acquisition_note from col_date (no parsing, just use the string as-is)
@@ -1561,7 +1569,7 @@ def import_dates(cursor, dry_run):
             
             # Process note and extract sources
             note = dt['note'] or ''
-            clean_note, sources_info, source_warnings = extract_sources_from_note(note)
+            clean_note, sources_info, source_warnings = extract_sources(note)
             
             # Add any source warnings to the record
             for warning in source_warnings:
@@ -1588,46 +1596,27 @@ def import_dates(cursor, dry_run):
                 'sources_count': len(sources_info)
             }
             
-            # Process the date record
-            if not dry_run:
-                with transaction.atomic():
-                    # Create date with explicit ID to maintain the same record number
-                    date = Date.objects.create(
-                        id=dt['date_id'],
-                        cart_id=dt['cart_id'],
-                        year=dt['year'],
-                        lot_month=dt['lot_month'],
-                        load=load,
-                        cc=dt['cc'],
-                        acquisition_note=acquisition_note,
-                        price=price,
-                        note=clean_note,
-                        updated_at=timezone.now(),
-                        # Set image to None explicitly, as we're not importing images
-                        image=None
-                    )
-                    
-                    # Process source links
-                    new_sources, new_links, source_msgs = process_sources(
-                        date, 
-                        sources_info, 
-                        dry_run=False
-                    )
-                    
-                    sources_created += new_sources
-                    source_links_created += new_links
-                    record_result['sources'].extend(source_msgs)
-            else:
-                # Simulate source processing in dry run mode
-                new_sources, new_links, source_msgs = process_sources(
-                    None,  # No actual object in dry run
-                    sources_info, 
-                    dry_run=True
-                )
-                
-                sources_created += new_sources
-                source_links_created += new_links
-                record_result['sources'].extend(source_msgs)
+            # Queue the date with explicit ID to maintain the same record number
+            engine.add(
+                Date(
+                    id=dt['date_id'],
+                    legacy_id=str(dt['date_id']),
+                    cart_id=cart_id,
+                    year=dt['year'],
+                    lot_month=dt['lot_month'],
+                    load_id=load_ids[0],
+                    cc=dt['cc'],
+                    acquisition_note=acquisition_note,
+                    price=price,
+                    note=clean_note,
+                    updated_at=timezone.now(),
+                    # Set image to None explicitly, as we're not importing images
+                    image=None
+                ),
+                record_result,
+                sources_info,
+                row_hash=row_hash
+            )
             
             # Mark record as successful
             record_result['status'] = 'success'
@@ -1649,8 +1638,16 @@ def import_dates(cursor, dry_run):
                     'error': error_msg
                 })
         
-        record_results.append(record_result)
-    
+        engine.record(record_result)
+
+    # Write the remaining rows and source links, then reset the ID sequences
+    engine.finish()
+    late_failures = collect_engine_failures(engine, first_failures, 'cart_id')
+    success -= late_failures
+    failed += late_failures
+    sources_created = engine.sources_created
+    source_links_created = engine.source_links_created
+
     # Generate the import report using the utility function
     field_mapping_items = [
         ('date_id', 'id (preserved)'),
@@ -1673,40 +1670,37 @@ def import_dates(cursor, dry_run):
         warnings=warnings,
         sources_created=sources_created,
         source_links_created=source_links_created,
-        record_results=record_results,
+        record_results=engine.results,
         field_mapping_items=field_mapping_items,
         first_failures=first_failures,
         first_warnings=first_warnings,
-        dry_run=dry_run
+        dry_run=dry_run,
+        merge_stats=engine.merge_stats()
     )
 
-def import_variations(cursor, dry_run):
+def import_variations(cursor, dry_run, progress=None, import_mode='replace', note_sources=None, resolver=None,
+                      only_ids=None):
     """
     Import variation records from SQLite database
     Returns a dictionary with summary, stats, and detailed results
     """
     from django.utils import timezone
-    from django.db import transaction, IntegrityError
-    from ..models import Variation, Load, Date, Source, VariationSource
+    from ..models import Variation, VariationSource
     
-    # Clear existing data if not in dry run mode
-    if not dry_run:
+    merge = import_mode == 'merge'
+    extract_sources = note_sources.extract if note_sources else extract_sources_from_note
+    resolver = resolver or LegacyResolver()
+
+    # Clear existing data unless this is a dry run or a merge
+    if not dry_run and not merge:
         reset_table_and_sequence(Variation)
     
     # Get record count
     total_records = _get_table_count(cursor, "Variation")
     
-    # Get all variations with load and date info
-    cursor.execute("""
-        SELECT 
-            v.*,
-            l.cart_id as load_cart_id,
-            d.cart_id as date_cart_id
-        FROM Variation v
-        LEFT JOIN Load l ON v.load_id = l.load_id
-        LEFT JOIN Date d ON v.date_id = d.date_id
-    """)
-    variations = cursor.fetchall()
+    # Stream all variations with load and date info
+    cursor.execute(LEGACY_QUERIES['Variation'])
+    variations = iter_rows(cursor)
     
     # Initialize counters
     processed = 0
@@ -1720,11 +1714,24 @@ def import_variations(cursor, dry_run):
     first_failures = []
     first_warnings = []
     
-    # Results for detailed record processing
-    record_results = []
-    
+    # Preload loads and dates so each row is matched without a query
+    loads_by_cart_id = cart_id_index('load')
+    dates_by_cart_id = cart_id_index('date')
+    load_calibers = caliber_codes_by_pk('load')
+    date_calibers = caliber_codes_by_pk('date')
+
+    # Cart IDs must be unique within a caliber
+    unique_keys = UniqueKeys(existing_unique_keys('variation', 'cart_id') if merge else ())
+    engine = BulkImportEngine(
+        Variation, VariationSource, 'variation', dry_run=dry_run, merge=merge, only_ids=only_ids,
+        source_ids=note_sources.source_ids if note_sources else None,
+        fields=LEGACY_FIELDS['Variation'],
+    )
+
     # Process each variation
     for var in variations:
+        if progress:
+            progress(processed, success, failed)
         processed += 1
         record_result = {
             'id': var['var_id'],
@@ -1737,6 +1744,12 @@ def import_variations(cursor, dry_run):
         }
         
         try:
+            row_hash = legacy_row_hash(var)
+            if engine.is_unchanged(var['var_id'], row_hash):
+                record_result['status'] = 'unchanged'
+                engine.record(record_result)
+                continue
+
             # Check if we have either a load or a date, but not both
             if var['load_id'] and var['date_id']:
                 warning_msg = "Variation has both load_id and date_id set, according to the new schema it should have only one"
@@ -1752,13 +1765,16 @@ def import_variations(cursor, dry_run):
                     })
             
             # Find the load or date by cart_id
-            load = None
-            date = None
+            load_id = None
+            date_id = None
             
             if var['load_id']:
-                try:
-                    load = Load.objects.get(cart_id=var['load_cart_id'])
-                except Load.DoesNotExist:
+                load_ids = loads_by_cart_id.get(var['load_cart_id'], [])
+                if len(load_ids) > 1:
+                    raise ValueError(f"Multiple loads found with cart_id '{var['load_cart_id']}'")
+                if load_ids:
+                    load_id = load_ids[0]
+                else:
                     if var['date_id']:
                         # We'll try to use date instead
                         warning_msg = f"Load with cart_id '{var['load_cart_id']}' not found, trying to use date instead"
@@ -1786,13 +1802,16 @@ def import_variations(cursor, dry_run):
                                 'error': error_msg
                             })
                         
-                        record_results.append(record_result)
+                        engine.record(record_result)
                         continue
             
-            if var['date_id'] and not load:
-                try:
-                    date = Date.objects.get(cart_id=var['date_cart_id'])
-                except Date.DoesNotExist:
+            if var['date_id'] and not load_id:
+                date_ids = dates_by_cart_id.get(var['date_cart_id'], [])
+                if len(date_ids) > 1:
+                    raise ValueError(f"Multiple dates found with cart_id '{var['date_cart_id']}'")
+                if date_ids:
+                    date_id = date_ids[0]
+                else:
                     error_msg = f"Date with cart_id '{var['date_cart_id']}' not found"
                     record_result['status'] = 'error'
                     record_result['errors'].append(error_msg)
@@ -1806,12 +1825,23 @@ def import_variations(cursor, dry_run):
                             'error': error_msg
                         })
                     
-                    record_results.append(record_result)
+                    engine.record(record_result)
                     continue
             
             # Ensure we have either a load or a date
-            if not load and not date:
+            error_msg = None
+            if not load_id and not date_id:
                 error_msg = "Variation must have either a load or a date, but neither was found"
+            else:
+                # Validate cart_id uniqueness within the caliber, or assign the next free one
+                caliber_code = load_calibers.get(load_id) if load_id else date_calibers.get(date_id)
+                cart_id = var['cart_id']
+                if not cart_id:
+                    cart_id = unique_keys.next_value(caliber_code, 'V', var['var_id'])
+                elif caliber_code and not unique_keys.claim(caliber_code, cart_id, var['var_id']):
+                    error_msg = f"Variation with cart_id '{cart_id}' already exists in caliber {caliber_code}"
+            
+            if error_msg:
                 record_result['status'] = 'error'
                 record_result['errors'].append(error_msg)
                 failed += 1
@@ -1824,7 +1854,7 @@ def import_variations(cursor, dry_run):
                         'error': error_msg
                     })
                 
-                record_results.append(record_result)
+                engine.record(record_result)
                 continue
             
             # Get acquisition_note from col_date (no parsing, just use the string as-is)
@@ -1845,7 +1875,7 @@ def import_variations(cursor, dry_run):
             
             # Process note and extract sources
             note = var['note'] or ''
-            clean_note, sources_info, source_warnings = extract_sources_from_note(note)
+            clean_note, sources_info, source_warnings = extract_sources(note)
             
             # Add any source warnings to the record
             for warning in source_warnings:
@@ -1862,8 +1892,8 @@ def import_variations(cursor, dry_run):
             
             # Store details in record result
             record_result['details'] = {
-                'parent_type': 'Load' if load else 'Date',
-                'parent_id': var['load_cart_id'] if load else var['date_cart_id'],
+                'parent_type': 'Load' if load_id else 'Date',
+                'parent_id': var['load_cart_id'] if load_id else var['date_cart_id'],
                 'description': var['description'],
                 'acquisition_note': acquisition_note,
                 'price': price,
@@ -1872,46 +1902,27 @@ def import_variations(cursor, dry_run):
                 'sources_count': len(sources_info)
             }
             
-            # Process the variation record
-            if not dry_run:
-                with transaction.atomic():
-                    # Create variation with explicit ID to maintain the same record number
-                    variation = Variation.objects.create(
-                        id=var['var_id'],
-                        cart_id=var['cart_id'],
-                        load=load,
-                        date=date,
-                        description=var['description'],
-                        cc=var['cc'],
-                        acquisition_note=acquisition_note,
-                        price=price,
-                        note=clean_note,
-                        updated_at=timezone.now(),
-                        # Set image to None explicitly, as we're not importing images
-                        image=None
-                    )
-                    
-                    # Process source links
-                    new_sources, new_links, source_msgs = process_sources(
-                        variation, 
-                        sources_info, 
-                        dry_run=False
-                    )
-                    
-                    sources_created += new_sources
-                    source_links_created += new_links
-                    record_result['sources'].extend(source_msgs)
-            else:
-                # Simulate source processing in dry run mode
-                new_sources, new_links, source_msgs = process_sources(
-                    None,  # No actual object in dry run
-                    sources_info, 
-                    dry_run=True
-                )
-                
-                sources_created += new_sources
-                source_links_created += new_links
-                record_result['sources'].extend(source_msgs)
+            # Queue the variation with explicit ID to maintain the same record number
+            engine.add(
+                Variation(
+                    id=var['var_id'],
+                    legacy_id=str(var['var_id']),
+                    cart_id=cart_id,
+                    load_id=load_id,
+                    date_id=date_id,
+                    description=var['description'],
+                    cc=var['cc'],
+                    acquisition_note=acquisition_note,
+                    price=price,
+                    note=clean_note,
+                    updated_at=timezone.now(),
+                    # Set image to None explicitly, as we're not importing images
+                    image=None
+                ),
+                record_result,
+                sources_info,
+                row_hash=row_hash
+            )
             
             # Mark record as successful
             record_result['status'] = 'success'
@@ -1933,8 +1944,16 @@ def import_variations(cursor, dry_run):
                     'error': error_msg
                 })
         
-        record_results.append(record_result)
-    
+        engine.record(record_result)
+
+    # Write the remaining rows and source links, then reset the ID sequences
+    engine.finish()
+    late_failures = collect_engine_failures(engine, first_failures, 'cart_id')
+    success -= late_failures
+    failed += late_failures
+    sources_created = engine.sources_created
+    source_links_created = engine.source_links_created
+
     # Generate the import report using the utility function
     field_mapping_items = [
         ('var_id', 'id (preserved)'),
@@ -1958,35 +1977,38 @@ def import_variations(cursor, dry_run):
         warnings=warnings,
         sources_created=sources_created,
         source_links_created=source_links_created,
-        record_results=record_results,
+        record_results=engine.results,
         field_mapping_items=field_mapping_items,
         first_failures=first_failures,
         first_warnings=first_warnings,
-        dry_run=dry_run
+        dry_run=dry_run,
+        merge_stats=engine.merge_stats()
     )
 
-def import_boxes(cursor, dry_run):
+def import_boxes(cursor, dry_run, progress=None, import_mode='replace', note_sources=None, resolver=None,
+                 only_ids=None):
     """
     Import box records from SQLite database
     Returns a dictionary with summary, stats, and detailed results
     """
     from django.utils import timezone
-    from django.db import transaction, IntegrityError
     from django.contrib.contenttypes.models import ContentType
-    from ..models import Box, Country, Manufacturer, Headstamp, Load, Date, Variation, Source, BoxSource
+    from ..models import Box, Country, Manufacturer, Headstamp, Load, Date, Variation, BoxSource
     
-    # Clear existing data if not in dry run mode
-    if not dry_run:
+    merge = import_mode == 'merge'
+    extract_sources = note_sources.extract if note_sources else extract_sources_from_note
+    resolver = resolver or LegacyResolver()
+
+    # Clear existing data unless this is a dry run or a merge
+    if not dry_run and not merge:
         reset_table_and_sequence(Box)
     
     # Get record count
     total_records = _get_table_count(cursor, "Box")
     
-    # Get all boxes
-    cursor.execute("""
-        SELECT * FROM Box
-    """)
-    boxes = cursor.fetchall()
+    # Stream all boxes
+    cursor.execute(LEGACY_QUERIES['Box'])
+    boxes = iter_rows(cursor)
     
     # Initialize counters
     processed = 0
@@ -2000,9 +2022,6 @@ def import_boxes(cursor, dry_run):
     first_failures = []
     first_warnings = []
     
-    # Results for detailed record processing
-    record_results = []
-    
     # Get ContentType objects for all potential parent models
     content_types = {
         'country': ContentType.objects.get_for_model(Country),
@@ -2015,8 +2034,32 @@ def import_boxes(cursor, dry_run):
         'box': None  # We won't import boxes with box parents
     }
     
+    # Caliber of every possible parent, which also tells whether the parent exists
+    parent_models = {
+        'country': 'country',
+        'manuf': 'manufacturer',
+        'headstamp': 'headstamp',
+        'hst': 'headstamp',
+        'load': 'load',
+        'date': 'date',
+        'var': 'variation',
+    }
+    parent_calibers = {
+        model_name: caliber_codes_by_pk(model_name) for model_name in set(parent_models.values())
+    }
+    
+    # Box IDs must be unique within a caliber
+    unique_keys = UniqueKeys(existing_box_ids(content_types, parent_calibers) if merge else ())
+    engine = BulkImportEngine(
+        Box, BoxSource, 'box', dry_run=dry_run, merge=merge, only_ids=only_ids,
+        source_ids=note_sources.source_ids if note_sources else None,
+        fields=LEGACY_FIELDS['Box'],
+    )
+    
     # Process each box
     for box in boxes:
+        if progress:
+            progress(processed, success, failed)
         processed += 1
         record_result = {
             'id': box['box_id'],
@@ -2029,6 +2072,12 @@ def import_boxes(cursor, dry_run):
         }
         
         try:
+            row_hash = legacy_row_hash(box)
+            if engine.is_unchanged(box['box_id'], row_hash):
+                record_result['status'] = 'unchanged'
+                engine.record(record_result)
+                continue
+
             # Map the old sup_type to the appropriate model/ContentType
             parent_obj = None
             content_type = None
@@ -2057,7 +2106,7 @@ def import_boxes(cursor, dry_run):
                         'error': error_msg
                     })
                 
-                record_results.append(record_result)
+                engine.record(record_result)
                 continue
             
             # Improved check for missing parent type or ID
@@ -2076,7 +2125,7 @@ def import_boxes(cursor, dry_run):
                         'error': error_msg
                     })
                 
-                record_results.append(record_result)
+                engine.record(record_result)
                 continue
             else:
                 # Normalize sup_type to handle potential case variations
@@ -2097,7 +2146,7 @@ def import_boxes(cursor, dry_run):
                             'error': error_msg
                         })
                     
-                    record_results.append(record_result)
+                    engine.record(record_result)
                     continue
                 
                 # Check if the sup_type is in our content_types dictionary
@@ -2122,24 +2171,19 @@ def import_boxes(cursor, dry_run):
                 # Get the content type
                 content_type = content_types[sup_type]
                 
-                # Find the parent object using the appropriate model
-                try:
-                    if sup_type == 'country':
-                        parent_obj = Country.objects.get(pk=parent_id)
-                    elif sup_type == 'manuf':
-                        parent_obj = Manufacturer.objects.get(pk=parent_id)
-                    elif sup_type in ['headstamp', 'hst']:
-                        parent_obj = Headstamp.objects.get(pk=parent_id)
-                    elif sup_type == 'load':
-                        parent_obj = Load.objects.get(pk=parent_id)
-                    elif sup_type == 'date':
-                        parent_obj = Date.objects.get(pk=parent_id)
-                    elif sup_type == 'var':
-                        parent_obj = Variation.objects.get(pk=parent_id)
-                except (Country.DoesNotExist, Manufacturer.DoesNotExist, 
-                        Headstamp.DoesNotExist, Load.DoesNotExist,
-                        Date.DoesNotExist, Variation.DoesNotExist) as e:
+                # Find the parent's caliber, validate the bid within it, or assign the next free one
+                calibers = parent_calibers[parent_models[sup_type]]
+                caliber_code = calibers.get(parent_id)
+                bid = box['bid']
+                error_msg = None
+                if parent_id not in calibers:
                     error_msg = f"{sup_type.capitalize()} with ID {parent_id} not found"
+                elif not bid:
+                    bid = unique_keys.next_value(caliber_code, 'B', box['box_id'])
+                elif caliber_code and not unique_keys.claim(caliber_code, bid, box['box_id']):
+                    error_msg = f"Box with bid '{bid}' already exists in caliber {caliber_code}"
+                
+                if error_msg:
                     record_result['status'] = 'error'
                     record_result['errors'].append(error_msg)
                     failed += 1
@@ -2152,7 +2196,7 @@ def import_boxes(cursor, dry_run):
                             'error': error_msg
                         })
                     
-                    record_results.append(record_result)
+                    engine.record(record_result)
                     continue
             
             # Map artifact type
@@ -2185,7 +2229,7 @@ def import_boxes(cursor, dry_run):
             
             # Process note and extract sources
             note = box['note'] or ''
-            clean_note, sources_info, source_warnings = extract_sources_from_note(note)
+            clean_note, sources_info, source_warnings = extract_sources(note)
             
             # Add any source warnings to the record
             for warning in source_warnings:
@@ -2215,60 +2259,30 @@ def import_boxes(cursor, dry_run):
                 'sources_count': len(sources_info)
             }
             
-            # Process the box record
-            if not dry_run:
-                with transaction.atomic():
-                    # Make sure we have both content_type and object_id or neither
-                    if not (content_type and parent_obj):
-                        # This should not happen now that we're skipping orphaned boxes,
-                        # but keeping as an extra safeguard
-                        error_msg = "Cannot create box without both content_type and object_id"
-                        record_result['status'] = 'error'
-                        record_result['errors'].append(error_msg)
-                        failed += 1
-                        record_results.append(record_result)
-                        continue
-                        
-                    # Create box with explicit ID to maintain the same record number
-                    box_obj = Box.objects.create(
-                        id=box['box_id'],
-                        bid=box['bid'],
-                        location=box['location'],
-                        description=box['description'],
-                        art_type=artifact_type,
-                        art_type_other=artifact_type_other,
-                        cc=box['cc'],
-                        acquisition_note=acquisition_note,
-                        price=price,
-                        note=clean_note,
-                        content_type=content_type,
-                        object_id=parent_obj.id,  # Using the original ID from parent, which is now preserved
-                        updated_at=timezone.now(),
-                        # Set image to None explicitly, as we're not importing images
-                        image=None
-                    )
-                    
-                    # Process source links
-                    new_sources, new_links, source_msgs = process_sources(
-                        box_obj, 
-                        sources_info, 
-                        dry_run=False
-                    )
-                    
-                    sources_created += new_sources
-                    source_links_created += new_links
-                    record_result['sources'].extend(source_msgs)
-            else:
-                # Simulate source processing in dry run mode
-                new_sources, new_links, source_msgs = process_sources(
-                    None,  # No actual object in dry run
-                    sources_info, 
-                    dry_run=True
-                )
-                
-                sources_created += new_sources
-                source_links_created += new_links
-                record_result['sources'].extend(source_msgs)
+            # Queue the box with explicit ID to maintain the same record number
+            engine.add(
+                Box(
+                    id=box['box_id'],
+                    legacy_id=str(box['box_id']),
+                    bid=bid,
+                    location=box['location'],
+                    description=box['description'],
+                    art_type=artifact_type,
+                    art_type_other=artifact_type_other,
+                    cc=box['cc'],
+                    acquisition_note=acquisition_note,
+                    price=price,
+                    note=clean_note,
+                    content_type=content_type,
+                    object_id=parent_id,  # Using the original ID from parent, which is now preserved
+                    updated_at=timezone.now(),
+                    # Set image to None explicitly, as we're not importing images
+                    image=None
+                ),
+                record_result,
+                sources_info,
+                row_hash=row_hash
+            )
             
             # Mark record as successful
             record_result['status'] = 'success'
@@ -2290,8 +2304,16 @@ def import_boxes(cursor, dry_run):
                     'error': error_msg
                 })
         
-        record_results.append(record_result)
-    
+        engine.record(record_result)
+
+    # Write the remaining rows and source links, then reset the ID sequences
+    engine.finish()
+    late_failures = collect_engine_failures(engine, first_failures, 'bid')
+    success -= late_failures
+    failed += late_failures
+    sources_created = engine.sources_created
+    source_links_created = engine.source_links_created
+
     # Generate the import report using the utility function
     field_mapping_items = [
         ('box_id', 'id (preserved)'),
@@ -2316,13 +2338,424 @@ def import_boxes(cursor, dry_run):
         warnings=warnings,
         sources_created=sources_created,
         source_links_created=source_links_created,
-        record_results=record_results,
+        record_results=engine.results,
         field_mapping_items=field_mapping_items,
         first_failures=first_failures,
         first_warnings=first_warnings,
-        dry_run=dry_run
+        dry_run=dry_run,
+        merge_stats=engine.merge_stats()
     )
 
+# Legacy table name -> importer function
+IMPORTERS = {
+    'Country': import_countries,
+    'Manuf': import_manufacturers,
+    'Headstamp': import_headstamps,
+    'Load': import_loads,
+    'Date': import_dates,
+    'Variation': import_variations,
+    'Box': import_boxes,
+}
+
+# Minimum seconds between progress writes from a running import job
+PROGRESS_INTERVAL = 1.0
+
+# Legacy tables each table's records refer to; the pipeline imports those first
+TABLE_DEPENDENCIES = {
+    'Country': set(),
+    'Manuf': {'Country'},
+    'Headstamp': {'Manuf'},
+    'Load': {'Headstamp'},
+    'Date': {'Load'},
+    'Variation': {'Load', 'Date'},
+    'Box': {'Country', 'Manuf', 'Headstamp', 'Load', 'Date', 'Variation'},
+}
+
+# Model each legacy table is imported into
+TABLE_MODELS = {
+    'Country': 'country',
+    'Manuf': 'manufacturer',
+    'Headstamp': 'headstamp',
+    'Load': 'load',
+    'Date': 'date',
+    'Variation': 'variation',
+    'Box': 'box',
+}
+
+# ImportJob.table_name of a job that runs the whole pipeline
+ALL_TABLES = 'All'
+
+# Threads parsing the notes of upcoming tables while a stage writes
+PIPELINE_WORKERS = 2
+
+
+# ===============================
+# Import Pipeline
+# ===============================
+
+def pipeline_order(tables=None):
+    """
+    Legacy tables in dependency order.
+    
+    Args:
+        tables (iterable, optional): Tables to include (default: all supported tables)
+        
+    Returns:
+        list: Table names, each after the tables it depends on
+    """
+    selected = set(tables or IMPORTERS)
+    sorter = graphlib.TopologicalSorter(TABLE_DEPENDENCIES)
+    return [table for table in sorter.static_order() if table in selected]
+
+
+def run_import_pipeline(db_path, dry_run, import_mode='replace', tables=None, progress=None, resolver=None,
+                        only_ids=None):
+    """
+    Import every legacy table in dependency order from one connection.
+    
+    Each stage writes in bulk batches as the single-table import does. In
+    replace mode the selected tables are cleared up front in reverse order, so
+    no stage trips over records that still refer to the table it empties.
+    When a stage fails, the stages depending on it are skipped. A dry run
+    validates every stage as the single-table dry run does: nothing is cleared
+    or written, so records resolve against what is already in the database and
+    other requests and the job worker are never locked out.
+    
+    Args:
+        db_path (str): Path of the legacy SQLite file
+        dry_run (bool): Validate and count only; nothing is written
+        import_mode (str): 'replace' or 'merge'
+        tables (iterable, optional): Tables to import (default: all)
+        progress (callable, optional): Called with cumulative (processed, success, failed)
+        resolver (LegacyResolver, optional): Shared lookup indexes, refreshed as tables are written
+        only_ids (dict, optional): {table: IDs} of a diff change set; a merge then applies only those
+        
+    Returns:
+        list: One dict per table with 'table', 'results', 'error', 'seconds' and 'queries'
+    """
+    from django.apps import apps
+    
+    order = pipeline_order(tables)
+    note_sources = NoteSourceCache()
+    resolver = resolver or LegacyResolver()
+    stages = []
+    failed_tables = set()
+    done = {'processed': 0, 'success': 0, 'failed': 0}
+    
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        available = {row[0] for row in cursor.fetchall()}
+        
+        # Parse notes ahead of the stages that will need them
+        for table in order:
+            if table in available:
+                executor.submit(note_sources.prefetch, db_path, table)
+        
+        if not dry_run and import_mode != 'merge':
+            for table in reversed(order):
+                if table in available:
+                    reset_table_and_sequence(apps.get_model('collection', TABLE_MODELS[table]))
+        
+        for table in order:
+            stage = {'table': table, 'results': None, 'error': None, 'seconds': 0.0, 'queries': 0}
+            stages.append(stage)
+            
+            blocked = TABLE_DEPENDENCIES[table] & failed_tables
+            if blocked:
+                stage['error'] = f"Skipped because {', '.join(sorted(blocked))} failed"
+                failed_tables.add(table)
+                continue
+            if table not in available:
+                stage['error'] = "Table not found in the legacy database"
+                continue
+            
+            def stage_progress(processed, success, failed):
+                if progress:
+                    progress(done['processed'] + processed, done['success'] + success,
+                             done['failed'] + failed)
+            
+            started = time.monotonic()
+            queries = QueryCounter()
+            try:
+                with connection.execute_wrapper(queries):
+                    stage['results'] = IMPORTERS[table](
+                        conn.cursor(), dry_run, progress=stage_progress,
+                        import_mode=import_mode, note_sources=note_sources, resolver=resolver,
+                        only_ids=None if only_ids is None else only_ids.get(table, set()),
+                    )
+            except Exception as e:
+                stage['error'] = f"Error: {str(e)}"
+                failed_tables.add(table)
+                # Sources the failed stage created may have been rolled back with its batch
+                note_sources.source_ids.clear()
+                continue
+            finally:
+                stage['seconds'] = round(time.monotonic() - started, 3)
+                stage['queries'] = queries.count
+                # Later stages resolve against the rows this stage wrote
+                if not dry_run:
+                    resolver.refresh(TABLE_MODELS[table])
+            
+            for key in done:
+                done[key] += stage['results']['stats'][key]
+    finally:
+        executor.shutdown(cancel_futures=True)
+        conn.close()
+    
+    return stages
+
+
+def combine_pipeline_results(stages, dry_run):
+    """
+    Merge the reports of a pipeline run into the shape returned by a single importer.
+    
+    Returns:
+        dict: summary, web_summary, details, stats, first_failures and first_warnings
+    """
+    summary = "PIPELINE SUMMARY\n" + "-" * 40 + "\n"
+    if dry_run:
+        summary += "Nothing was written; each stage was checked against the records already in the database.\n"
+    stats = {}
+    first_failures = []
+    first_warnings = []
+    
+    for stage in stages:
+        results = stage['results']
+        if results is None:
+            summary += f"{stage['table']}: {stage['error']}\n"
+            continue
+        stage_stats = results['stats']
+        summary += (f"{stage['table']}: {stage_stats['processed']} processed, {stage_stats['success']} successful, "
+                    f"{stage_stats['failed']} failed, {stage_stats['warnings']} warnings ({stage['seconds']}s)\n")
+        for key, value in stage_stats.items():
+            stats[key] = stats.get(key, 0) + value
+        for failure in results['first_failures']:
+            if len(first_failures) < 2:
+                first_failures.append({**failure, 'table': stage['table']})
+        for warning in results['first_warnings']:
+            if len(first_warnings) < 2:
+                first_warnings.append({**warning, 'table': stage['table']})
+    summary += "\n"
+    
+    completed = [stage for stage in stages if stage['results'] is not None]
+    return {
+        'summary': summary + "".join(stage['results']['summary'] for stage in completed),
+        'web_summary': summary + "".join(stage['results']['web_summary'] + "\n" for stage in completed),
+        'details': itertools.chain.from_iterable(stage['results']['details'] for stage in completed),
+        'stats': stats,
+        'first_failures': first_failures,
+        'first_warnings': first_warnings,
+    }
+
+
+# ===============================
+# Import Diff
+# ===============================
+
+def _diff_note(row):
+    return extract_sources_from_note(row['note'] or '')[0]
+
+
+def _diff_price(row):
+    return parse_price(row['price'])[0]
+
+
+def _diff_acquisition_note(row):
+    return row['col_date'] or ""
+
+
+def _diff_cart_id(row):
+    # A blank legacy cart_id keeps the one generated when the record was imported
+    return row['cart_id'] or KEEP
+
+
+def _diff_bid(row):
+    return row['bid'] or KEEP
+
+
+# Model field -> legacy column (or function of the legacy row) compared by the diff,
+# transformed the way the importer stores them
+DIFF_FIELDS = {
+    'Country': {'name': 'name', 'full_name': 'full_name', 'note': _diff_note},
+    'Manuf': {'code': 'code', 'name': 'name', 'note': _diff_note},
+    'Headstamp': {'code': 'code', 'name': 'name', 'cc': 'cc', 'note': _diff_note},
+    'Load': {
+        'cart_id': _diff_cart_id, 'description': 'description', 'cc': 'cc',
+        'acquisition_note': _diff_acquisition_note, 'price': _diff_price, 'note': _diff_note,
+    },
+    'Date': {
+        'cart_id': _diff_cart_id, 'year': 'year', 'lot_month': 'lot_month', 'cc': 'cc',
+        'acquisition_note': _diff_acquisition_note, 'price': _diff_price, 'note': _diff_note,
+    },
+    'Variation': {
+        'cart_id': _diff_cart_id, 'description': 'description', 'cc': 'cc',
+        'acquisition_note': _diff_acquisition_note, 'price': _diff_price, 'note': _diff_note,
+    },
+    'Box': {
+        'bid': _diff_bid, 'location': 'location', 'description': 'description', 'cc': 'cc',
+        'acquisition_note': _diff_acquisition_note, 'price': _diff_price, 'note': _diff_note,
+    },
+}
+
+# Legacy ID column of each table
+LEGACY_ID_COLUMNS = {
+    'Country': 'country_id',
+    'Manuf': 'manuf_id',
+    'Headstamp': 'headstamp_id',
+    'Load': 'load_id',
+    'Date': 'date_id',
+    'Variation': 'var_id',
+    'Box': 'box_id',
+}
+
+
+def diff_legacy_database(db_path, output_path, tables=None):
+    """
+    Compare a legacy database with the current records without importing it.
+    
+    Writes the JSONL change set of every table (see utils.import_diff) to
+    output_path. The change set can be applied with a merge import limited to
+    its IDs (import_legacy_database --changes).
+    
+    Args:
+        db_path (str): Path of the legacy SQLite file
+        output_path (str): Change-set file to write (gzipped when it ends in .gz)
+        tables (iterable, optional): Tables to compare (default: all)
+        
+    Returns:
+        dict: {table: counts}, counts None for tables missing from the legacy database
+    """
+    from django.apps import apps
+    
+    summary = {}
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        available = {row[0] for row in cursor.fetchall()}
+        
+        with open_change_set(output_path, 'wt') as out:
+            for table in pipeline_order(tables):
+                if table not in available:
+                    summary[table] = None
+                    continue
+                spec = {
+                    'model': apps.get_model('collection', TABLE_MODELS[table]),
+                    'query': LEGACY_QUERIES[table],
+                    'id_column': LEGACY_ID_COLUMNS[table],
+                    'fields': DIFF_FIELDS[table],
+                }
+                summary[table] = diff_table(cursor, table, spec, out)
+    finally:
+        conn.close()
+    
+    return summary
+
+
+def run_import_job(job):
+    """
+    Run a queued ImportJob to completion. Called by the run_import_jobs worker.
+    Progress counters and the heartbeat are written to the job at most once per
+    PROGRESS_INTERVAL so the import page can poll them.
+    
+    Args:
+        job (ImportJob): A job already marked as running
+    """
+    from django.utils import timezone
+    
+    options = job.options or {}
+    dry_run = options.get('dry_run', True)
+    import_mode = options.get('import_mode', 'replace')
+    import_images = options.get('import_images', False)
+    
+    if not default_storage.exists(job.file_path):
+        raise FileNotFoundError("The uploaded database has expired. Please upload it again.")
+    
+    db_path = default_storage.path(job.file_path)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row  # Use row factory for named columns
+    try:
+        cursor = conn.cursor()
+        
+        if job.table_name == ALL_TABLES:
+            job.total = sum(_get_table_count(cursor, table) for table in pipeline_order())
+        else:
+            job.total = _get_table_count(cursor, job.table_name)
+        job.heartbeat_at = timezone.now()
+        job.save(update_fields=['total', 'heartbeat_at'])
+        
+        last_write = time.monotonic()
+        
+        def progress(processed, success, failed):
+            nonlocal last_write
+            now = time.monotonic()
+            if now - last_write < PROGRESS_INTERVAL:
+                return
+            last_write = now
+            ImportJob.objects.filter(pk=job.pk).update(
+                processed=processed, success=success, failed=failed, heartbeat_at=timezone.now()
+            )
+        
+        if job.table_name == ALL_TABLES:
+            stages = run_import_pipeline(db_path, dry_run, import_mode=import_mode, progress=progress)
+            import_results = combine_pipeline_results(stages, dry_run)
+        else:
+            import_results = IMPORTERS[job.table_name](cursor, dry_run, progress=progress, import_mode=import_mode)
+    finally:
+        conn.close()
+    
+    # Prepare the report header
+    results = "IMPORT ANALYSIS REPORT\n"
+    results += "=" * 50 + "\n\n"
+    results += f"Database: {job.file_name}\n"
+    results += f"Table: {job.table_name}\n"
+    results += f"Mode: {'Dry Run (no changes made)' if dry_run else 'Actual Import'}\n"
+    results += f"Import Type: {import_mode.capitalize()}\n"
+    results += f"Import Images: {'No - images are not imported' if not import_images else 'Yes'}\n\n"
+    
+    stats = import_results['stats']
+    job.processed = stats['processed']
+    job.success = stats['success']
+    job.failed = stats['failed']
+    job.result = {
+        'results': import_results['web_summary'],
+        'stats': stats,
+        'first_failures': import_results.get('first_failures', []),
+        'first_warnings': import_results.get('first_warnings', []),
+    }
+    
+    # Stream the report to a gzipped file; the record details are read back from the importer's spool file
+    job.report_file = write_report(job.id, itertools.chain(
+        [results, import_results['summary']], import_results['details']
+    ))
+    
+    job.status = ImportJob.STATUS_COMPLETED
+    job.finished_at = timezone.now()
+    job.heartbeat_at = job.finished_at
+    job.save()
+
+
+def visible_import_jobs(user):
+    """Import jobs a user may follow and download: every job for staff, otherwise their own"""
+    jobs = ImportJob.objects.all()
+    if not user.is_staff:
+        jobs = jobs.filter(created_by=user)
+    return jobs
+
+
+@login_required
+@permission_required('collection.change_headstamp', raise_exception=True)
+def import_job_progress(request, caliber_code, job_id):
+    """JSON progress of an import job, polled by the import page"""
+    job = get_object_or_404(visible_import_jobs(request.user), pk=job_id, caliber__code=caliber_code)
+    return JsonResponse(job.progress_data())
+
+
 @login_required
 @permission_required('collection.change_headstamp', raise_exception=True)
 def import_records(request, caliber_code):
@@ -2334,8 +2767,8 @@ def import_records(request, caliber_code):
         'caliber': caliber,
         'all_calibers': all_calibers,
         'title': 'Import Records',
-        'import_mode': 'replace',  # Forcing 'replace' mode as the only option
-        'disable_merge_option': True,  # Flag to disable the merge option in the UI
+        'import_mode': 'replace',
+        'all_tables': ALL_TABLES,
     }
     
     # Define Django system tables that shouldn't be imported
@@ -2360,12 +2793,12 @@ def import_records(request, caliber_code):
                 messages.error(request, "Please select a database file to import")
                 return render(request, 'collection/import_records.html', context)
             
-            # Generate a unique session ID for this import
+            # Generate a unique ID for this upload
             session_id = str(uuid.uuid4())
             
             try:
                 # Save the uploaded file temporarily
-                temp_path = os.path.join('temp_imports', f"{session_id}_{database_file.name}")
+                temp_path = os.path.join(UPLOAD_DIR, f"{session_id}_{database_file.name}")
                 path = default_storage.save(temp_path, ContentFile(database_file.read()))
                 full_path = default_storage.path(path)
                 
@@ -2401,13 +2834,15 @@ def import_records(request, caliber_code):
                         'supported': is_supported
                     })
                 
-                # Store the database info in session
-                request.session[f'database_info_{session_id}'] = {
-                    'file_path': path,
-                    'full_path': full_path,
-                    'file_name': database_file.name,
-                    'tables': tables
-                }
+                # Store the database info for the import step; expired uploads are removed by expire_imports
+                ImportUpload.objects.create(
+                    id=session_id,
+                    caliber=caliber,
+                    uploaded_by=request.user,
+                    file_name=database_file.name,
+                    file_path=path,
+                    tables=tables,
+                )
                 
                 # Update context for template
                 importable_tables = [t for t in tables if not t['django_table']]
@@ -2437,16 +2872,25 @@ def import_records(request, caliber_code):
         elif action == 'import':
             session_id = request.POST.get('session_id')
             
-            if not session_id or f'database_info_{session_id}' not in request.session:
+            # Get stored database info
+            try:
+                upload = ImportUpload.objects.get(pk=session_id, caliber=caliber)
+            except (ImportUpload.DoesNotExist, ValidationError):
+                upload = None
+            if not upload or not default_storage.exists(upload.file_path):
                 messages.error(request, "Database information not found. Please upload the database again.")
                 return render(request, 'collection/import_records.html', context)
-            
-            # Get stored database info
-            db_info = request.session[f'database_info_{session_id}']
+            db_info = {
+                'file_name': upload.file_name,
+                'file_path': upload.file_path,
+                'tables': upload.tables,
+            }
             
             # Get import options
             selected_table = request.POST.get('selected_table')
             import_mode = request.POST.get('import_mode', 'replace')  # Default to replace
+            if import_mode not in ('replace', 'merge'):
+                import_mode = 'replace'
             import_images = request.POST.get('import_images') == 'yes'
             dry_run = request.POST.get('dry_run') == 'yes'
             
@@ -2467,7 +2911,7 @@ def import_records(request, caliber_code):
                 return render(request, 'collection/import_records.html', context)
             
             # Check if the selected table is supported
-            if selected_table not in supported_tables:
+            if selected_table not in supported_tables and selected_table != ALL_TABLES:
                 messages.error(request, f"The selected table '{selected_table}' is not currently supported for import.")
                 
                 # Re-populate the examination context
@@ -2483,135 +2927,74 @@ def import_records(request, caliber_code):
                 })
                 return render(request, 'collection/import_records.html', context)
             
-            try:
-                # Connect to the database
-                conn = sqlite3.connect(db_info['full_path'])
-                conn.row_factory = sqlite3.Row  # Use row factory for named columns
-                cursor = conn.cursor()
-                
-                # Prepare results
-                results = "IMPORT ANALYSIS REPORT\n"
-                results += "=" * 50 + "\n\n"
-                results += f"Database: {db_info['file_name']}\n"
-                results += f"Table: {selected_table}\n"
-                results += f"Mode: {'Dry Run (no changes made)' if dry_run else 'Actual Import'}\n"
-                results += f"Import Type: {import_mode.capitalize()}\n"
-                results += f"Import Images: {'No - images are not imported' if not import_images else 'Yes'}\n\n"
-                
-                # Import the selected table
-                import_results = None
-                
-                if selected_table == "Country":
-                    import_results = import_countries(cursor, dry_run)
-                elif selected_table == "Manuf":
-                    import_results = import_manufacturers(cursor, dry_run)
-                elif selected_table == "Headstamp":
-                    import_results = import_headstamps(cursor, dry_run)
-                elif selected_table == "Load":
-                    import_results = import_loads(cursor, dry_run)
-                elif selected_table == "Date":
-                    import_results = import_dates(cursor, dry_run)
-                elif selected_table == "Variation":
-                    import_results = import_variations(cursor, dry_run)
-                elif selected_table == "Box":
-                    import_results = import_boxes(cursor, dry_run)
-                
-                if import_results:
-                    # For web display: use the web_summary
-                    web_display = import_results['web_summary']
-                    
-                    # For downloadable report: use the complete report
-                    complete_report = results + import_results['complete_report']
-                    
-                    # Store the results
-                    request.session[f'import_results_{session_id}'] = {
-                        'results': web_display,             # For display in the UI
-                        'complete_results': complete_report,  # For downloadable report
-                        'dry_run': dry_run,
-                        'file_name': db_info['file_name'],
-                        'selected_table': selected_table,
-                        'import_mode': import_mode,
-                        'import_images': import_images,
-                        'stats': import_results['stats'],
-                        'first_failures': import_results.get('first_failures', []),
-                        'first_warnings': import_results.get('first_warnings', [])
-                    }
-                    
-                    # Add results to context
-                    context.update({
-                        'results': web_display,
-                        'complete_results': complete_report,
-                        'dry_run': dry_run,
-                        'session_id': session_id,
-                        'selected_table': selected_table,
-                        'import_mode': import_mode,
-                        'import_images': 'yes' if import_images else 'no',
-                        'stats': import_results['stats'],
-                        'first_failures': import_results.get('first_failures', []),
-                        'first_warnings': import_results.get('first_warnings', [])
-                    })
-                    
-                    # Show appropriate message
-                    if dry_run:
-                        messages.info(request, "Dry run completed successfully. You can review the results before running the actual import.")
-                    else:
-                        messages.success(request, "Import completed successfully.")
-                else:
-                    messages.warning(request, f"No implementation found to import table '{selected_table}'.")
-                
-                # Close connection
-                conn.close()
-                
-            except sqlite3.Error as e:
-                messages.error(request, f"SQLite error: {str(e)}")
-                # Re-populate context for the form
-                context.update({
-                    'database_examined': True,
-                    'database_name': db_info['file_name'],
-                    'tables': db_info['tables'],
-                    'table_count': len(db_info['tables']),
-                    'importable_table_count': len([t for t in db_info['tables'] if not t.get('django_table')]),
-                    'supported_importable_count': len([t for t in db_info['tables'] if not t.get('django_table') and t.get('supported')]),
-                    'session_id': session_id,
-                    'supported_tables': supported_tables
-                })
-            except Exception as e:
-                messages.error(request, f"Error processing import: {str(e)}")
-                # Re-populate context for the form
-                context.update({
-                    'database_examined': True,
-                    'database_name': db_info['file_name'],
-                    'tables': db_info['tables'],
-                    'table_count': len(db_info['tables']),
-                    'importable_table_count': len([t for t in db_info['tables'] if not t.get('django_table')]),
-                    'supported_importable_count': len([t for t in db_info['tables'] if not t.get('django_table') and t.get('supported')]),
+            # Queue the import; the run_import_jobs worker runs it outside this request
+            job = ImportJob.objects.create(
+                caliber=caliber,
+                created_by=request.user,
+                upload=upload,
+                table_name=selected_table,
+                file_name=db_info['file_name'],
+                file_path=db_info['file_path'],
+                options={
                     'session_id': session_id,
-                    'supported_tables': supported_tables
-                })
+                    'dry_run': dry_run,
+                    'import_mode': import_mode,
+                    'import_images': import_images,
+                },
+            )
+            return redirect(f"{reverse('import_records', args=[caliber.code])}?job={job.id}")
+    
+    # Show the progress or results of a queued import
+    elif request.GET.get('job', '').isdigit():
+        job = visible_import_jobs(request.user).filter(pk=request.GET.get('job'), caliber=caliber).first()
+        if not job:
+            messages.error(request, "Import job not found.")
+        elif not job.is_finished:
+            context.update({
+                'job': job,
+                'progress': job.progress_data(),
+            })
+        elif job.status == ImportJob.STATUS_FAILED:
+            messages.error(request, f"Error processing import: {job.error}")
+        else:
+            options = job.options or {}
+            context.update({
+                'job': job,
+                'results': job.result.get('results', ''),
+                'dry_run': options.get('dry_run', True),
+                'session_id': options.get('session_id', ''),
+                'selected_table': job.table_name,
+                'import_mode': options.get('import_mode', 'replace'),
+                'import_images': 'yes' if options.get('import_images') else 'no',
+                'stats': job.result.get('stats', {}),
+                'first_failures': job.result.get('first_failures', []),
+                'first_warnings': job.result.get('first_warnings', []),
+            })
     
     return render(request, 'collection/import_records.html', context)
 
 
+@login_required
+@permission_required('collection.change_headstamp', raise_exception=True)
 def download_results(request, caliber_code):
     """Download import results as a text file"""
-    session_id = request.GET.get('session_id')
-    
-    if not session_id or f'import_results_{session_id}' not in request.session:
-        messages.error(request, "Results not found or expired")
-        return redirect('import_records', caliber_code=caliber_code)
-    
-    # Get the stored results
-    stored_data = request.session[f'import_results_{session_id}']
-    
-    # Use the complete_results for the download, not the web display version
-    results = stored_data.get('complete_results', stored_data.get('results', ''))
-    dry_run = stored_data['dry_run']
-    file_name = stored_data['file_name']
-    table_name = stored_data.get('selected_table', 'unknown')
-    
-    # Create response with text file
-    response = HttpResponse(results, content_type='text/plain')
-    response_filename = f"import_{table_name}_{os.path.splitext(file_name)[0]}_{'dry_run' if dry_run else 'actual'}.txt"
-    response['Content-Disposition'] = f'attachment; filename="{response_filename}"'
-    
-    return response
\ No newline at end of file
+    job_id = request.GET.get('job', '')
+    if job_id.isdigit():
+        job = visible_import_jobs(request.user).filter(pk=job_id, caliber__code=caliber_code).first()
+        if not job or not job.is_finished:
+            messages.error(request, "Results not found or expired")
+            return redirect('import_records', caliber_code=caliber_code)
+        if not job.report_file or not default_storage.exists(job.report_file):
+            messages.error(request, "The report for this import is no longer available")
+            return redirect('import_records', caliber_code=caliber_code)
+        dry_run = (job.options or {}).get('dry_run', True)
+        response_filename = f"import_{job.table_name}_{os.path.splitext(job.file_name)[0]}_{'dry_run' if dry_run else 'actual'}.txt"
+        return FileResponse(
+            open_report(job.report_file),
+            as_attachment=True,
+            filename=response_filename,
+            content_type='text/plain',
+        )
+    
+    messages.error(request, "Results not found or expired")
+    return redirect('import_records', caliber_code=caliber_code)
\ No newline at end of file
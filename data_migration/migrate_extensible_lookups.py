@@ -13,6 +13,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cartridge_collection.settings')
 django.setup()
 
 from collection.models import LoadType, BulletType, CaseType, PrimerType, PAColor
+from collection.utils.legacy_resolver import LegacyResolver, parse_legacy_mappings
 
 # Generate a timestamp for unique filenames
 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -63,55 +64,70 @@ def phase1_investigate(rows):
             print(f"  {value}")
 
 
+def resolve_value(resolver, field, model, value):
+    """The existing lookup a legacy value maps to, by its legacy mappings as the importers do, else by value"""
+    return resolver.resolve(field, value) or model.objects.filter(value=value).first()
+
+
 def phase2_dry_run(rows):
     print("\nPhase 2: Dry Run")
+    # Same legacy value resolution as the importers, compiled once instead of a query per value
+    resolver = LegacyResolver()
+    outcomes = defaultdict(lambda: {'found': 0, 'create': 0})
     for i, row in enumerate(rows):
         logging.info(f"Simulating row {i+1} of {len(rows)}")
         for field, model in legacy_fields.items():
             value = row[list(legacy_fields.keys()).index(field)]
-            if value in dry_run_cache[model.__name__]:
+            if not value or value in dry_run_cache[model.__name__]:
                 continue  # Skip processing if already cached
             dry_run_cache[model.__name__].add(value)  # Add to cache
 
             try:
-                instance = model.objects.filter(value=value).first()
+                instance = resolve_value(resolver, field, model, value)
                 if instance:
-                    logging.info(f"Found existing {model.__name__}: {value}")
+                    logging.info(f"Found existing {model.__name__}: {value} -> {instance.value}")
+                    outcomes[field]['found'] += 1
                 else:
                     logging.info(f"Would create new {model.__name__}: {value}")
+                    outcomes[field]['create'] += 1
             except Exception as e:
                 logging.error(f"Error checking value {value} in model {model.__name__}: {e}")
 
+    for field, counts in outcomes.items():
+        print(f"  {field}: {counts['found']} already exist, {counts['create']} to create")
+
 
 def phase3_migrate(rows):
     print("\nPhase 3: Actual Migration")
+    # Resolved as in the dry run, so the dry run reports what this phase does
+    resolver = LegacyResolver()
+    migrated = defaultdict(set)
     for i, row in enumerate(rows):
         logging.info(f"Processing row {i+1} of {len(rows)}")
         for field, model in legacy_fields.items():
             value = row[list(legacy_fields.keys()).index(field)]
-            if value:
-                save_value(model, value)
+            if not value or value in migrated[model.__name__]:
+                continue
+            migrated[model.__name__].add(value)
+            save_value(resolver, field, model, value)
     generate_report()
 
 
-def save_value(model, value):
+def save_value(resolver, field, model, value):
     try:
         with transaction.atomic():
-            instance, created = model.objects.get_or_create(value=value)
-            if created:
-                instance.display_name = value
-                instance.legacy_mappings = value
-                instance.save()
+            instance = resolve_value(resolver, field, model, value)
+            if instance is None:
+                model.objects.create(value=value, display_name=value, legacy_mappings=value)
                 logging.info(f"Created new {model.__name__}: {value}")
                 migration_summary[model.__name__]['created'] += 1
+            elif value not in parse_legacy_mappings(instance.legacy_mappings):
+                instance.legacy_mappings = f"{instance.legacy_mappings},{value}" if instance.legacy_mappings else value
+                instance.save()
+                logging.info(f"Updated {model.__name__}: Added '{value}' to legacy_mappings")
+                migration_summary[model.__name__]['updated'] += 1
             else:
-                if value not in instance.legacy_mappings.split(','):
-                    instance.legacy_mappings += f',{value}'
-                    instance.save()
-                    logging.info(f"Updated {model.__name__}: Added '{value}' to legacy_mappings")
-                    migration_summary[model.__name__]['updated'] += 1
-                else:
-                    migration_summary[model.__name__]['skipped'] += 1
+                migration_summary[model.__name__]['skipped'] += 1
     except Exception as e:
         logging.error(f"Error saving value {value} in model {model.__name__}: {e}")
 
@@ -0,0 +1,16 @@
+#!/usr/bin/env bash
+# start.sh for Render deployment
+
+# The import worker runs beside the web server, the only service that can mount the media disk
+# holding the uploads. Restart it whenever it exits, so queued imports never wait on a dead worker;
+# a job it was running is failed by the next worker once its heartbeat goes stale.
+(
+    while true; do
+        python manage.py run_import_jobs
+        echo "Import worker exited with status $?; restarting in 5 seconds" >&2
+        sleep 5
+    done
+) &
+
+# Uvicorn workers serve the ASGI app so streaming chat responses don't hold a worker thread
+exec gunicorn cartridge_collection.asgi:application -k uvicorn_worker.UvicornWorker